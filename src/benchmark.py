@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the Benchmark class used to time the hot paths of the simulation so
+that engine changes can be judged against real numbers. File should be run from
+the command line using a JSON formatted benchmark file from the inputs
+directory. Every benchmark is run over the grid of NUMGOODS, NUMPRODUCERS and
+NUMCONSUMERS sizes in the file with fixed seeds. Each run is appended to
+results/<name>_history.json (one JSON record per line) and compared against
+the last few runs on the same machine; benchmarks slower than the threshold are
+reported as regressions and make the script exit with status 1.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import itertools                # for expanding the size grid
+import os                       # for results file names
+import platform                 # for recording the machine
+import subprocess               # for recording the git commit
+import sys                      # for silencing run output
+import time                     # for timestamps
+import timeit                   # high resolution timer
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from simulation import Simulation
+from validate import Validate
+from utility.file_io import read_json, append_json_line, read_json_lines
+from utility.parallel import trial_rngs
+
+###############################################################################
+# DEFINE BENCHMARK CLASS
+###############################################################################
+
+class Benchmark:
+  "Class used to benchmark the simulation."
+  #spec (Dictionary)
+  def __init__(self, spec):
+    self.sizes = spec.get('sizes', {'NUMGOODS' : [500], 'NUMPRODUCERS' : [20], 'NUMCONSUMERS' : [1000]})
+    self.simLength = spec.get('SIMLENGTH', 10)
+    self.percentFactory = spec.get('PERCENTFACTORY', 0.1)
+    self.engines = spec.get('engines', ['loop', 'batch'])
+    self.repeats = spec.get('repeats', 5)
+    self.minTime = spec.get('minTime', 0.1)
+    self.seed = spec.get('seed', 0)
+    self.threshold = spec.get('threshold', 0.1)
+    self.baselineRuns = spec.get('baselineRuns', 3)
+
+
+###############################################################################
+# TIMING METHODS
+###############################################################################
+
+  # function (function taking no arguments)
+  def timeIt(self, function):
+    """
+    Returns the best and median time in seconds of one call of function over
+    repeats measurements. Each measurement calls function as many times as it
+    takes to last at least minTime seconds so that fast calls are not lost in
+    timer noise.
+    """
+    number = 1
+    while True:
+      start = timeit.default_timer()
+      for call in range(number):
+        function()
+      elapsed = timeit.default_timer() - start
+      if elapsed >= self.minTime:
+        break
+      number *= 2
+    times = [elapsed / number]
+    for repeat in range(self.repeats - 1):
+      start = timeit.default_timer()
+      for call in range(number):
+        function()
+      times.append((timeit.default_timer() - start) / number)
+    return {'best' : min(times), 'median' : float(np.median(times)), 'calls' : number}
+
+  # numGoods (int)
+  # numProducers (int)
+  # numConsumers (int)
+  def cases(self, numGoods, numProducers, numConsumers):
+    """
+    Returns a list of (name, function) pairs timing one timestep's worth of
+    numConsumers consumers for every hot path at one grid size, plus full runs of
+    SIMLENGTH timesteps. Names only include the sizes a benchmark depends on.
+    """
+    simulation = Simulation(self.simLength, numGoods, numConsumers, numProducers, self.percentFactory)
+    validate = Validate(self.simLength, numGoods, numConsumers, self.percentFactory)
+    inventoryRng, consumerRng = trial_rngs(self.seed)
+    market = simulation.initialize_producers('factories', inventoryRng)
+    producers = market.getProducers()
+    validateProducers = validate.initialize_producers('noConstants', 'factories', inventoryRng).getProducers()
+    goodsDemanded = consumerRng.random_sample(numConsumers).tolist()
+    rouletteSpins = consumerRng.random_sample(numConsumers).tolist()
+
+    def getClosestTo():
+      for goodDemanded in goodsDemanded:
+        producers[0].getClosestTo(producers[0].getInventory(), goodDemanded)
+
+    def calcProbDensity():
+      for goodDemanded in goodsDemanded:
+        for producer in producers:
+          simulation.calcProbDensity(producer, goodDemanded)
+
+    def rouletteConsumerBuysFrom():
+      for goodDemanded, rouletteSpin in zip(goodsDemanded, rouletteSpins):
+        simulation.rouletteConsumerBuysFrom(producers, goodDemanded, rouletteSpin)
+
+    def nonRoulette():
+      for goodDemanded in goodsDemanded:
+        validate.nonRoulette(validateProducers, goodDemanded)
+
+    def initialize_producers():
+      simulation.initialize_producers('factories', np.random.RandomState(self.seed))
+
+    inventory = 'goods=' + str(simulation.numFactoryGoods)
+    consumers = 'consumers=' + str(numConsumers)
+    producerCount = 'producers=' + str(numProducers)
+    cases = [
+      ('getClosestTo[' + inventory + ',' + consumers + ']', getClosestTo),
+      ('calcProbDensity[' + inventory + ',' + producerCount + ',' + consumers + ']', calcProbDensity),
+      ('rouletteConsumerBuysFrom[' + inventory + ',' + producerCount + ',' + consumers + ']', rouletteConsumerBuysFrom),
+      ('nonRoulette[' + inventory + ',' + consumers + ']', nonRoulette),
+      ('initialize_producers[' + inventory + ',' + producerCount + ']', initialize_producers)
+    ]
+    for engine in self.engines:
+      cases.append(('run[engine=' + engine + ',' + inventory + ',' + producerCount + ',' + consumers + ',simLength=' + str(self.simLength) + ']',
+                    lambda engine = engine: quiet_run(simulation, engine, self.seed)))
+    return cases
+
+  def measure(self):
+    "Times every benchmark over the size grid and returns a dictionary of results keyed by benchmark name."
+    results = dict()
+    keys = ['NUMGOODS', 'NUMPRODUCERS', 'NUMCONSUMERS']
+    for numGoods, numProducers, numConsumers in itertools.product(*[self.sizes[key] for key in keys]):
+      for name, function in self.cases(numGoods, numProducers, numConsumers):
+        if name not in results:
+          results[name] = self.timeIt(function)
+          print "{0:<90} {1:>12.6f} s".format(name, results[name]['best'])
+    return results
+
+
+###############################################################################
+# REPORT METHODS
+###############################################################################
+
+  # history (Array of Dictionaries) - earlier runs, oldest first
+  # current (Dictionary) - this run
+  def compare(self, history, current):
+    """
+    Prints the change of every benchmark's best time against the median of its
+    best times over the last baselineRuns runs on the same machine and Python
+    version, and returns the names of the benchmarks that got slower by more
+    than the threshold. The threshold should be set above the run to run noise
+    of the machine.
+    """
+    baselines = [entry for entry in history
+                 if entry['machine'] == current['machine'] and entry['python'] == current['python']][-self.baselineRuns:]
+    if not baselines:
+      print "No earlier run on this machine to compare against.\n"
+      return []
+    print "Compared with the " + str(len(baselines)) + " run(s) since " + baselines[0]['date'] + \
+          " (commit(s) " + ", ".join(sorted(set(str(entry['commit']) for entry in baselines))) + "):\n"
+    regressions = []
+    for name in sorted(current['results']):
+      previous = [entry['results'][name]['best'] for entry in baselines if name in entry['results']]
+      if not previous:
+        print "{0:<90} {1:>12}".format(name, 'new')
+        continue
+      change = current['results'][name]['best'] / np.median(previous) - 1
+      flag = ''
+      if change > self.threshold:
+        flag = '  REGRESSION'
+        regressions.append(name)
+      print "{0:<90} {1:>+11.1f}%{2}".format(name, 100 * change, flag)
+    print ""
+    return regressions
+
+
+###############################################################################
+# RUN METHOD
+###############################################################################
+
+  # outputFile (str)
+  def run(self, outputFile = 'benchmark'):
+    """
+    Runs every benchmark, appends the results to results/<name>_history.json and
+    prints the comparison report. Returns the names of regressed benchmarks.
+    """
+    historyFile = '../results/' + os.path.splitext(outputFile)[0] + '_history.json'
+    history = list(read_json_lines(historyFile)) if os.path.exists(historyFile) else []
+
+    print "Benchmarking (best of " + str(self.repeats) + ")...\n"
+    current = {
+      "date"    : time.strftime('%Y-%m-%d %H:%M:%S'),
+      "commit"  : git_commit(),
+      "machine" : platform.node(),
+      "python"  : platform.python_version(),
+      "numpy"   : np.__version__,
+      "seed"    : self.seed,
+      "results" : self.measure()
+    }
+    print ""
+    append_json_line(historyFile, current)
+
+    print "================================================="
+    regressions = self.compare(history, current)
+    print str(len(regressions)) + " regression(s) over " + str(int(100 * self.threshold)) + "%"
+    print "================================================="
+    return regressions
+
+
+###############################################################################
+# HELPER METHODS
+###############################################################################
+
+def git_commit():
+  "Returns the current git commit of the repository or None outside of git."
+  try:
+    with open(os.devnull, 'w') as devnull:
+      return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr = devnull).strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+# simulation (Simulation object)
+# engine (str)
+# seed (int)
+def quiet_run(simulation, engine, seed):
+  "Runs one full trial with Simulation.run without printing or plotting and removes its results files."
+  outputFile = '_benchmark_run.json'
+  stdout = sys.stdout
+  sys.stdout = open(os.devnull, 'w')
+  try:
+    simulation.run(numTrials = 1, outputFile = outputFile, engine = engine, seed = seed, plotting = None)
+  finally:
+    sys.stdout.close()
+    sys.stdout = stdout
+    for name in (outputFile, '_benchmark_run_summary.json'):
+      if os.path.exists('../results/' + name):
+        os.remove('../results/' + name)
+
+
+###############################################################################
+# RUN BENCHMARK
+###############################################################################
+
+# command-line running of python script
+if __name__ == "__main__":
+  outputFile = sys.argv[1]
+  spec = read_json('../inputs/' + sys.argv[1])
+
+  # Instantiate benchmark
+  benchmark = Benchmark(spec)
+  # run benchmark and fail if anything got slower
+  regressions = benchmark.run(outputFile = outputFile)
+  sys.exit(1 if regressions else 0)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the BreakpointTable class used by the nonRouletteTable kernel
+to make deterministic (nonRoulette) buying decisions without evaluating every producer.
+While inventories stay the same the winning producer and the good it sells are a
+piecewise-constant function of goodDemanded on [0, 1], so the table computes the
+breakpoints of that function once and every decision becomes a lookup. When
+prices change the table is updated incrementally: only the goodDemanded
+intervals where a repriced good can be picked are computed again.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from utility.parallel import chunk_slices
+
+# intervals whose crossovers are found at once, bounding the memory of the pairs of candidates
+BLOCK = 1024
+
+###############################################################################
+# DEFINE BREAKPOINT TABLE CLASS
+###############################################################################
+
+class BreakpointTable(object):
+  "Class mapping goodDemanded to the producer and good picked by nonRoulette."
+  #market (Market object)
+  def __init__(self, market):
+    self.market = market
+    self.build()
+
+  def build(self):
+    """
+    Computes the breakpoints. Between consecutive midpoints of any producer's
+    goods every producer's closest good is fixed, and inside such an interval
+    the producer with the highest density 1/((m-t)^2 c) can only change where
+    two densities cross. Every crossover inside an interval of two producers
+    that can win there is added as a breakpoint and the winner of each
+    resulting segment is found at its center.
+    """
+    market = self.market
+
+    # edges of the intervals on which every producer's closest good is fixed
+    midpoints = [(producer.goodIDs[1:] + producer.goodIDs[:-1]) / 2 for producer in market.getProducers()]
+    edges = np.unique(np.concatenate([[0.0, 1.0]] + midpoints))
+    self.edges = edges[(edges >= 0) & (edges <= 1)]
+
+    # the goodDemanded interval in which each good is its producer's closest
+    self.cellLows = np.concatenate(([0.0], (market.goodIDs[1:] + market.goodIDs[:-1]) / 2))
+    self.cellHighs = np.concatenate((self.cellLows[1:], [1.0]))
+    self.cellLows[market.offsets[:-1]] = 0.0
+    self.cellHighs[market.offsets[1:] - 1] = 1.0
+
+    self.starts, self.segmentWinners, self.segmentGoods = self.segments(self.edges[:-1], self.edges[1:])
+    self.merge()
+
+  #lows (Array of floats) - sorted starts of the intervals between edges to compute
+  #highs (Array of floats) - matching ends
+  def segments(self, lows, highs):
+    """
+    Returns the start, winning producer and good sold of every segment between
+    breakpoints inside the given intervals, BLOCK intervals at a time.
+    """
+    blocks = [self.blockSegments(lows[block], highs[block]) for block in chunk_slices(len(lows), -(-len(lows) // BLOCK))]
+    if not blocks:
+      return np.zeros(0), np.zeros(0, dtype = int), np.zeros(0, dtype = int)
+    return tuple(np.concatenate(arrays) for arrays in zip(*blocks))
+
+  #lows (Array of floats)
+  #highs (Array of floats)
+  def blockSegments(self, lows, highs):
+    """
+    Returns the segments of a block of intervals. A producer whose weighted
+    squared distance c (t - m)^2 is at least another's everywhere in an
+    interval never wins there: its smallest value over the interval has to be no more than the
+    smallest of the others' largest values. Usually only a few producers are
+    left as candidates per interval, so the crossovers of every pair of them
+    and the winners between those are found for all the intervals at once.
+    """
+    market = self.market
+    closest = market.getClosestIndices((lows + highs) / 2)
+    goodIDs, prices = market.goodIDs[closest], market.goodPrices[closest]
+    least = prices * (np.clip(goodIDs, lows[:, None], highs[:, None]) - goodIDs)**2
+    most = prices * np.maximum(goodIDs - lows[:, None], highs[:, None] - goodIDs)**2
+    candidates = least <= most.min(axis = 1)[:, None] * (1 + 1e-9)
+
+    # the candidates of every interval moved to its first columns, in producer order
+    counts = candidates.sum(axis = 1)
+    producers = np.argsort(~candidates, axis = 1, kind = 'mergesort')[:, :counts.max()]
+    rows = np.arange(len(lows))[:, None]
+    closest, m, c = closest[rows, producers], goodIDs[rows, producers], prices[rows, producers]
+    valid = np.arange(producers.shape[1]) < counts[:, None]
+
+    # crossovers of every pair of candidates: sqrt(c_i)|t - m_i| = sqrt(c_j)|t - m_j|
+    i, j = np.triu_indices(producers.shape[1], 1)
+    mi, mj, si, sj = m[:, i], m[:, j], np.sqrt(c[:, i]), np.sqrt(c[:, j])
+    inside = valid[:, j] & (lows[:, None] < highs[:, None])
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+      crossovers = [t[inside & (t > lows[:, None]) & (t < highs[:, None])]
+                    for t in [(si * mi - sj * mj) / (si - sj), (si * mi + sj * mj) / (si + sj)]]
+
+    # winner and good sold on every segment between breakpoints
+    cuts = np.unique(np.concatenate([lows, highs] + crossovers))
+    centers = (cuts[1:] + cuts[:-1]) / 2
+    intervals = lows.searchsorted(centers, side = 'right') - 1
+    inside = centers < highs[intervals] # drop gaps between intervals
+    starts, centers, intervals = cuts[:-1][inside], centers[inside], intervals[inside]
+    distances = np.where(valid[intervals], c[intervals] * (m[intervals] - centers[:, None])**2, np.inf)
+    picked = distances.argmin(axis = 1)
+    winners, goods = producers[intervals, picked], closest[intervals, picked]
+    # a segment one float wide has its center on the edge, where goods with the
+    # same goodID can make another good a producer's closest, so it looks at all
+    edge = np.flatnonzero(centers == lows[intervals])
+    if len(edge):
+      closest = market.getClosestIndices(centers[edge])
+      distances = market.goodPrices[closest] * (market.goodIDs[closest] - centers[edge][:, None])**2
+      winners[edge] = distances.argmin(axis = 1)
+      goods[edge] = closest[np.arange(len(edge)), winners[edge]]
+    return starts, winners, goods
+
+  def merge(self):
+    "Merges neighbouring segments that sell the same good into the lookup arrays."
+    goods = self.segmentGoods
+    keep = np.concatenate(([True], goods[1:] != goods[:-1]))
+    self.breakpoints = self.starts[1:][keep[1:]]
+    self.winners = self.segmentWinners[keep]
+    self.goods = goods[keep]
+
+  #goods (Array of ints) - flat indices of the goods whose price changed
+  def update(self, goods):
+    """
+    Brings the table up to date after the prices of goods changed. A good only
+    matters where it is its producer's closest good, so only the intervals
+    between edges inside those cells are computed again. When they cover most
+    of [0, 1] the whole table is rebuilt instead.
+    """
+    # mark the intervals between edges covered by the changed goods' cells
+    numIntervals = len(self.edges) - 1
+    coverage = np.zeros(numIntervals + 1, dtype = int)
+    np.add.at(coverage, self.edges.searchsorted(self.cellLows[goods]), 1)
+    np.add.at(coverage, self.edges.searchsorted(self.cellHighs[goods]), -1)
+    stale = np.cumsum(coverage[:-1]) > 0
+    if stale.sum() * 2 > numIntervals:
+      self.build()
+      return
+    lows, highs = self.edges[:-1][stale], self.edges[1:][stale]
+    starts, winners, newGoods = self.segments(lows, highs)
+    # keep the segments outside the stale intervals and splice in the new ones
+    kept = ~stale[self.edges.searchsorted(self.starts, side = 'right') - 1]
+    order = np.argsort(np.concatenate((self.starts[kept], starts)), kind = 'mergesort')
+    self.starts = np.concatenate((self.starts[kept], starts))[order]
+    self.segmentWinners = np.concatenate((self.segmentWinners[kept], winners))[order]
+    self.segmentGoods = np.concatenate((self.segmentGoods[kept], newGoods))[order]
+    self.merge()
+
+  #goodsDemanded (Array of floats)
+  def lookup(self, goodsDemanded):
+    """Returns the producer index and flat good index chosen for each goodDemanded."""
+    segments = self.breakpoints.searchsorted(goodsDemanded, side = 'right')
+    return self.winners[segments], self.goods[segments]
+
+  #goodsDemanded (Array of floats)
+  def consumersBuyFrom(self, goodsDemanded):
+    """
+    Makes the buying decisions of a whole timestep at once: counts how many
+    consumers fall on every segment and credits each winner with the prices of
+    the goods it sold.
+    """
+    self.credit(self.segmentSales(goodsDemanded))
+
+  #goodsDemanded (Array of floats)
+  def segmentSales(self, goodsDemanded):
+    "Returns how many of the consumers fall on every segment."
+    segments = self.breakpoints.searchsorted(goodsDemanded, side = 'right')
+    return np.bincount(segments, minlength = len(self.goods))
+
+  #sales (Array of ints) - consumers on every segment
+  def credit(self, sales):
+    "Credits each segment's winner with the prices of the goods it sold."
+    self.market.profits += np.bincount(self.winners, weights = sales * self.market.goodPrices[self.goods],
+                                       minlength = len(self.market.profits))
+    if self.market.sales is not None:
+      np.add.at(self.market.sales, self.goods, sales)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the Comparison class used to compare scenarios of simulation.py or
+validate.py with paired trials. File should be run from the command line using
+a JSON formatted comparison file from the inputs directory. A comparison file
+holds a "base" set of inputs in the usual format and a list of "scenarios" to
+override the base with, the first of which is the baseline. Trial k of every
+scenario gets the same seed, and so the same demands and roulette spins (common
+random numbers) - and the same goods and prices when the scenarios draw as many
+of them - so the difference between a scenario and the baseline is measured
+trial by trial instead of between two independent sets of trials. With
+"antithetic" true trials come in pairs that share a seed, the second using
+1 - u for every uniform draw u, and each pair counts as one observation. The
+paired differences of every producer's profits and wins, and
+of the total profits, are written to results/<name>.json with 95% confidence
+intervals along with how many independent trials would give the same precision.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import json                     # for labelling scenarios
+import os                       # for results file names
+import time                     # for timing the comparison
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from model import run_options
+from simulation import Simulation
+from validate import Validate
+from utility.file_io import read_json, write_json
+from utility.parallel import master_seed, trial_seeds, map_trials
+from utility.statistics import RunningStats, format_interval, to_json
+
+MODELS = {'simulation' : Simulation, 'validate' : Validate}
+
+###############################################################################
+# DEFINE COMPARISON CLASS
+###############################################################################
+
+class Comparison:
+  "Class used to compare scenarios with common random numbers."
+  #spec (Dictionary)
+  def __init__(self, spec):
+    self.base = spec.get('base', dict())
+    self.scenarios = spec['scenarios']
+    self.model = spec.get('model', 'simulation')
+    self.antithetic = spec.get('antithetic', False)
+
+
+###############################################################################
+# SETUP METHODS
+###############################################################################
+
+  def expand(self):
+    """
+    Returns the inputs of every scenario, the base updated with its overrides,
+    after checking that they all draw the same random numbers: common random
+    numbers need the same number of timesteps and consumers in every scenario.
+    """
+    points = []
+    for override in self.scenarios:
+      point = dict(self.base)
+      point.update(override)
+      points.append(point)
+    for key in ('SIMLENGTH', 'NUMCONSUMERS', 'numTrials'):
+      if len(set(point[key] for point in points)) > 1:
+        raise ValueError("every scenario must have the same " + key + " to share random numbers")
+    if self.antithetic and points[0]['numTrials'] % 2:
+      raise ValueError("antithetic trials come in pairs, so numTrials must be even")
+    return points
+
+  # seed (int)
+  # points (Array of Dictionaries)
+  def tasks(self, seed, points):
+    """
+    Returns one (scenario index, model, inputs, trial, trial seed, antithetic)
+    task per trial of every scenario. Antithetic pairs share the seed of the
+    pair.
+    """
+    numTrials = points[0]['numTrials']
+    step = 2 if self.antithetic else 1
+    seeds = trial_seeds(seed, numTrials // step)
+    return [(index, self.model, point, trial, seeds[trial // step], self.antithetic and trial % 2 == 1)
+            for index, point in enumerate(points) for trial in range(numTrials)]
+
+
+###############################################################################
+# RUN METHOD
+###############################################################################
+
+  # outputFile (str)
+  # workers    (int)
+  # seed       (int)
+  def run(self, outputFile = 'compare', workers = 1, seed = None):
+    """
+    Runs every trial of every scenario, writes the paired differences between
+    each scenario and the baseline to results/<name>.json and prints them to the
+    console. Returns the comparison written.
+    """
+    # let user know the comparison has started running
+    print "Running..."
+    print ""
+
+    # timing how long the comparison takes to run
+    startComparison = time.time()
+
+    if seed is None:
+      seed = master_seed()
+    points = self.expand()
+    records = dict()
+    for index, trial, record in map_trials(run_task, self.tasks(seed, points), workers, ordered = False):
+      records[index, trial] = record
+    comparison = self.compare(points, records)
+    comparison['seed'] = seed
+
+    # timing how long the comparison takes to run
+    endComparison = time.time()
+
+    write_json('../results/' + os.path.splitext(outputFile)[0] + '.json', comparison)
+
+    # print the paired differences to console
+    print "=================================================\n"
+    print "Paired comparison of " + str(len(points)) + " scenario(s) over " + str(comparison['trials']) + \
+          " trial(s) each" + (", in " + str(comparison['observations']) + " antithetic pair(s)" if self.antithetic else "") + ":\n"
+    print "Baseline: " + comparison['baseline'] + "\n"
+    for difference in comparison['differences']:
+      print difference['scenario'] + " minus baseline:"
+      print "  total profits: " + describe(difference['total_profits'])
+      for producer in difference['producers']:
+        print "  " + producer['producerIDs'][0] + " - " + producer['producerIDs'][1] + " profits: " + describe(producer['profits'])
+        print "  " + producer['producerIDs'][0] + " - " + producer['producerIDs'][1] + " win rate: " + describe(producer['win_rate'])
+      print ""
+    print "Master seed was: " + str(seed) + "\n"
+    print "Comparison took " + str(endComparison - startComparison) + " seconds to run!"
+    print ""
+    print "================================================="
+    return comparison
+
+  # points  (Array of Dictionaries)
+  # records (Dictionary) - trial records keyed by (scenario index, trial)
+  def compare(self, points, records):
+    """
+    Returns the paired differences between every scenario and the baseline as a
+    JSON serializable dictionary. Trials are added up in trial order, so the
+    results don't depend on the number of workers.
+    """
+    numTrials = points[0]['numTrials']
+    step = 2 if self.antithetic else 1
+    numProducers = min(len(records[index, 0]['producers']) for index in range(len(points)))
+    # profits and wins of the first numProducers producers and the total profits of every trial
+    outcomes = [np.array([outcome(records[index, trial], numProducers) for trial in range(numTrials)])
+                for index in range(len(points))]
+    trialStats = []
+    for trials in outcomes:
+      stats = RunningStats()
+      stats.addBatch(trials)
+      trialStats.append(stats)
+    labels = [label(override) for override in self.scenarios]
+
+    differences = []
+    for index in range(1, len(points)):
+      paired = RunningStats()
+      paired.addBatch((outcomes[index] - outcomes[0]).reshape(numTrials // step, step, -1).mean(axis = 1))
+      summary = paired.summary()
+      # variance of the difference of independent trials over that of a paired observation, per trial run
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        efficiency = (trialStats[index].variance() + trialStats[0].variance()) / (step * paired.variance())
+      efficiency = np.where(np.isfinite(efficiency), efficiency, np.nan)
+      entries = [dict((key, value[position] if isinstance(value, list) else value) for key, value in summary.items())
+                 for position in range(2 * numProducers + 1)]
+      for position, entry in enumerate(entries):
+        entry['efficiency'] = to_json(efficiency[position])
+      differences.append({
+        "scenario"      : labels[index],
+        "total_profits" : entries[-1],
+        "producers"     : [{
+          "producerIDs" : [records[index, 0]['producers'][i]['producerID'], records[0, 0]['producers'][i]['producerID']],
+          "profits"     : entries[i],
+          "win_rate"    : entries[numProducers + i]
+        } for i in range(numProducers)]
+      })
+    return {
+      "model"        : self.model,
+      "baseline"     : labels[0],
+      "scenarios"    : labels,
+      "trials"       : numTrials,
+      "antithetic"   : self.antithetic,
+      "observations" : numTrials // step,
+      "differences"  : differences
+    }
+
+
+###############################################################################
+# COMPARISON HELPERS
+###############################################################################
+
+# record (Dictionary)
+# numProducers (int)
+def outcome(record, numProducers):
+  "Returns the profits and wins of a trial's first numProducers producers and its total profits."
+  profits = [producer['profits'] for producer in record['producers']]
+  wins = [float(position == record['winner']) for position in range(numProducers)]
+  return profits[:numProducers] + wins + [sum(profits)]
+
+# override (Dictionary)
+def label(override):
+  "Returns the label of a scenario, the inputs it overrides."
+  return ", ".join(key + " = " + (override[key] if isinstance(override[key], basestring) else json.dumps(override[key], sort_keys = True))
+                   for key in sorted(override)) or "base"
+
+# summary (Dictionary) - with mean, ci_low, ci_high and efficiency
+def describe(summary):
+  "Returns a paired difference and how many independent trials it's worth as text."
+  text = format_interval(summary)
+  if summary['efficiency'] is not None:
+    text += ", as precise as {0:.3g} times as many independent trials".format(summary['efficiency'])
+  return text
+
+
+###############################################################################
+# COMPARISON WORKER
+###############################################################################
+
+# task (Tuple of scenario index, model, inputs, trial, seed, antithetic)
+def run_task(task):
+  """
+  Runs one trial of a scenario with the Simulation or Validate class - module
+  level so worker processes can unpickle it.
+  """
+  index, modelName, inputs, trial, seed, antithetic = task
+  model = MODELS[modelName].fromInputs(inputs)
+  record, profitHistory = model.simulateTrial(trial, seed, model.setupFrom(inputs), run_options(inputs),
+                                              antithetic = antithetic)
+  return index, trial, record
+
+
+###############################################################################
+# RUN COMPARISON
+###############################################################################
+
+# command-line running of python script
+if __name__ == "__main__":
+  import sys
+  outputFile = sys.argv[1]
+  spec = read_json('../inputs/' + sys.argv[1])
+
+  # Instantiate comparison
+  comparison = Comparison(spec)
+  # run comparison
+  comparison.run(
+    outputFile = outputFile,
+    workers    = spec.get('workers', 1),
+    seed       = spec.get('seed')
+  )
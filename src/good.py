@@ -6,15 +6,17 @@
 
 """
 This file contains the Good class imported by validate.py and simulation.py in order
-to instantiate Good objects.
+to instantiate Good objects, as well as the Goods class used to view a producer's
+goodID and price arrays as a sequence of Good objects.
 """
 
 ###############################################################################
 # DEFINE GOOD CLASS
 ###############################################################################
 
-class Good:
+class Good(object):
   """Class for Good objects."""
+  __slots__ = ('goodID', 'price')
   #idInput (float)
   #priceInput (float)
   #quantityInput(int)
@@ -38,4 +40,40 @@ class Good:
 
   def __str__(self):
     """Returns string representation of the instance."""
-    return "Good ID: %r Good Price: %r\n" % (self.getID(), self.getPrice())
\ No newline at end of file
+    return "Good ID: %r Good Price: %r\n" % (self.getID(), self.getPrice())
+
+
+###############################################################################
+# DEFINE GOODS CLASS
+###############################################################################
+
+class Goods(object):
+  """
+  Read-only sequence of Good objects backed by a goodID array and a price array.
+  Good objects are only created when an item is accessed so an inventory costs
+  no more than its two arrays.
+  """
+  __slots__ = ('goodIDs', 'goodPrices')
+  #goodIDs (Array of floats)
+  #goodPrices (Array of floats)
+  def __init__(self, goodIDs, goodPrices):
+    self.goodIDs = goodIDs
+    self.goodPrices = goodPrices
+
+  def __len__(self):
+    """Returns the number of goods."""
+    return len(self.goodIDs)
+
+  #i (int)
+  def __getitem__(self, i):
+    """Returns the i-th good."""
+    return Good(float(self.goodIDs[i]), float(self.goodPrices[i]))
+
+  def __iter__(self):
+    """Iterates over the goods in order."""
+    for goodID, price in zip(self.goodIDs.tolist(), self.goodPrices.tolist()):
+      yield Good(goodID, price)
+
+  def __repr__(self):
+    """Returns code representation of the instance."""
+    return repr(list(self))
\ No newline at end of file
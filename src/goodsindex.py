@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the GoodsIndex class used by the pruned kernels to make
+buying decisions in markets with many producers. The goods of every producer
+are merged into one array sorted by goodID and labelled by producer, so the
+goods closest to a goodDemanded are a contiguous window of it found with one
+binary search. Every producer with a good inside the window's radius has its
+closest good there, and the densities of all the producers outside it add up to
+at most a bound computed from prefix sums of 1/price over shells of growing
+distance. A decision therefore only evaluates the producers near goodDemanded,
+and the bound says how much the others could change it.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import numpy as np              # numerical functionality
+
+# shells of distance growing by sqrt(2) summed over by the bound on the density mass outside a window
+SHELLS = 48
+
+###############################################################################
+# DEFINE GOODS INDEX CLASS
+###############################################################################
+
+class GoodsIndex(object):
+  "All the goods of a Market merged into one array sorted by goodID."
+  #market (Market object)
+  def __init__(self, market):
+    self.market = market
+    # stable, so goods with equal goodIDs keep the order they have within a producer
+    self.order = np.argsort(market.goodIDs, kind = 'mergesort')
+    self.goodIDs = market.goodIDs[self.order]
+    owners = np.repeat(np.arange(len(market.getProducers())), np.diff(market.offsets))
+    self.owners = owners[self.order]
+    # position of every flat good index in the sorted order
+    self.positions = np.empty(len(self.order), dtype = int)
+    self.positions[self.order] = np.arange(len(self.order))
+    self.weights = np.zeros(len(self.order) + 1)
+    self.slack = 0.0
+    self.update(self.order)
+
+  #goods (Array of ints) - flat indices of the goods whose price changed
+  def update(self, goods):
+    """
+    Brings the prefix sums of 1/price up to date after the prices of goods
+    change. Only the sums from the first of them in goodID order onwards are
+    added up again, in the same order as from scratch, so they come out the
+    same.
+    """
+    if not len(goods):
+      return
+    first = self.positions[goods].min()
+    weights = self.weights
+    weights[first + 1:] = np.cumsum(np.concatenate(([weights[first]], 1 / self.market.goodPrices[self.order[first:]])))[1:]
+    # the most rounding error a difference of two prefix sums can carry
+    self.slack = 2 * len(self.goodIDs) * np.finfo(float).eps * weights[-1]
+
+  #goodsDemanded (Array of floats)
+  #width (int) - goods looked at on either side of each goodDemanded
+  def nearest(self, goodsDemanded, width):
+    """
+    Returns the consumer, producer and flat good index of the closest good of
+    every producer with a good in stock within the radius of each consumer's
+    window, sorted by consumer then producer, along with the radii. The radius
+    is the distance to the closest good left out of the window, so no producer
+    left out has a good closer than it. Ties go left like Producer.getClosestIndices.
+    """
+    market = self.market
+    size = len(self.goodIDs)
+    positions = self.goodIDs.searchsorted(goodsDemanded)
+    lows = np.maximum(positions - width, 0)
+    highs = np.minimum(positions + width, size)
+    merged = lows[:, None] + np.arange(2 * width)
+    inWindow = merged < highs[:, None]
+    np.minimum(merged, size - 1, out = merged)
+    distances = np.abs(self.goodIDs[merged] - goodsDemanded[:, None])
+    with np.errstate(invalid = 'ignore'):
+      radii = np.minimum(np.where(lows > 0, goodsDemanded - self.goodIDs[np.maximum(lows - 1, 0)], np.inf),
+                         np.where(highs < size, self.goodIDs[np.minimum(highs, size - 1)] - goodsDemanded, np.inf))
+    covered = inWindow & (distances < radii[:, None])
+    if market.stock is not None:
+      goods = self.order[merged]
+      covered &= market.stock[goods] >= market.goodDepletion[goods]
+    consumers, columns = np.nonzero(covered)
+    merged, distances = merged[consumers, columns], distances[consumers, columns]
+    # group the goods by consumer and producer keeping their goodID order, so
+    # the last good left of goodDemanded and the first right of it are next to
+    # each other; the closer of the two is the producer's closest good (nonzero
+    # lists each consumer's goods in goodID order, so the keys are unique)
+    left = merged < positions[consumers]
+    producers = self.owners[merged]
+    order = np.argsort((consumers * len(self.market.getProducers()) + producers) * (2 * width) + columns)
+    consumers, producers, merged, left, distances = consumers[order], producers[order], merged[order], left[order], distances[order]
+    sameGroup = (consumers[1:] == consumers[:-1]) & (producers[1:] == producers[:-1])
+    lastLeft = left & np.append(~sameGroup | ~left[1:], True)
+    firstRight = ~left & np.insert(~sameGroup | left[:-1], 0, True)
+    pairs = np.flatnonzero(lastLeft[:-1] & firstRight[1:] & sameGroup)
+    leftCloser = distances[pairs] <= distances[pairs + 1]
+    firstRight[pairs[leftCloser] + 1] = False
+    lastLeft[pairs[~leftCloser]] = False
+    closest = lastLeft | firstRight
+    return consumers[closest], producers[closest], self.order[merged[closest]], radii
+
+  #goodsDemanded (Array of floats)
+  #radii (Array of floats)
+  def bound(self, goodsDemanded, radii):
+    """
+    Returns an upper bound on the sum of the densities 1/((m-t)^2 c) of all the
+    goods at least radius away from each goodDemanded t, which bounds the
+    summed density of every producer left out of its window. Goods between
+    radius * sqrt(2)^j and radius * sqrt(2)^(j+1) away count as if they were
+    radius * sqrt(2)^j away, less a few units of rounding so no good is missed.
+    """
+    weights, goodsDemanded = self.weights, goodsDemanded[:, None]
+    with np.errstate(invalid = 'ignore', over = 'ignore'):
+      scales = radii[:, None] * np.sqrt(2)**np.arange(SHELLS)
+      margins = 4 * np.finfo(float).eps * (np.abs(goodsDemanded) + scales)
+      rights = weights[self.goodIDs.searchsorted(goodsDemanded + scales - margins)]
+      lefts = weights[self.goodIDs.searchsorted(goodsDemanded - scales + margins, side = 'right')]
+      shells = (np.diff(np.hstack((rights, np.full((len(radii), 1), weights[-1]))), axis = 1) -
+                np.diff(np.hstack((lefts, np.zeros((len(radii), 1)))), axis = 1) + 2 * self.slack)
+      closest = np.maximum(scales - 2 * margins, 0)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+      bounds = (shells / closest**2).sum(axis = 1)
+    return np.where(np.isinf(radii), 0.0, np.where(radii > 0, bounds, np.inf))
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the registry of batched buying decision kernels used by the
+Model class that simulation.py and validate.py share. A kernel is built once per
+trial around a Market and makes the buying decisions of a whole timestep of
+consumers at once: choose() takes an array of goods demanded and the matching
+roulette spins and returns the producer index and flat good index each consumer
+buys (-1 for no sale). With dynamic inventories producers with nothing in stock
+get a probability density of zero. Every consumer of a timestep decides
+against the stock at its start, and consumers who lose a good to an earlier
+consumer in the same timestep decide again among what is left - unlike the
+loop engine, where goods sold out earlier in the timestep are gone for
+everyone, so the two aren't equivalent under dynamic inventories. With dynamic
+prices kernels count every good's sales and are told which prices changed, so
+anything they computed from prices can be brought up to date. With a ledger
+every sale is recorded with the consumer who made it. Given a pool of threads, a
+kernel splits every timestep's consumers into chunks decided in parallel, each
+totalling its own profits and sales until the timestep is over. The pruned kernels only
+evaluate the producers whose closest good is near each goodDemanded, found in a
+GoodsIndex, so they scale to thousands of producers. New kernels are added with
+the register_kernel decorator and picked by name with the buyingDecision input.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import threading                # for counting across threads
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from breakpoints import BreakpointTable
+from goodsindex import GoodsIndex
+from utility.parallel import chunk_slices, map_chunks
+
+###############################################################################
+# KERNEL REGISTRY
+###############################################################################
+
+KERNELS = dict()
+
+# name (str)
+def register_kernel(name):
+  "Class decorator adding a kernel class to the registry under name."
+  def register(kernelClass):
+    kernelClass.name = name
+    KERNELS[name] = kernelClass
+    return kernelClass
+  return register
+
+# name (str)
+# market (Market object)
+def make_kernel(name, market):
+  "Returns the kernel registered under name built for market."
+  if name not in KERNELS:
+    raise ValueError("unknown buying decision kernel '" + str(name) + "', choose from: " + ", ".join(sorted(KERNELS)))
+  return KERNELS[name](market)
+
+###############################################################################
+# DEFINE KERNEL CLASSES
+###############################################################################
+
+class Kernel(object):
+  "Base class of the batched buying decision kernels."
+  # consumers decided as one chunk on the calling thread unless setThreads is called
+  chunks = 1
+  pool = None
+  #market (Market object)
+  def __init__(self, market):
+    self.market = market
+
+  #chunks (int)
+  #pool (ThreadPool or None)
+  def setThreads(self, chunks, pool):
+    """
+    Splits every timestep's consumers into chunks decided on pool's threads.
+    The decisions don't depend on the chunks, but profits are totalled per
+    chunk, so they are the same for the same number of chunks.
+    """
+    self.chunks = chunks
+    self.pool = pool
+
+  #goodsDemanded (Array of floats)
+  #rouletteSpins (Array of floats)
+  def choose(self, goodsDemanded, rouletteSpins):
+    "Returns the producer index and flat good index bought by each consumer."
+    raise NotImplementedError
+
+  #goodsDemanded (Array of floats)
+  #rouletteSpins (Array of floats)
+  def chooseChunks(self, goodsDemanded, rouletteSpins):
+    "Same as choose, with the consumers split into chunks decided on the pool's threads."
+    if self.chunks == 1:
+      return self.choose(goodsDemanded, rouletteSpins)
+    chosen = map_chunks(lambda part: self.choose(goodsDemanded[part], rouletteSpins[part]),
+                        chunk_slices(len(goodsDemanded), self.chunks), self.pool)
+    return np.concatenate([producers for producers, goods in chosen]), np.concatenate([goods for producers, goods in chosen])
+
+  #goodsDemanded (Array of floats)
+  #rouletteSpins (Array of floats)
+  def buyChunks(self, goodsDemanded, rouletteSpins):
+    """
+    buy for static inventories with the consumers split into chunks decided on
+    the pool's threads. Every chunk totals the profits and sales it makes on its
+    own, and the totals are added to the market in chunk order at the end.
+    """
+    market = self.market
+    def decide(part):
+      producers, goods = self.choose(goodsDemanded[part], rouletteSpins[part])
+      consumers = np.flatnonzero(producers >= 0)
+      producers, goods = producers[consumers], goods[consumers]
+      profits = np.bincount(producers, weights = market.goodPrices[goods], minlength = len(market.profits))
+      sales = np.bincount(goods, minlength = len(market.goodIDs)) if market.sales is not None else None
+      return consumers + part.start, producers, goods, profits, sales
+    chunks = map_chunks(decide, chunk_slices(len(goodsDemanded), self.chunks), self.pool)
+    for consumers, producers, goods, profits, sales in chunks:
+      market.profits += profits
+      if sales is not None:
+        market.sales += sales
+      if market.ledger is not None:
+        self.record(consumers, producers, goods, goodsDemanded)
+    return sum(len(chunk[0]) for chunk in chunks)
+
+  #goodsDemanded (Array of floats)
+  #rouletteSpins (Array of floats)
+  def buy(self, goodsDemanded, rouletteSpins):
+    "Makes a timestep of buying decisions, credits the producers and returns the number of sales."
+    market = self.market
+    if market.stock is None and self.chunks > 1:
+      return self.buyChunks(goodsDemanded, rouletteSpins)
+    if market.stock is None:
+      producers, goods = self.choose(goodsDemanded, rouletteSpins)
+      sold = producers >= 0
+      if not sold.all():
+        producers, goods = producers[sold], goods[sold]
+      np.add.at(market.profits, producers, market.goodPrices[goods])
+      if market.sales is not None:
+        np.add.at(market.sales, goods, 1)
+      if market.ledger is not None:
+        self.record(np.flatnonzero(sold), producers, goods, goodsDemanded)
+      return len(producers)
+    # every round sells out at least one more good, so this ends
+    consumers = np.arange(len(goodsDemanded))
+    sales = 0
+    while len(consumers):
+      producers, goods = self.chooseChunks(goodsDemanded[consumers], rouletteSpins[consumers])
+      sold = producers >= 0
+      producers, goods, consumers = producers[sold], goods[sold], consumers[sold]
+      accepted = market.deplete(goods)
+      np.add.at(market.profits, producers[accepted], market.goodPrices[goods[accepted]])
+      if market.sales is not None:
+        np.add.at(market.sales, goods[accepted], 1)
+      if market.ledger is not None:
+        self.record(consumers[accepted], producers[accepted], goods[accepted], goodsDemanded)
+      sales += int(accepted.sum())
+      consumers = consumers[~accepted]
+    return sales
+
+  #consumers (Array of ints)
+  #producers (Array of ints)
+  #goods (Array of ints)
+  #goodsDemanded (Array of floats) - of every consumer in the timestep
+  def record(self, consumers, producers, goods, goodsDemanded):
+    "Records sales in the market's ledger."
+    market = self.market
+    market.ledger.append(consumers, producers, goods, market.goodPrices[goods],
+                         market.goodIDs[goods] - goodsDemanded[consumers])
+
+  #goods (Array of ints)
+  def pricesChanged(self, goods):
+    "Called with the flat indices of the goods whose price changed at the end of a timestep."
+    pass
+
+  #numConsumers (int)
+  def counts(self, numConsumers):
+    "Returns the hot path counters of a timestep of numConsumers decisions."
+    numDecisions = numConsumers * len(self.market.getProducers())
+    return {'density_evaluations' : numDecisions, 'nearest_good_lookups' : numDecisions}
+
+  #goodsDemanded (Array of floats)
+  def densities(self, goodsDemanded):
+    "Returns the consumers x producers closest good indices and probability densities."
+    market = self.market
+    bestGoods = market.getClosestIndices(goodsDemanded)
+    probabilityDensities = (1 / (market.goodIDs[bestGoods] - goodsDemanded[:, None])**2) * (1 / market.goodPrices[bestGoods])
+    if market.stock is not None:
+      probabilityDensities[bestGoods < 0] = 0
+    return bestGoods, probabilityDensities
+
+  #bestGoods (Array of ints)
+  #bestProducers (Array of ints)
+  def chosen(self, bestGoods, bestProducers):
+    "Returns the producers and flat good indices chosen, with -1 for consumers who found nothing in stock."
+    goods = bestGoods[np.arange(len(bestProducers)), bestProducers]
+    if self.market.stock is not None:
+      bestProducers[goods < 0] = -1
+    return bestProducers, goods
+
+
+@register_kernel('roulette')
+class RouletteKernel(Kernel):
+  "Roulette wheel selection weighted by the probability densities."
+  def choose(self, goodsDemanded, rouletteSpins):
+    bestGoods, probabilityDensities = self.densities(goodsDemanded)
+    cumulativeProbabilities = np.cumsum(probabilityDensities, axis = 1)
+    rouletteChoices = rouletteSpins * cumulativeProbabilities[:, -1]
+    bestProducers = (cumulativeProbabilities < rouletteChoices[:, None]).sum(axis = 1)
+    np.minimum(bestProducers, bestGoods.shape[1] - 1, out = bestProducers) # floating point overshoot
+    return self.chosen(bestGoods, bestProducers)
+
+
+@register_kernel('nonRoulette')
+class NonRouletteKernel(Kernel):
+  "Deterministic choice of the producer with the highest probability density."
+  def choose(self, goodsDemanded, rouletteSpins):
+    bestGoods, probabilityDensities = self.densities(goodsDemanded)
+    bestProducers = probabilityDensities.argmax(axis = 1)
+    return self.chosen(bestGoods, bestProducers)
+
+
+@register_kernel('nonRouletteTable')
+class BreakpointKernel(Kernel):
+  "nonRoulette decisions looked up in a BreakpointTable built once per trial."
+  def __init__(self, market):
+    if market.stock is not None:
+      raise ValueError("the '" + self.name + "' kernel needs static inventories")
+    Kernel.__init__(self, market)
+    self.table = BreakpointTable(market)
+
+  def choose(self, goodsDemanded, rouletteSpins):
+    return self.table.lookup(goodsDemanded)
+
+  def buy(self, goodsDemanded, rouletteSpins):
+    if self.market.ledger is not None:
+      producers, goods = self.chooseChunks(goodsDemanded, rouletteSpins)
+      self.record(np.arange(len(goodsDemanded)), producers, goods, goodsDemanded)
+    if self.chunks == 1:
+      self.table.consumersBuyFrom(goodsDemanded)
+    else:
+      # sales are counts, so adding up the chunks' gives exactly the same profits
+      self.table.credit(sum(map_chunks(lambda part: self.table.segmentSales(goodsDemanded[part]),
+                                       chunk_slices(len(goodsDemanded), self.chunks), self.pool)))
+    return len(goodsDemanded)
+
+  def pricesChanged(self, goods):
+    self.table.update(goods)
+
+  def counts(self, numConsumers):
+    return {'breakpoint_lookups' : numConsumers}
+
+
+class PrunedKernel(Kernel):
+  """
+  Base class of the pruned kernels, mixed in ahead of the kernel whose
+  decisions they make. Each consumer first looks at the WIDTH goods on either
+  side of goodDemanded in a GoodsIndex; consumers whose decision the producers
+  left out could still change look again at four times as many, and those
+  still undecided once the windows get as large as the number of producers are
+  decided by the kernel mixed in, evaluating every producer.
+  """
+  WIDTH = 16
+  #market (Market object)
+  def __init__(self, market):
+    Kernel.__init__(self, market)
+    self.index = GoodsIndex(market)
+    self.tally = {'density_evaluations' : 0, 'index_searches' : 0, 'full_decisions' : 0}
+    self.tallyLock = threading.Lock()
+
+  #densities (Array of floats) - consumers x candidate producers, in producer order, 0 padded
+  #bounds (Array of floats) - most density the producers left out can have in total
+  #rouletteSpins (Array of floats)
+  def pick(self, densities, bounds, rouletteSpins):
+    "Returns whether each consumer's decision is made and the column of the candidate picked."
+    raise NotImplementedError
+
+  def choose(self, goodsDemanded, rouletteSpins):
+    producers = np.full(len(goodsDemanded), -1, dtype = int)
+    goods = np.full(len(goodsDemanded), -1, dtype = int)
+    pending = np.arange(len(goodsDemanded))
+    width = self.WIDTH
+    tally = dict.fromkeys(self.tally, 0)
+    while len(pending) and 2 * width < 4 * len(self.market.getProducers()):
+      consumers, candidates, candidateGoods, radii = self.index.nearest(goodsDemanded[pending], width)
+      bounds = self.index.bound(goodsDemanded[pending], radii)
+      # candidates laid out as a consumers x producers-found matrix
+      counts = np.bincount(consumers, minlength = len(pending))
+      starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+      columns = np.arange(len(consumers)) - starts[consumers]
+      densities = np.zeros((len(pending), max(counts.max(), 1)))
+      densities[consumers, columns] = (1 / (self.market.goodIDs[candidateGoods] - goodsDemanded[pending][consumers])**2) * \
+                                      (1 / self.market.goodPrices[candidateGoods])
+      decided, picked = self.pick(densities, bounds, rouletteSpins[pending])
+      empty = counts == 0
+      decided = np.where(empty, bounds == 0, decided)
+      sold = decided & ~empty
+      chosen = starts[sold] + np.minimum(picked[sold], counts[sold] - 1)
+      producers[pending[sold]] = candidates[chosen]
+      goods[pending[sold]] = candidateGoods[chosen]
+      tally['density_evaluations'] += len(consumers)
+      tally['index_searches'] += len(pending)
+      pending = pending[~decided]
+      width *= 4
+    if len(pending):
+      producers[pending], goods[pending] = super(PrunedKernel, self).choose(goodsDemanded[pending], rouletteSpins[pending])
+      tally['full_decisions'] += len(pending)
+    # chunks on other threads count into the same tally
+    with self.tallyLock:
+      for name, count in tally.items():
+        self.tally[name] += count
+    return producers, goods
+
+  def buy(self, goodsDemanded, rouletteSpins):
+    for name in self.tally:
+      self.tally[name] = 0
+    return Kernel.buy(self, goodsDemanded, rouletteSpins)
+
+  def pricesChanged(self, goods):
+    self.index.update(goods)
+
+  def counts(self, numConsumers):
+    # filled in as every timestep's decisions are made
+    return self.tally
+
+
+@register_kernel('roulettePruned')
+class PrunedRouletteKernel(PrunedKernel, RouletteKernel):
+  """
+  Spins the roulette wheel over the producers near goodDemanded. The producers
+  left out hold no more density than the bound, so they can only move each
+  boundary of the wheel by less than the bound and the spin by a share of it;
+  once the spin lands on the same candidate however they do, the decision is
+  exactly that of roulette.
+  """
+  def pick(self, densities, bounds, rouletteSpins):
+    cumulativeProbabilities = np.cumsum(densities, axis = 1)
+    totals = cumulativeProbabilities[:, -1]
+    rouletteChoices = rouletteSpins * totals
+    picked = (cumulativeProbabilities < rouletteChoices[:, None]).sum(axis = 1)
+    np.minimum(picked, densities.shape[1] - 1, out = picked)
+    rows = np.arange(len(picked))
+    highs = cumulativeProbabilities[rows, picked]
+    lows = highs - densities[rows, picked]
+    # summing the densities in another order than roulette rounds differently
+    margins = 4 * len(self.market.getProducers()) * np.finfo(float).eps * (totals + bounds)
+    with np.errstate(invalid = 'ignore'):
+      decided = ((lows + (1 - rouletteSpins) * bounds + margins < rouletteChoices) &
+                 (rouletteChoices + rouletteSpins * bounds + margins <= highs))
+    return decided, picked
+
+
+@register_kernel('nonRoulettePruned')
+class PrunedNonRouletteKernel(PrunedKernel, NonRouletteKernel):
+  """
+  Picks the producer with the highest probability density among those near
+  goodDemanded once no producer left out can beat it, so the decisions are
+  exactly those of nonRoulette.
+  """
+  def pick(self, densities, bounds, rouletteSpins):
+    picked = densities.argmax(axis = 1)
+    return densities[np.arange(len(picked)), picked] > bounds, picked
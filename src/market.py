@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the Market class imported by validate.py and simulation.py.
+A Market stores the goods of every producer in one flat goodID array and one
+flat price array (16 bytes per good), together with a profits vector and a
+producers x timesteps profit history. Producer and Good objects are thin views
+over these arrays. Inventories are static unless setStock is called, after which
+every good has a stock that sales deplete and production restocks, and a
+StockIndex keeps track of which goods are in stock. Likewise prices are fixed
+unless setPricing is called, after which every timestep's sales of each good
+drive a pricing policy that reprices all of a policy's goods at once. With a
+ledger every sale is recorded.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import numpy as np # numerical functionality
+
+# import custom-made modules
+from good import Goods
+from producer import Producer, closest_indices
+from stock import StockIndex
+from pricing import make_policy
+
+###############################################################################
+# DEFINE MARKET CLASS
+###############################################################################
+
+class Market(object):
+  "Class holding the goods and profits of all producers in contiguous arrays."
+  #producerIDs (Array of strings)
+  #inventorySizes (Array of ints)
+  #goodIDs (Array of floats) - flat, grouped by producer
+  #goodPrices (Array of floats) - flat, grouped by producer
+  #simLength (int)
+  def __init__(self, producerIDs, inventorySizes, goodIDs, goodPrices, simLength):
+    numProducers = len(producerIDs)
+    # offsets[i]:offsets[i + 1] is the slice of producer i's goods
+    self.offsets = np.concatenate(([0], np.cumsum(inventorySizes))).astype(int)
+    # sort every producer's goods by goodID in one pass
+    owners = np.repeat(np.arange(numProducers), inventorySizes)
+    order = np.lexsort((goodIDs, owners))
+    self.goodIDs = np.ascontiguousarray(goodIDs, dtype = float)[order]
+    self.goodPrices = np.ascontiguousarray(goodPrices, dtype = float)[order]
+    # current profits and the per-timestep profit history of each producer
+    self.profits = np.zeros(numProducers)
+    self.profitHistory = np.zeros((numProducers, simLength))
+    # producers are views over their slice of the arrays
+    self.producers = [
+      Producer(producerIDs[i], Goods(self.goodIDs[self.offsets[i]:self.offsets[i + 1]],
+                                     self.goodPrices[self.offsets[i]:self.offsets[i + 1]]),
+               self.profits, i)
+      for i in range(numProducers)
+    ]
+    # static inventories until setStock is called
+    self.stock = None
+    self.stockIndex = None
+    # fixed prices until setPricing is called
+    self.pricing = None
+    self.sales = None
+    # no ledger until setLedger is called
+    self.ledger = None
+
+  #ledger (Ledger object)
+  def setLedger(self, ledger):
+    "Records every sale in ledger."
+    self.ledger = ledger
+    for i, producer in enumerate(self.producers):
+      producer.setLedger(ledger, int(self.offsets[i]))
+
+  #initialStock (Array of floats) - per producer, also the most a good can hold
+  #productionRates (Array of floats) - per producer, units restocked per good per timestep
+  #depletionRates (Array of floats) - per producer, units used up per sale
+  def setStock(self, initialStock, productionRates, depletionRates):
+    "Makes the inventories dynamic, with every good starting fully stocked."
+    sizes = np.diff(self.offsets)
+    self.productionRates = np.array(productionRates, dtype = float)
+    self.depletionRates = np.array(depletionRates, dtype = float)
+    self.capacity = np.repeat(np.array(initialStock, dtype = float), sizes)
+    self.goodProduction = np.repeat(self.productionRates, sizes)
+    self.goodDepletion = np.repeat(self.depletionRates, sizes)
+    self.stock = self.capacity.copy()
+    self.stockIndex = StockIndex(self.goodIDs, self.inStock())
+    for i, producer in enumerate(self.producers):
+      producer.setStock(self.stock[self.offsets[i]:self.offsets[i + 1]], self.stockIndex, self.offsets[i],
+                        self.productionRates, self.depletionRates)
+
+  #pricing (Array of Dictionaries) - per producer pricing policy settings
+  def setPricing(self, pricing):
+    """
+    Makes prices dynamic. Producers with the same policy settings share one
+    policy that reprices all of their goods with one array operation.
+    """
+    self.sales = np.zeros(len(self.goodIDs), dtype = int)
+    self.basePrices = self.goodPrices.copy()
+    groups = dict()
+    for i, settings in enumerate(pricing):
+      groups.setdefault(tuple(sorted(settings.items())), []).append(i)
+    self.pricing = []
+    for settings, members in sorted(groups.items()):
+      policy = make_policy(dict(settings))
+      if policy.needsStock and self.stock is None:
+        raise ValueError("the '" + policy.name + "' pricing policy needs dynamic inventories")
+      if policy.name == 'fixed':
+        continue
+      if len(members) == len(self.producers):
+        goods = slice(None)
+      else:
+        goods = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in members])
+      self.pricing.append((policy, goods))
+    for i, producer in enumerate(self.producers):
+      producer.setPricing(pricing[i], self.sales[self.offsets[i]:self.offsets[i + 1]])
+
+  def reprice(self):
+    """
+    Reprices the goods of every policy from this timestep's sales, starts the
+    next timestep's sales from zero and returns the flat indices of the goods
+    whose price changed. Only the producers owning those goods forget their
+    cached nearest good.
+    """
+    oldPrices = self.goodPrices.copy()
+    for policy, goods in self.pricing:
+      self.goodPrices[goods] = policy.reprice(self, goods)
+    self.sales[...] = 0
+    changed = np.flatnonzero(self.goodPrices != oldPrices)
+    self.clearCaches(changed)
+    return changed
+
+  def inStock(self):
+    "Returns whether each good has enough stock left for another sale."
+    return self.stock >= self.goodDepletion
+
+  #goods (Array of ints) - flat good indices of a timestep's sales in consumer order
+  def deplete(self, goods):
+    """
+    Depletes the stock of the goods sold and returns which sales went through.
+    When more consumers pick a good than it has stock for, the first ones in
+    consumer order get it. Goods that run out are taken out of the stock index.
+    """
+    order = np.argsort(goods, kind = 'mergesort')
+    sortedGoods = goods[order]
+    # rank of each sale among the sales of the same good
+    firsts = np.flatnonzero(np.concatenate(([True], sortedGoods[1:] != sortedGoods[:-1])))
+    groupSizes = np.diff(np.concatenate((firsts, [len(goods)])))
+    ranks = np.arange(len(goods)) - np.repeat(firsts, groupSizes)
+    available = np.floor(self.stock[sortedGoods] / self.goodDepletion[sortedGoods])
+    accepted = np.empty(len(goods), dtype = bool)
+    accepted[order] = ranks < available
+    soldGoods = goods[accepted]
+    np.subtract.at(self.stock, soldGoods, self.goodDepletion[soldGoods])
+    soldGoods = np.unique(soldGoods)
+    soldOut = soldGoods[self.stock[soldGoods] < self.goodDepletion[soldGoods]]
+    if len(soldOut):
+      self.stockIndex.updateMany(soldOut, -1, self.inStock())
+      self.clearCaches(soldOut)
+    return accepted
+
+  def produce(self):
+    "Restocks every good by its producer's production rate, up to its initial stock."
+    wasInStock = self.inStock()
+    np.minimum(self.stock + self.goodProduction, self.capacity, out = self.stock)
+    restocked = np.flatnonzero(self.inStock() & ~wasInStock)
+    if len(restocked):
+      self.stockIndex.updateMany(restocked, 1, self.inStock())
+      self.clearCaches(restocked)
+
+  #goods (Array of ints) - flat indices of the goods that changed, all goods when not given
+  def clearCaches(self, goods = None):
+    "Forgets the cached nearest good of the producers owning goods."
+    owners = range(len(self.producers)) if goods is None else \
+             np.unique(self.offsets.searchsorted(goods, side = 'right') - 1).tolist()
+    for i in owners:
+      self.producers[i].lastDemanded = None
+
+  def getProducers(self):
+    "Returns the Producer views of the market."
+    return self.producers
+
+  def getProfits(self):
+    "Returns a dictionary of each producer's profit history keyed by producerID."
+    return dict((producer.getID(), self.profitHistory[i]) for i, producer in enumerate(self.producers))
+
+  #timestep (int)
+  def snapshot(self, timestep):
+    "Copies the current profits of every producer into the profit history."
+    self.profitHistory[:, timestep] = self.profits
+
+  #goodsDemanded (Array of floats)
+  def getClosestIndices(self, goodsDemanded):
+    """
+    Returns a consumers x producers array of flat indices of each producer's
+    good closest to each goodDemanded, -1 where a producer has nothing in stock.
+    """
+    closest = np.empty((len(goodsDemanded), len(self.producers)), dtype = int)
+    if self.stock is None:
+      for i, producer in enumerate(self.producers):
+        closest[:, i] = producer.getClosestIndices(goodsDemanded) + self.offsets[i]
+      return closest
+    # search each producer's slice of the goods in stock, kept compacted by the stock index
+    inStock, inStockIDs = self.stockIndex.inStockGoods()
+    bounds = inStock.searchsorted(self.offsets).tolist()
+    for i in range(len(self.producers)):
+      first, last = bounds[i], bounds[i + 1]
+      if first == last:
+        closest[:, i] = -1
+      else:
+        closest[:, i] = inStock[first + closest_indices(inStockIDs[first:last], goodsDemanded)]
+    return closest
+
+  def getState(self):
+    "Returns the goods, stock and profits of the market as a dictionary of arrays, for checkpoints."
+    state = {'goodIDs' : self.goodIDs, 'goodPrices' : self.goodPrices,
+             'profits' : self.profits, 'profitHistory' : self.profitHistory}
+    if self.stock is not None:
+      state['stock'] = self.stock
+    return state
+
+  #state (Dictionary of arrays)
+  def setState(self, state):
+    "Copies a state returned by getState back into the market, keeping the Producer views valid."
+    for name in ('goodIDs', 'goodPrices', 'profits', 'profitHistory'):
+      getattr(self, name)[...] = state[name]
+    if self.stock is not None:
+      self.stock[...] = state['stock']
+      self.stockIndex.build(self.inStock())
+    self.clearCaches()
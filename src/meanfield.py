@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the MeanField class used by the "meanfield" engine to
+compute what a trial's producers can expect to earn instead of sampling
+consumers. With static inventories and prices, and goodDemanded uniform on
+[0, 1], a consumer's purchase from each producer has an expected revenue that is
+an integral over goodDemanded. Between consecutive goods and midpoints of any
+producer's goods every producer's closest good is fixed, so the integrand is
+smooth on each such interval. Roulette shares d_p / sum(d) are integrated there
+by adaptive Gauss-Kronrod quadrature, and nonRoulette revenue is exact from the
+segments of a BreakpointTable. The second moments of a consumer's spending give
+the variance of the profits as well.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from breakpoints import BreakpointTable
+
+# 15 point Kronrod rule on [-1, 1] and the 7 point Gauss rule it extends (QUADPACK qk15)
+KRONRODNODES = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                         0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                         0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                         0.207784955007898467600689403773245, 0.0])
+KRONRODWEIGHTS = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                           0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                           0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                           0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+GAUSSWEIGHTS = np.array([0.0, 0.129484966168869693270611432679082, 0.0, 0.279705391489276667901467771423780,
+                         0.0, 0.381830050505118944950369775488975, 0.0, 0.417959183673469387755102040816327])
+NODES = np.concatenate((-KRONRODNODES[:-1], KRONRODNODES[::-1]))
+KWEIGHTS = np.concatenate((KRONRODWEIGHTS[:-1], KRONRODWEIGHTS[::-1]))
+GWEIGHTS = np.concatenate((GAUSSWEIGHTS[:-1], GAUSSWEIGHTS[::-1]))
+# times an interval is halved at most
+MAXDEPTH = 30
+# interval x node x producer values evaluated at once
+BLOCK = 2**20
+
+###############################################################################
+# DEFINE MEAN FIELD CLASS
+###############################################################################
+
+class MeanField(object):
+  "Expected sales and spending of a consumer at every producer of a static Market."
+  #market (Market object)
+  #tolerance (float) - absolute error allowed in a consumer's expected spending
+  def __init__(self, market, tolerance = 1e-8):
+    self.market = market
+    self.tolerance = tolerance
+    self.evaluations = 0
+
+  #buyingDecision (str) - 'roulette' or 'nonRoulette'
+  def expected(self, buyingDecision):
+    """
+    Returns a dictionary of Arrays over producers of the probability that a
+    consumer buys from each producer ('sales') and the mean ('revenue') and
+    second moment ('square') of what the consumer spends there.
+    """
+    shares, goods = self.roulette() if buyingDecision == 'roulette' else self.nonRoulette()
+    prices = self.market.goodPrices[goods]
+    return {'sales' : shares.sum(axis = 0), 'revenue' : (shares * prices).sum(axis = 0),
+            'square' : (shares * prices**2).sum(axis = 0)}
+
+  def nonRoulette(self):
+    """
+    Returns the length of every segment of a BreakpointTable as the share of
+    its winner, along with the goods sold, as segments x producers Arrays.
+    """
+    table = BreakpointTable(self.market)
+    lengths = np.diff(np.append(table.starts, 1.0))
+    shares = np.zeros((len(lengths), len(self.market.getProducers())))
+    shares[np.arange(len(lengths)), table.segmentWinners] = lengths
+    goods = np.zeros(shares.shape, dtype = int)
+    goods[np.arange(len(lengths)), table.segmentWinners] = table.segmentGoods
+    self.evaluations += len(lengths)
+    return shares, goods
+
+  def roulette(self):
+    """
+    Returns the integral of every producer's roulette share over every
+    interval on which the closest goods are fixed, and those closest goods, as
+    intervals x producers Arrays. Intervals whose Kronrod and Gauss estimates
+    of the spending differ by more than their length's part of the tolerance
+    are halved until they agree.
+    """
+    market = self.market
+    midpoints = [(producer.goodIDs[1:] + producer.goodIDs[:-1]) / 2 for producer in market.getProducers()]
+    edges = np.unique(np.concatenate([[0.0, 1.0], market.goodIDs] + midpoints))
+    edges = edges[(edges >= 0) & (edges <= 1)]
+    lows, highs = edges[:-1], edges[1:]
+    closest = market.getClosestIndices((lows + highs) / 2)
+    shares, goods = [], []
+    for depth in range(MAXDEPTH + 1):
+      kronrod, gauss = self.integrate(lows, highs, closest)
+      prices = market.goodPrices[closest]
+      done = (np.abs(kronrod - gauss) * prices).sum(axis = 1) <= self.tolerance * (highs - lows)
+      if depth == MAXDEPTH:
+        done[:] = True
+      shares.append(kronrod[done])
+      goods.append(closest[done])
+      lows, highs, closest = lows[~done], highs[~done], closest[~done]
+      if not len(lows):
+        break
+      # halve the rest, each half keeping the closest goods of the whole
+      middles = (lows + highs) / 2
+      lows, highs = np.concatenate((lows, middles)), np.concatenate((middles, highs))
+      closest = np.concatenate((closest, closest))
+    return np.concatenate(shares), np.concatenate(goods)
+
+  #lows (Array of floats)
+  #highs (Array of floats)
+  #closest (Array of ints) - intervals x producers closest goods
+  def integrate(self, lows, highs, closest):
+    "Returns the Kronrod and Gauss estimates of every producer's share integrated over every interval."
+    market = self.market
+    kronrod = np.empty(closest.shape)
+    gauss = np.empty(closest.shape)
+    rows = max(BLOCK // (len(NODES) * closest.shape[1]), 1)
+    for start in range(0, len(lows), rows):
+      part = slice(start, start + rows)
+      centers, halfWidths = (lows[part] + highs[part]) / 2, (highs[part] - lows[part]) / 2
+      goodsDemanded = centers[:, None] + halfWidths[:, None] * NODES
+      goodIDs, prices = market.goodIDs[closest[part]], market.goodPrices[closest[part]]
+      # shares d_p / sum(d) with d = 1/((m-t)^2 c), scaled by the largest d so nothing overflows
+      inverses = prices[:, None, :] * (goodIDs[:, None, :] - goodsDemanded[:, :, None])**2
+      with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        densities = inverses.min(axis = 2)[:, :, None] / inverses
+      densities[np.isnan(densities)] = 1.0 # a goodDemanded right on a good
+      shares = densities / densities.sum(axis = 2)[:, :, None]
+      kronrod[part] = halfWidths[:, None] * np.einsum('inp,n->ip', shares, KWEIGHTS)
+      gauss[part] = halfWidths[:, None] * np.einsum('inp,n->ip', shares, GWEIGHTS)
+      self.evaluations += shares.size
+    return kronrod, gauss
@@ -0,0 +1,738 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the Model class that the Simulation and Validate classes are built on.
+It holds everything the two share: the per-consumer buying decision methods,
+the trial loop, and the run loop that seeds, runs, caches and checkpoints
+trials, writes and plots their results and prints a summary. Subclasses only set
+up their producers with initialize_producers. Batched buying decisions come from
+the kernel registry in kernels.py, so a kernel written once is available to both.
+When a model is given an inventory input, goods have a stock that sales deplete
+and production restocks every timestep, and every buying decision skips goods
+that are out of stock. When it is given a pricing input, pricing policies
+reprice the goods at the end of every timestep from that timestep's sales.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import os                       # for results file names
+import shutil                   # for clearing old ledgers
+import time                     # for timing the simulation
+import random as rd             # random number generator
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from kernels import KERNELS, make_kernel
+from meanfield import MeanField
+from pricing import make_policy
+from runoptions import RunOptions
+from utility.plot import plot, plot_to_file, plot_summary, downsample, start_plotter, stop_plotter
+from utility.file_io import write_json, clear_json_lines, append_json_line
+from utility.file_io import close_profit_cube, open_profit_cube, write_profit_trajectories
+from utility.parallel import master_seed, trial_seeds, trial_rngs, map_trials, start_threads, stop_threads
+from utility.cache import cached_map_trials
+from utility.checkpoint import start_checkpoints, finish_checkpoints, completed_trials, checkpointed_trials
+from utility.checkpoint import save_state, load_state, rng_state, restore_rng
+from utility.profiling import Profiler, NULLPROFILER, profile_call
+from utility.ledger import Ledger, ledger_file, finish_ledger
+from utility.statistics import RunningStats, SequentialStop, wilson_interval, to_json, format_interval
+
+###############################################################################
+# DEFINE MODEL CLASS
+###############################################################################
+
+class Model:
+  "Base class of Simulation and Validate."
+  # name used for cache keys
+  MODEL = 'model'
+  # (setup input, label) pairs printed in the summary
+  SETUPLABELS = [('scenario', 'Scenario')]
+  # buying decision and plotting of runs whose inputs don't give them
+  BUYINGDECISION = 'roulette'
+  PLOTTING = None
+  # static inventories and fixed prices unless a subclass is given inventory and pricing inputs
+  inventory = None
+  pricing = None
+
+
+###############################################################################
+# DECISION MAKING METHODS
+###############################################################################
+
+  #goodDemanded (float)
+  #producer (Producer object)
+  def calcProbDensity(self, producer, goodDemanded):
+    """
+    Calculates the probabilityDensity of buying a good from a producer using
+    the mathematical model for making buying decisions.
+    """
+    bestGood = producer.getClosestTo(producer.getInventory(), goodDemanded)
+    if bestGood is None: # nothing in stock
+      return 0.0
+    probabilityDensity = (1 / (bestGood.getID() - goodDemanded)**2) * (1 / bestGood.getPrice())
+    return probabilityDensity
+
+  #producers (Array of Producers)
+  #goodDemanded (float)
+  #rouletteSpin (float)
+  def rouletteConsumerBuysFrom(self, producers, goodDemanded, rouletteSpin = None):
+    """
+    Uses a simple roulette choice algorithm to add some irrationality to making buying decisions.
+    rouletteSpin is a uniform draw on [0, 1) and is drawn here when not given.
+    Returns whether a sale was made.
+    """
+    #Roulette Wheel Selection
+    producerProbabilities = np.array([self.calcProbDensity(producer, goodDemanded) for producer in producers])
+    sumOfProbabilities = np.ndarray.sum(producerProbabilities)
+    if rouletteSpin is None:
+      rouletteSpin = rd.random()
+    if sumOfProbabilities == 0: # nothing in stock anywhere
+      return False
+    rouletteChoice = rouletteSpin * sumOfProbabilities
+    currentChoice = 0
+    bestProducer = producers[0]
+    for producer, probability in zip(producers, producerProbabilities):
+      currentChoice = currentChoice + probability
+      if(currentChoice >= rouletteChoice):
+        bestProducer = producer
+        break
+    if(currentChoice >= rouletteChoice):
+      bestGood = bestProducer.getClosestTo(bestProducer.getInventory(), goodDemanded)
+      bestProducer.sell(bestGood, bestProducer.getClosestIndexTo(goodDemanded))
+      return True
+    return False
+
+  # the name validate.py has always used
+  roulette = rouletteConsumerBuysFrom
+
+  # producers (Array of Producers)
+  # goodDemanded (float)
+  # rouletteSpin (float) - unused
+  def nonRoulette(self, producers, goodDemanded, rouletteSpin = None):
+    "Buys from the producer with the highest probabilityDensity. Returns whether a sale was made."
+    producerProbabilities = [{
+    "producer"    : producer,
+    "probability" : self.calcProbDensity(producer, goodDemanded)
+    } for producer in producers]
+    maxProbability = max(producerProbabilities, key = lambda key: key['probability'])
+    if maxProbability['probability'] == 0: # nothing in stock anywhere
+      return False
+    bestProducer = maxProbability['producer']
+    bestGood = bestProducer.getClosestTo(bestProducer.getInventory(), goodDemanded)
+    bestProducer.sell(bestGood, bestProducer.getClosestIndexTo(goodDemanded))
+    return True
+
+  # producers (Array of Producers)
+  # goodDemanded (float)
+  # buyingDecision (str)
+  # rouletteSpin (float)
+  def consumerBuysFrom(self, producers, goodDemanded, buyingDecision, rouletteSpin = None):
+    "Makes one consumer's buying decision with the named decision method."
+    if buyingDecision == 'roulette':
+      return self.rouletteConsumerBuysFrom(producers, goodDemanded, rouletteSpin)
+    elif buyingDecision == 'nonRoulette':
+      return self.nonRoulette(producers, goodDemanded, rouletteSpin)
+
+  # buyingDecision (str)
+  # engine (str)
+  def kernelName(self, buyingDecision, engine):
+    """
+    Returns the registered kernel used for buyingDecision with engine, or None
+    for the 'loop' and 'meanfield' engines, raising a ValueError for
+    combinations that don't exist. engine = 'table' is short for the
+    'nonRouletteTable' kernel.
+    """
+    if engine == 'meanfield':
+      if buyingDecision not in ('roulette', 'nonRoulette'):
+        raise ValueError("engine 'meanfield' can only be used with the roulette and nonRoulette buying decisions")
+      if self.inventory or self.pricing:
+        raise ValueError("engine 'meanfield' needs static inventories and fixed prices")
+      return None
+    if engine == 'loop':
+      if buyingDecision not in ('roulette', 'nonRoulette'):
+        raise ValueError("engine 'loop' can only be used with the roulette and nonRoulette buying decisions")
+      return None
+    if engine == 'table':
+      if buyingDecision != 'nonRoulette':
+        raise ValueError("engine 'table' can only be used with the nonRoulette buying decision")
+      return 'nonRouletteTable'
+    if buyingDecision not in KERNELS:
+      raise ValueError("unknown buying decision kernel '" + str(buyingDecision) + "', choose from: " + ", ".join(sorted(KERNELS)))
+    return buyingDecision
+
+  # options (RunOptions object) - resolved for the model
+  def checkOptions(self, options):
+    """
+    Raises a ValueError if the model can't run with the options, so runTrials
+    and WorkQueue.submit fail before any trial runs.
+    """
+    self.kernelName(options.buyingDecision, options.engine)
+    if options.chunks > 1 and options.engine in ('loop', 'meanfield'):
+      raise ValueError("threads and chunks can only be used with the batch and table engines")
+    if options.ledger and options.engine == 'meanfield':
+      raise ValueError("engine 'meanfield' makes no sales to record in a ledger")
+    for settings in (self.pricing or dict()).values():
+      policy = make_policy(settings)
+      if policy.needsStock and not self.inventory:
+        raise ValueError("the '" + policy.name + "' pricing policy needs dynamic inventories")
+
+
+###############################################################################
+# INVENTORY AND PRICING METHODS
+###############################################################################
+
+  # market (Market object)
+  def stockUp(self, market):
+    """
+    Makes the market's inventories dynamic using the inventory input, a dictionary
+    keyed by kind of producer ('factory', 'fabricator') of the initial stock of
+    every good plus optional productionRate (units restocked per good per
+    timestep, default 0) and depletionRate (units used up per sale, default 1).
+    Kinds of producer left out never run out of stock.
+    """
+    rates = [self.inventory.get(producer.getID().split('_')[0], {'stock' : float('inf')})
+             for producer in market.getProducers()]
+    market.setStock([rate['stock'] for rate in rates],
+                    [rate.get('productionRate', 0) for rate in rates],
+                    [rate.get('depletionRate', 1) for rate in rates])
+
+
+  # market (Market object)
+  def priceUp(self, market):
+    """
+    Makes the market's prices dynamic using the pricing input, a dictionary
+    keyed by kind of producer of pricing policy settings: the 'policy' name
+    from pricing.py plus that policy's settings. Kinds of producer left out
+    keep fixed prices.
+    """
+    market.setPricing([self.pricing.get(producer.getID().split('_')[0], {'policy' : 'fixed'})
+                       for producer in market.getProducers()])
+
+
+###############################################################################
+# MONITORSIM METHOD
+###############################################################################
+
+  # record (Dictionary)
+  def monitorSim(self, record):
+    "Outputs results of each individual simulation - for debugging purposes."
+    print "=================================================="
+    print record['producers'][record['winner']]['producerID'] + " Wins!\n"
+    print "Average Good Demanded: " + str(record['average_good_demanded']) + "\n"
+    for producer in record['producers']:
+      print producer['producerID'] + " Profits: " + str(producer['profits'])
+      print producer['producerID'] + " Average Price: " + str(producer['average_price'])
+      print producer['producerID'] + " Average Good Distance: " + str(producer['average_distance'])
+      print ""
+    print "Simulation " + str(record['trial'] + 1) + " took " + str(record['time']) + " seconds to run!"
+    print ""
+
+
+###############################################################################
+# SUMMARY METHODS
+###############################################################################
+
+  # inputs (Dictionary) - contents of an input file
+  def setupFrom(self, inputs):
+    "Returns the keyword arguments of initialize_producers given in an input file."
+    return dict((key, inputs[key]) for key, label in self.SETUPLABELS)
+
+  # record      (Dictionary) - see simulateTrial
+  # wins        (Array of floats or None before the first trial)
+  # profitStats (RunningStats object)
+  # demandStats (RunningStats object)
+  def tallyTrial(self, record, wins, profitStats, demandStats):
+    "Adds a finished trial to the wins and running statistics of a run and returns the wins."
+    if wins is None:
+      wins = np.zeros(len(record['producers']))
+    wins[record['winner']] += 1
+    profitStats.add(np.array([producer['profits'] for producer in record['producers']]))
+    demandCount = self.numConsumers * self.simLength
+    demandStats.merge(RunningStats(demandCount, record['average_good_demanded'],
+                                   (record['good_demanded_variance'] or 0.0) * (demandCount - 1)))
+    return wins
+
+  # producerIDs (Array of str)
+  # wins        (Array of floats)
+  # profitStats (RunningStats object) - final profits of every producer across trials
+  # demandStats (RunningStats object) - goods demanded across all trials
+  # analytic    (bool) - whether the goods demanded were not drawn, see simulateTrial
+  def summaryStatistics(self, producerIDs, wins, profitStats, demandStats, analytic = False):
+    """
+    Returns a JSON serializable summary of a run: the mean of the goods demanded
+    and every producer's final profits with 95% t intervals, and every
+    producer's win rate with its 95% Wilson score interval.
+    """
+    numTrials = profitStats.count
+    profits = profitStats.summary()
+    winLows, winHighs = wilson_interval(wins, numTrials)
+    demand = demandStats.summary()
+    if analytic:
+      # exact values have no sampling error
+      demand.update(analytic = True, ci_low = None, ci_high = None)
+    return {
+      "trials"    : numTrials,
+      "demand"    : demand,
+      "producers" : [{
+        "producerID" : producerID,
+        "wins"       : int(wins[i]),
+        "win_rate"   : {'mean' : float(wins[i] / numTrials), 'ci_low' : to_json(winLows[i]), 'ci_high' : to_json(winHighs[i])},
+        "profits"    : dict((key, value[i] if isinstance(value, list) else value) for key, value in profits.items())
+      } for i, producerID in enumerate(producerIDs)]
+    }
+
+  # setup          (Dictionary) - keyword arguments of initialize_producers
+  # buyingDecision (str)
+  # engine         (str)
+  # seed           (int)
+  # statistics     (Dictionary) - see summaryStatistics
+  # seconds        (float)
+  # stopping       (SequentialStop object)
+  def printResults(self, setup, buyingDecision, engine, seed, statistics, seconds, stopping = None):
+    "Prints the inputs and summary statistics of a run to the console."
+    print "=================================================\n"
+    print "Input parameters were:\n"
+    print "SIMLENGTH = {simLength}\nNUMGOODS = {numGoods}\nNUMCONSUMERS = {numConsumers}".format(
+      simLength      = self.simLength,
+      numGoods       = self.numGoods,
+      numConsumers   = self.numConsumers
+    )
+    print ""
+    for key, label in self.SETUPLABELS:
+      print label + " was: " + setup[key] + "\n"
+    print "Buying decision was: " + buyingDecision + "\n"
+    print "Engine was: " + engine + "\n"
+    print "Master seed was: " + str(seed) + "\n"
+    if stopping is not None:
+      print "Target precision " + str(stopping.targetPrecision) + " of " + stopping.measure + (" was met" if stopping.precise else " was not met") + \
+            " after " + str(stopping.trials) + " of at most " + str(stopping.maxTrials) + " trial(s) and " + str(stopping.looks) + " look(s)\n"
+    print "Results for " + str(statistics['trials']) + " trial(s), with 95% confidence intervals:\n"
+    print "Average good demanded: " + format_interval(statistics['demand']) + \
+          (" (analytic)" if statistics['demand'].get('analytic') else "") + "\n"
+    for producer in statistics['producers']:
+      print producer['producerID'] + " won " + str(producer['wins']) + " time(s), win rate " + \
+            format_interval(producer['win_rate'])
+      print producer['producerID'] + " profits: " + format_interval(producer['profits']) + "\n"
+    print "Trials took " + str(seconds) + " seconds to run!"
+    print ""
+    print "================================================="
+
+
+###############################################################################
+# RUN METHODS
+###############################################################################
+
+  # trial      (int)
+  # seed       (int)
+  # setup      (Dictionary) - keyword arguments of initialize_producers
+  # options    (RunOptions object)
+  # checkpoint (str) - checkpoint file name without extension
+  # profiler   (Profiler object)
+  # ledger     (Ledger object)
+  # antithetic (boolean)
+  def simulateTrial(self, trial, seed, setup, options = None, checkpoint = None, profiler = NULLPROFILER, ledger = None, antithetic = False):
+    """
+    Runs a single simulation whose random numbers all come from seed and returns
+    a JSON serializable record of its results along with the producers x
+    timesteps profit history. Demands and roulette spins are drawn a timestep at
+    a time so every engine consumes the same random numbers. With engine =
+    'loop' consumers decide one at a time, with engine = 'meanfield' every
+    timestep's expected profits are computed by MeanField instead of drawing
+    consumers, and otherwise a whole timestep is decided by a kernel, split
+    into chunks decided on threads threads. When a checkpoint is given the
+    state of the trial is saved to it every checkpointEvery timesteps, and a
+    trial whose checkpoint exists carries on from it. The time spent in each
+    phase and the hot path counts are added to profiler, and every sale is
+    recorded in ledger when one is given. With antithetic = True every uniform
+    draw u - of goods, prices, demands and roulette spins - is replaced by
+    1 - u, making the trial the antithetic twin of the trial with the same seed.
+    """
+    options = (options or RunOptions()).resolved(self)
+    buyingDecision, engine, checkpointEvery = options.buyingDecision, options.engine, options.checkpointEvery
+    kernelName = self.kernelName(buyingDecision, engine)
+
+    # timing how long the simulation takes to run
+    startSim = time.clock()
+
+    # initialize producers, profits
+    with profiler.phase('initialize'):
+      inventoryRng, consumerRng = trial_rngs(seed, antithetic)
+      market = self.initialize_producers(rng = inventoryRng, **setup)
+      producers = market.getProducers()
+      if self.inventory:
+        self.stockUp(market)
+      if self.pricing:
+        self.priceUp(market)
+
+      # pick up from the trial's last checkpoint if there is one
+      firstTimestep, demand = 0, RunningStats() # mean and variance of the goods demanded
+      state = load_state(checkpoint) if checkpoint is not None else None
+      if state is not None:
+        market.setState(state)
+        restore_rng(consumerRng, state)
+        firstTimestep = int(state['timestep'])
+        demand = RunningStats(int(state['demandCount']), float(state['demandMean']), float(state['demandM2']))
+      if ledger is not None:
+        ledger.start(int(state['ledgerRecords']) if state is not None else 0)
+        market.setLedger(ledger)
+
+      if kernelName is not None:
+        kernel = make_kernel(kernelName, market)
+        counts = kernel.counts(self.numConsumers)
+        pool = start_threads(min(options.threads, options.chunks))
+        kernel.setThreads(options.chunks, pool)
+
+    # the meanfield engine credits every timestep's expected profits at once,
+    # so there are no timesteps left to simulate and no goods demanded to
+    # measure: the demand statistics are those of the uniform distribution
+    if engine == 'meanfield':
+      with profiler.phase('meanfield'):
+        meanField = MeanField(market)
+        expected = meanField.expected(buyingDecision)
+        for timestep in range(self.simLength):
+          market.profits += self.numConsumers * expected['revenue']
+          market.snapshot(timestep)
+      profiler.count('density_evaluations', meanField.evaluations)
+      demandCount = self.numConsumers * self.simLength
+      firstTimestep, demand = self.simLength, RunningStats(demandCount, 0.5, (demandCount - 1) / 12)
+
+    # run simulation
+    numDecisions = self.numConsumers * len(producers)
+    for timestep in range(firstTimestep, self.simLength):
+      with profiler.phase('decisions'):
+        timestepDemands = consumerRng.random_sample(self.numConsumers)
+        rouletteSpins = consumerRng.random_sample(self.numConsumers)
+        demand.addBatch(timestepDemands)
+        if ledger is not None:
+          ledger.timestep = timestep
+        if kernelName is not None:
+          sales = kernel.buy(timestepDemands, rouletteSpins)
+        else:
+          sales = 0
+          for consumer, (goodDemanded, rouletteSpin) in enumerate(zip(timestepDemands.tolist(), rouletteSpins.tolist())):
+            if ledger is not None:
+              ledger.consumer, ledger.demanded = consumer, goodDemanded
+            sales += self.consumerBuysFrom(producers, goodDemanded, buyingDecision, rouletteSpin)
+          counts = {'density_evaluations' : numDecisions, 'nearest_good_lookups' : numDecisions + sales}
+        if ledger is not None:
+          ledger.endTimestep()
+      for name, count in counts.items():
+        profiler.count(name, count)
+      profiler.count('sales', sales)
+      with profiler.phase('snapshot'):
+        market.snapshot(timestep)
+      if market.stock is not None:
+        with profiler.phase('production'):
+          market.produce()
+      if market.pricing is not None:
+        with profiler.phase('pricing'):
+          changed = market.reprice()
+          if kernelName is not None and len(changed):
+            kernel.pricesChanged(changed)
+      if checkpoint is not None and checkpointEvery and (timestep + 1) % checkpointEvery == 0 and timestep + 1 < self.simLength:
+        with profiler.phase('checkpoint'):
+          state = dict(market.getState(), timestep = timestep + 1, demandCount = demand.count,
+                       demandMean = demand.mean, demandM2 = demand.m2, **rng_state(consumerRng))
+          if ledger is not None:
+            ledger.flush()
+            state['ledgerRecords'] = ledger.count
+          save_state(checkpoint, state)
+
+    if ledger is not None:
+      ledger.close()
+    if kernelName is not None:
+      stop_threads(pool)
+
+    # the average good demanded
+    averageGoodDemanded = demand.mean
+
+    # timing how long the simulation takes to run
+    endSim = time.clock()
+
+    # prepare data to be written to file in JSON format
+    record = {
+      "trial"                  : trial,
+      "seed"                   : seed,
+      "winner"                 : int(market.profitHistory.sum(axis = 1).argmax()),
+      "average_good_demanded"  : float(averageGoodDemanded),
+      "good_demanded_variance" : to_json(demand.variance()),
+      "time"                   : endSim - startSim,
+      "producers"              : [{
+        "producerID"       : producer.getID(),
+        "profits"          : float(producer.getProfits()),
+        "average_price"    : float(producer.getAverageGoodPrice()),
+        "average_distance" : float(abs(producer.getAverageGoodID() - averageGoodDemanded))
+      } for producer in producers]
+    }
+    if engine == 'meanfield':
+      record['demand_analytic'] = True
+      # every consumer of every timestep spends independently
+      variances = self.numConsumers * self.simLength * (expected['square'] - expected['revenue']**2)
+      for entry, variance, sales in zip(record['producers'], variances, expected['sales']):
+        entry['profits_variance'] = float(variance)
+        entry['expected_sales'] = float(sales * self.numConsumers * self.simLength)
+    if market.stock is not None:
+      for entry, producer in zip(record['producers'], producers):
+        entry['goods_in_stock'] = int((producer.stock >= producer.depletionRate).sum())
+    return record, market.profitHistory
+
+  # numTrials  (int)
+  # setup      (Dictionary) - keyword arguments of initialize_producers
+  # outputFile (str)
+  # options    (RunOptions object)
+  # monitor    (boolean)
+  # progress   (function)
+  def runTrials(self, numTrials, setup, outputFile, options = None, monitor = False, progress = None):
+    """
+    Runs numTrials trials with the options given, writes their results to an
+    output file in JSON format, plots them and prints the results of all trials
+    to the console. If monitor = True the results of each individual trial are
+    printed as well. Trials are seeded from the master seed and run on a pool
+    of workers processes when workers > 1; the results are the same for any
+    number of workers. Finished trials can be cached and running ones
+    checkpointed, and with a targetPrecision numTrials is only the most trials
+    to run (see SequentialStop in utility/statistics.py). progress, if given,
+    is called with the number of trials finished and numTrials after every
+    trial. The summary statistics are returned. The README describes every
+    option.
+    """
+    options = (options or RunOptions()).resolved(self)
+    buyingDecision, engine, seed = options.buyingDecision, options.engine, options.seed
+    self.checkOptions(options)
+    stopping = SequentialStop(options.targetPrecision, options.precisionOf, options.minTrials,
+                              numTrials) if options.targetPrecision else None
+
+    # let user know simulation has started running
+    print "Running..."
+    print ""
+
+    # timing how long the trials take to run
+    startTrial = time.time()
+
+    # derive the seed of every trial from the master seed
+    # (a resumed run keeps the master seed it started with)
+    if seed is None:
+      seed = master_seed()
+    checkpointing = options.checkpointEvery > 0 or options.resume
+    if checkpointing:
+      checkpointDirectory = '../checkpoints/' + os.path.splitext(outputFile)[0]
+      seed = start_checkpoints(checkpointDirectory, {"seed" : seed}, options.resume)['seed']
+    keepHistory = options.saveProfits or options.plotting == 'file'
+
+    # time the phases of the run and collect those of the trials when profiling
+    profiler = Profiler() if options.profile else NULLPROFILER
+    trialProfiler = Profiler() if options.profile else NULLPROFILER
+    trialReports = []
+    profileName = '../results/' + os.path.splitext(outputFile)[0] + '_profile'
+    if options.profile == 'cprofile' and not os.path.exists(profileName):
+      os.makedirs(profileName)
+
+    # start a fresh ledger unless carrying on with a stopped run
+    if options.ledger:
+      ledgerDirectory = '../results/' + os.path.splitext(outputFile)[0] + '_ledger'
+      if os.path.exists(ledgerDirectory) and not options.resume:
+        shutil.rmtree(ledgerDirectory)
+      if not os.path.exists(ledgerDirectory):
+        os.makedirs(ledgerDirectory)
+
+    # the files every trial writes besides its results
+    files = [{
+      "checkpoint" : os.path.join(checkpointDirectory, 'trial_' + str(trial)) if checkpointing else None,
+      "statsFile"  : os.path.join(profileName, 'trial_' + str(trial) + '.prof') if options.profile == 'cprofile' else None,
+      "ledger"     : ledger_file(ledgerDirectory, trial) if options.ledger else None
+    } for trial in range(numTrials)]
+    tasks = [(self, trial, trialSeed, setup, options, files[trial])
+             for trial, trialSeed in enumerate(trial_seeds(seed, numTrials))]
+
+    # start a fresh results file when streaming records
+    if options.output == 'ndjson':
+      clear_json_lines('../results/' + outputFile)
+
+    # memory-mapped trials x producers x timesteps profits
+    if options.saveProfits:
+      profitsFile = '../results/' + os.path.splitext(outputFile)[0] + '_profits'
+      profitCube, profitTrials = None, []
+
+    # start rendering figures in the background when plotting to files
+    if options.plotting == 'file':
+      plotsDirectory = '../results/' + os.path.splitext(outputFile)[0] + '_plots'
+      plotter = start_plotter(plotsDirectory)
+      plotJobs = []
+      finalProfits = []
+      trajectorySum = None
+
+    # initialize data structures for trials
+    producerData = dict()
+    wins = None
+    profitStats = RunningStats() # final profits of every producer across trials
+    demandStats = RunningStats() # goods demanded across all trials
+
+    # run the trials, skipping those that are already finished or cached
+    completed = completed_trials(checkpointDirectory, keepHistory) if checkpointing else dict()
+    if completed:
+      print "Resuming with " + str(len(completed)) + " of " + str(numTrials) + " trial(s) already finished\n"
+    # with a target precision the trials run a batch at a time until it is met
+    trialsRun = 0
+    while trialsRun < numTrials:
+      batch = tasks[trialsRun:numTrials if stopping is None else stopping.nextLook(trialsRun, options.workers)]
+      remaining = [task for task in batch if task[1] not in completed]
+      if options.cache and not options.ledger:
+        parameters = dict(vars(self), model = self.MODEL, buyingDecision = buyingDecision, engine = engine, **setup)
+        if options.chunks > 1:
+          parameters['chunks'] = options.chunks
+        trials = cached_map_trials(run_trial, remaining, parameters, '../cache', options.cacheSize * 2**20, options.workers,
+                                   needHistory = keepHistory)
+      else:
+        trials = map_trials(run_trial, remaining, options.workers)
+      if checkpointing:
+        trials = checkpointed_trials(checkpointDirectory, batch, completed, trials)
+
+      for record, profitHistory in trials:
+
+        # collect the profile of the trial - cached and resumed trials have none
+        trialReport = record.pop('profile', None)
+        if trialReport is not None:
+          trialProfiler.merge(trialReport)
+          trialReports.append(dict(trialReport, trial = record['trial']))
+
+        with profiler.phase('writing'):
+          # write the profit trajectories of the trial
+          if options.saveProfits:
+            if profitCube is None:
+              profitCube = open_profit_cube(profitsFile, {
+                "numTrials"   : numTrials,
+                "producerIDs" : [producer['producerID'] for producer in record['producers']],
+                "simLength"   : self.simLength,
+                "seed"        : seed
+              })
+            write_profit_trajectories(profitCube, record['trial'], profitHistory)
+            profitTrials.append(record['trial'])
+
+          # stream the record to file or keep it until all trials are done
+          if options.output == 'ndjson':
+            append_json_line('../results/' + outputFile, record)
+          else:
+            producerData["simulation_" + str(record['trial'] + 1)] = record['producers']
+
+        # add a win to the producer with the most profits
+        wins = self.tallyTrial(record, wins, profitStats, demandStats)
+
+        # output simulation results if monitoring is turned on
+        if monitor == True:
+          self.monitorSim(record)
+        if progress is not None:
+          progress(profitStats.count, numTrials)
+
+        # plot results
+        with profiler.phase('plotting'):
+          if options.plotting == 'show':
+            plot(record['producers'])
+          elif options.plotting == 'file':
+            plotJobs.append(plotter.apply_async(plot_to_file, (record['producers'],
+              os.path.join(plotsDirectory, 'simulation_' + str(record['trial'] + 1) + '.png'))))
+            finalProfits.append([producer['profits'] for producer in record['producers']])
+            timesteps, trajectories = downsample(profitHistory)
+            trajectorySum = trajectories if trajectorySum is None else trajectorySum + trajectories
+
+      trialsRun += len(batch)
+      if stopping is not None and stopping.look(wins, profitStats):
+        break
+
+    # timing how long the trials take to run
+    endTrial = time.time()
+
+    # summary statistics with 95% confidence intervals
+    producerIDs = [producer['producerID'] for producer in record['producers']]
+    statistics = self.summaryStatistics(producerIDs, wins, profitStats, demandStats, options.engine == 'meanfield')
+    if stopping is not None:
+      statistics['stopping'] = stopping.summary()
+
+    # write data to file in JSON format
+    with profiler.phase('writing'):
+      if options.output != 'ndjson':
+        write_json('../results/' + outputFile, producerData)
+      write_json('../results/' + os.path.splitext(outputFile)[0] + '_summary.json', statistics)
+      if options.saveProfits and profitCube is not None:
+        close_profit_cube(profitsFile, profitCube, profitTrials)
+      if options.ledger:
+        finish_ledger(ledgerDirectory, {
+          "numTrials"   : numTrials,
+          "producerIDs" : [producer['producerID'] for producer in record['producers']],
+          "simLength"   : self.simLength,
+          "seed"        : seed
+        })
+    if checkpointing:
+      finish_checkpoints(checkpointDirectory)
+
+    # render the summary figure and wait for the background plots
+    if options.plotting == 'file':
+      with profiler.phase('plotting'):
+        plotJobs.append(plotter.apply_async(plot_summary, (
+          producerIDs, wins, finalProfits, timesteps, trajectorySum / len(finalProfits),
+          os.path.join(plotsDirectory, 'summary.png'), statistics)))
+        stop_plotter(plotter, plotJobs)
+
+    # write the profiling report next to the results
+    if options.profile:
+      runReport = profiler.report()
+      runReport['phases']['trials'] = endTrial - startTrial
+      runReport['phases']['total'] = time.time() - startTrial
+      write_json(profileName + '.json', {
+        "engine"    : engine,
+        "workers"   : options.workers,
+        "run"       : runReport,
+        "trials"    : trialProfiler.report(),
+        "per_trial" : sorted(trialReports, key = lambda report: report['trial'])
+      })
+
+    # print the results of trial runs to console
+    self.printResults(setup, buyingDecision, engine, seed, statistics, endTrial - startTrial, stopping)
+    return statistics
+
+
+###############################################################################
+# TRIAL WORKER
+###############################################################################
+
+# task (Tuple of Model, trial, seed, setup, RunOptions, files)
+def run_trial(task):
+  """
+  Runs one trial of a task tuple - module level so worker processes can unpickle
+  it. files holds the trial's checkpoint, cProfile statistics and ledger file
+  names, each None when not wanted. The profit history is only sent back when
+  it is going to be saved or plotted. When profiling, the trial's profile is
+  added to its record.
+  """
+  model, trial, seed, setup, options, files = task
+  profiler = Profiler() if options.profile else NULLPROFILER
+  ledger = Ledger(files['ledger'], trial, int(options.ledgerBudget * 2**20)) if files['ledger'] is not None else None
+  arguments = (trial, seed, setup, options, files['checkpoint'], profiler, ledger)
+  if files['statsFile'] is not None:
+    record, profitHistory = profile_call(files['statsFile'], model.simulateTrial, *arguments)
+  else:
+    record, profitHistory = model.simulateTrial(*arguments)
+  if options.profile:
+    record['profile'] = profiler.report()
+  keepHistory = options.saveProfits or options.plotting == 'file'
+  return record, (profitHistory if keepHistory else None)
+
+
+###############################################################################
+# INPUT FILE OPTIONS
+###############################################################################
+
+# optional inputs read into RunOptions
+OPTIONS = sorted(set(RunOptions.DEFAULTS) - set(['resume']))
+
+# inputs (Dictionary)
+# arguments (Array of str) - command-line arguments after the input file
+def run_options(inputs, arguments = ()):
+  "Returns the RunOptions given by the optional inputs of an input file and the command line."
+  return RunOptions(resume = '--resume' in arguments, **dict((key, inputs[key]) for key in OPTIONS if key in inputs))
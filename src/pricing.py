@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the registry of dynamic pricing policies used by the Market.
+A policy is built once per trial from its settings and, at the end of every
+timestep, reprices all the goods of the producers using it with one array
+operation, driven by how many of each good sold that timestep. New policies are
+added with the register_policy decorator and picked by name with the pricing
+input.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import numpy as np              # numerical functionality
+
+###############################################################################
+# POLICY REGISTRY
+###############################################################################
+
+POLICIES = dict()
+
+# name (str)
+def register_policy(name):
+  "Class decorator adding a pricing policy class to the registry under name."
+  def register(policyClass):
+    policyClass.name = name
+    POLICIES[name] = policyClass
+    return policyClass
+  return register
+
+# settings (Dictionary) - 'policy' name plus the policy's own settings
+def make_policy(settings):
+  "Returns the pricing policy named in settings built with the rest of settings."
+  settings = dict(settings)
+  name = settings.pop('policy', 'fixed')
+  if name not in POLICIES:
+    raise ValueError("unknown pricing policy '" + str(name) + "', choose from: " + ", ".join(sorted(POLICIES)))
+  return POLICIES[name](**settings)
+
+###############################################################################
+# DEFINE POLICY CLASSES
+###############################################################################
+
+class Policy(object):
+  "Base class of the pricing policies."
+  # policies that price from the stock can only be used with dynamic inventories
+  needsStock = False
+  #minPrice (float)
+  #maxPrice (float)
+  def __init__(self, minPrice = 0.01, maxPrice = 2.0):
+    self.minPrice = minPrice
+    self.maxPrice = maxPrice
+
+  #market (Market object)
+  #goods (slice or Array of ints) - flat indices of the goods the policy prices
+  def reprice(self, market, goods):
+    "Returns the new prices of goods, clipped to [minPrice, maxPrice]."
+    return np.clip(self.prices(market, goods), self.minPrice, self.maxPrice)
+
+  #market (Market object)
+  #goods (slice or Array of ints)
+  def prices(self, market, goods):
+    "Returns the new prices of goods."
+    raise NotImplementedError
+
+
+@register_policy('fixed')
+class FixedPolicy(Policy):
+  "Prices never change."
+  def reprice(self, market, goods):
+    return market.goodPrices[goods]
+
+
+@register_policy('demand')
+class DemandPolicy(Policy):
+  """
+  Goods that sold more than target units in the timestep get rate more
+  expensive and goods that sold fewer get rate cheaper.
+  """
+  #rate (float)
+  #target (float)
+  def __init__(self, rate = 0.05, target = 1, **limits):
+    Policy.__init__(self, **limits)
+    self.rate = rate
+    self.target = target
+
+  def prices(self, market, goods):
+    sales = market.sales[goods]
+    return market.goodPrices[goods] * (1 + self.rate * np.sign(sales - self.target))
+
+
+@register_policy('scarcity')
+class ScarcityPolicy(Policy):
+  """
+  Goods get more expensive as their stock runs down: an empty good costs rate
+  times more than its starting price. Needs dynamic inventories.
+  """
+  needsStock = True
+  #rate (float)
+  def __init__(self, rate = 1.0, **limits):
+    Policy.__init__(self, **limits)
+    self.rate = rate
+
+  def prices(self, market, goods):
+    capacity = market.capacity[goods]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+      shortage = np.where(np.isinf(capacity), 0, 1 - market.stock[goods] / capacity)
+    return market.basePrices[goods] * (1 + self.rate * shortage)
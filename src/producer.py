@@ -6,25 +6,109 @@
 
 """
 This file contains the Producer class imported by validate.py and simulation.py
-in order to instantiate Producer objects.
+in order to instantiate Producer objects. A Producer can either own its
+inventory or be a view over a slice of a Market's arrays. When the Market's
+inventories are dynamic a Producer also sees its slice of the stock array, and
+out-of-stock goods are skipped by its nearest-good lookups. With dynamic prices
+it counts its sales of every good for its pricing policy, and with a ledger it
+records every sale.
 """
 
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import numpy as np # numerical functionality
+
+# import custom-made modules
+from good import Goods
+
 ###############################################################################
 # DEFINE PRODUCER CLASS
 ###############################################################################
 
-class Producer:
+class Producer(object):
   "Class for producer objects."
-  #inventory (Array of Goods)
+  __slots__ = ('producerID', 'inventory', 'goodIDs', 'goodPrices', 'profitsArray',
+               'index', 'lastDemanded', 'lastClosest', 'lastIndex', 'stock', 'stockIndex', 'offset',
+               'productionRates', 'depletionRates', 'pricing', 'sales', 'ledger')
+  #inventory (Array of Goods or Goods object)
+  #profitsArray (Array of floats)
+  #index (int)
   #rate (int)
   #id (string)
-  def __init__(self, idInput, inventoryInput):
-    # set the inventory - made up of an array of Good objects
+  def __init__(self, idInput, inventoryInput, profitsArray = None, index = 0):
+    # set the inventory - a Goods view over goodID and price arrays sorted by goodID
+    if not isinstance(inventoryInput, Goods):
+      inventoryInput = sorted(inventoryInput, key = lambda good: good.getID())
+      inventoryInput = Goods(np.array([good.getID() for good in inventoryInput]),
+                             np.array([good.getPrice() for good in inventoryInput]))
     self.inventory = inventoryInput
+    # sorted goodID index used for O(log n) nearest-good lookups
+    self.goodIDs = self.inventory.goodIDs
+    # prices aligned with goodIDs for vectorized buying decisions
+    self.goodPrices = self.inventory.goodPrices
+    # nearest-good cache so each demand is only looked up once per producer
+    self.lastDemanded = None
+    self.lastClosest = None
+    self.lastIndex = -1
     # set producerID to easily distinguish producers
     self.producerID = idInput
-    # set initial profits to zero
-    self.profits = 0
+    # set initial profits to zero - stored in a (possibly shared) profits vector
+    if profitsArray is None:
+      profitsArray = np.zeros(1)
+    self.profitsArray = profitsArray
+    self.index = index
+    # static inventory until setStock is called
+    self.stock = None
+    self.stockIndex = None
+    self.offset = 0
+    # fixed prices until setPricing is called
+    self.pricing = None
+    self.sales = None
+    # no ledger until setLedger is called
+    self.ledger = None
+
+  #stock (Array of floats) - units in stock of each good
+  #stockIndex (StockIndex object) - shared with the Market
+  #offset (int) - flat index of the producer's first good in stockIndex
+  #productionRates (Array of floats) - shared per producer rates
+  #depletionRates (Array of floats) - shared per producer rates
+  def setStock(self, stock, stockIndex, offset, productionRates, depletionRates):
+    "Makes the producer's inventory dynamic."
+    self.stock = stock
+    self.stockIndex = stockIndex
+    self.offset = offset
+    self.productionRates = productionRates
+    self.depletionRates = depletionRates
+    self.lastDemanded = None
+
+  #pricing (Dictionary) - pricing policy settings, see pricing.py
+  #sales (Array of ints) - this timestep's sales of each good
+  def setPricing(self, pricing, sales):
+    "Makes the producer's prices dynamic."
+    self.pricing = pricing
+    self.sales = sales
+
+  #ledger (Ledger object)
+  #offset (int) - flat index of the producer's first good
+  def setLedger(self, ledger, offset):
+    "Records the producer's sales in ledger."
+    self.ledger = ledger
+    self.offset = offset
+
+  def _getProfits(self):
+    return self.profitsArray[self.index]
+
+  def _setProfits(self, value):
+    self.profitsArray[self.index] = value
+
+  profits = property(_getProfits, _setProfits)
+
+  # units of every good restocked per timestep
+  productionRate = property(lambda self: self.productionRates[self.index])
+  # units of a good used up per sale
+  depletionRate = property(lambda self: self.depletionRates[self.index])
 
   def getID(self):
     "Returns the unique producerID."
@@ -40,24 +124,85 @@ class Producer:
 
   def getAverageGoodPrice(self):
     "Returns the average price of the goods in a producer's inventory."
-    prices = [good.getPrice() for good in self.getInventory()]
-    return sum(prices) / len(self.getInventory())
+    return self.goodPrices.mean()
 
   def getAverageGoodID(self):
     "Returns the average goodID of the goods in a producer's inventory."
-    ids = [good.getID() for good in self.getInventory()]
-    return sum(ids) / len(self.getInventory())
+    return self.goodIDs.mean()
 
   #currentGoods (Array of Goods)
   #goodDemanded (float)
   def getClosestTo(self, currentGoods, goodDemanded):
-    """Returns the good with the goodID closest to the goodDemanded by a consumer."""
-    return min(currentGoods, key = lambda good: abs(goodDemanded - good.getID()))
+    """
+    Returns the good with the goodID closest to the goodDemanded by a consumer.
+    Lookups against the producer's own inventory use the sorted goodID index
+    and are cached per goodDemanded. Returns None when nothing is in stock.
+    """
+    if currentGoods is not self.inventory:
+      return min(currentGoods, key = lambda good: abs(goodDemanded - good.getID()))
+    if goodDemanded != self.lastDemanded:
+      self.lastDemanded = goodDemanded
+      i = self.getClosestIndex(goodDemanded)
+      self.lastClosest = self.inventory[i] if i >= 0 else None
+      self.lastIndex = i
+    return self.lastClosest
+
+  #goodDemanded (float)
+  def getClosestIndexTo(self, goodDemanded):
+    """
+    Returns the inventory index of the good getClosestTo returns for the
+    goodDemanded, or -1, sharing its cache.
+    """
+    self.getClosestTo(self.inventory, goodDemanded)
+    return self.lastIndex
+
+  #goodDemanded (float)
+  def getClosestIndex(self, goodDemanded):
+    """Returns the inventory index of the in-stock good closest to the goodDemanded, or -1."""
+    i = int(self.goodIDs.searchsorted(goodDemanded))
+    if self.stockIndex is not None:
+      closest = self.stockIndex.nearest(self.offset, self.offset + len(self.goodIDs), self.offset + i, goodDemanded)
+      return closest - self.offset if closest >= 0 else -1
+    if i == len(self.goodIDs):
+      return i - 1
+    if i > 0 and goodDemanded - self.goodIDs[i - 1] <= self.goodIDs[i] - goodDemanded:
+      return i - 1
+    return i
+
+  #goodsDemanded (Array of floats)
+  def getClosestIndices(self, goodsDemanded):
+    """Vectorized getClosestIndex returning an inventory index per goodDemanded."""
+    if self.stock is None:
+      return closest_indices(self.goodIDs, goodsDemanded)
+    inStock = np.flatnonzero(self.stock >= self.depletionRates[self.index])
+    if not len(inStock):
+      return np.full(len(goodsDemanded), -1, dtype = int)
+    return inStock[closest_indices(self.goodIDs[inStock], goodsDemanded)]
 
   #good (Good object)
-  def sell(self, good):
-    """Updates the producer's profits by the price of the good being sold to a consumer."""
-    if good in self.getInventory():
+  #i (int) - inventory index of the good, found from its goodID when not given
+  def sell(self, good, i = None):
+    """
+    Updates the producer's profits by the price of the good being sold to a
+    consumer. With a dynamic inventory the good must be in stock and the sale
+    depletes it, taking it out of the stock index when it runs out. Goods can
+    share a goodID, so buying decisions pass the index of the good they chose.
+    """
+    if i is None:
+      i = self.goodIDs.searchsorted(good.getID())
+    if i < len(self.goodIDs) and self.goodIDs[i] == good.getID():
+      if self.stock is not None:
+        depletionRate = self.depletionRates[self.index]
+        if self.stock[i] < depletionRate:
+          return
+        self.stock[i] -= depletionRate
+        if self.stock[i] < depletionRate:
+          self.stockIndex.update(self.offset + i, -1)
+          self.lastDemanded = None
+      if self.sales is not None:
+        self.sales[i] += 1
+      if self.ledger is not None:
+        self.ledger.sell(self.index, self.offset + int(i), good.getPrice(), good.getID())
       self.profits = self.profits + good.getPrice()
 
   def __repr__(self):
@@ -66,4 +211,18 @@ class Producer:
 
   def __str__(self):
     """Returns string representation of the instance."""
-    return "Producer ID: %r\n %r" % (self.getID(), self.getInventory())
\ No newline at end of file
+    return "Producer ID: %r\n %r" % (self.getID(), self.getInventory())
+
+
+###############################################################################
+# HELPER METHODS
+###############################################################################
+
+# goodIDs (Array of floats) - sorted
+# goodsDemanded (Array of floats)
+def closest_indices(goodIDs, goodsDemanded):
+  "Returns the index into goodIDs of the goodID closest to each goodDemanded, ties going left."
+  right = np.minimum(goodIDs.searchsorted(goodsDemanded), len(goodIDs) - 1)
+  left = np.maximum(right - 1, 0)
+  useLeft = goodsDemanded - goodIDs[left] <= goodIDs[right] - goodsDemanded
+  return np.where(useLeft, left, right)
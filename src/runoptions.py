@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the RunOptions class holding the optional inputs of a run of
+trials - how decisions are made, how trials are run and what is written - so
+Model.runTrials, Model.simulateTrial and the workers running trials all take
+one object instead of a long list of arguments. run_options in model.py reads
+them from an input file; every option left out takes its default below, or
+the model's for the buying decision and plotting. The README describes every
+option.
+"""
+
+###############################################################################
+# DEFINE RUN OPTIONS CLASS
+###############################################################################
+
+class RunOptions(object):
+  "Class holding the options of a run of trials."
+  DEFAULTS = {
+    'buyingDecision'  : None,       # the model's BUYINGDECISION when not given, see resolved
+    'engine'          : 'loop',     # 'loop', 'batch', 'table' or 'meanfield'
+    'workers'         : 1,          # processes running trials
+    'seed'            : None,       # master seed, drawn when None
+    'output'          : 'json',     # 'json' or 'ndjson'
+    'saveProfits'     : False,      # profit trajectories in results/<name>_profits.npy
+    'plotting'        : None,       # the model's PLOTTING when not given, 'show', 'file' or None
+    'cache'           : False,      # read and write trials in ../cache
+    'cacheSize'       : 1024,       # megabytes
+    'checkpointEvery' : 0,          # timesteps between checkpoints of a trial, 0 for none
+    'resume'          : False,      # carry on from the checkpoints of a stopped run
+    'profile'         : False,      # True or 'cprofile'
+    'ledger'          : False,      # record every sale in results/<name>_ledger
+    'ledgerBudget'    : 64,         # megabytes of sales kept in memory per trial
+    'targetPrecision' : None,       # confidence interval half width to stop at
+    'precisionOf'     : 'win_rate', # 'win_rate' or 'profits'
+    'minTrials'       : 10,         # trials before the first look at the precision
+    'threads'         : 1,          # threads deciding the consumers of a trial
+    'chunks'          : None        # chunks of consumers per timestep, threads when None
+  }
+  #options (keyword arguments) - any of DEFAULTS
+  def __init__(self, **options):
+    unknown = sorted(set(options) - set(self.DEFAULTS))
+    if unknown:
+      raise TypeError("unknown run option(s): " + ", ".join(unknown))
+    self.__dict__.update(self.DEFAULTS)
+    self.__dict__.update(options)
+    # names of the options given rather than defaulted
+    self.given = frozenset(options)
+
+  #options (keyword arguments) - any of DEFAULTS
+  def replace(self, **options):
+    "Returns a copy of the options with some of them changed."
+    changed = dict((key, getattr(self, key)) for key in self.given)
+    changed.update(options)
+    return RunOptions(**changed)
+
+  #model (Model object)
+  def resolved(self, model):
+    """
+    Returns a copy of the options with the defaults that depend on the model
+    filled in: its buying decision and plotting unless they were given, and as
+    many chunks as threads.
+    """
+    defaults = {'buyingDecision' : model.BUYINGDECISION, 'plotting' : model.PLOTTING}
+    resolved = dict((key, value) for key, value in defaults.items() if key not in self.given)
+    return self.replace(chunks = self.chunks or self.threads, **resolved)
+
+  def __repr__(self):
+    """Returns code representation of the instance."""
+    return "RunOptions(" + ", ".join(key + " = " + repr(getattr(self, key)) for key in sorted(self.given)) + ")"
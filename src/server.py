@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the JobServer class, a long-running local job service for running many
+small configurations of simulation.py or validate.py without paying Python and
+NumPy startup for each one. File should be run from the command line as
+`server.py [port] [workers]`; it listens for HTTP on localhost only. A job is
+the contents of an input file in the usual format POSTed to /jobs, with an
+optional "model" ("simulation" or "validate") and "name" of its results file.
+Jobs are queued to a pool of worker processes that imported the simulation
+modules when the server started, and write their results to the results
+directory like a run from the command line would. Their state and progress can
+be polled at /jobs/<id>, streamed as JSON lines from /jobs/<id>/progress, and
+their results read back from /jobs/<id>/results.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import BaseHTTPServer           # HTTP request handling
+import SocketServer             # a thread per request
+import json                     # for encoding and decoding jobs
+import multiprocessing as mp    # worker processes
+import os                       # for results file names
+import signal                   # leaving Ctrl-C to the server
+import sys                      # capturing console output
+import threading                # job state shared between requests
+import time                     # for timing jobs
+import traceback                # reporting failed jobs
+from StringIO import StringIO   # console output of a job
+
+# import custom-made modules
+from model import run_options
+from simulation import Simulation
+from validate import Validate
+
+# seconds between progress lines when a streamed job isn't changing
+HEARTBEAT = 10
+
+###############################################################################
+# DEFINE JOB SERVER CLASS
+###############################################################################
+
+class JobServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  "Class used to queue simulation jobs to a pool of warm worker processes."
+  daemon_threads = True
+  #port (int)
+  #workers (int) - worker processes, each running one job at a time
+  def __init__(self, port = 8765, workers = 1):
+    BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), JobHandler)
+    self.jobs = dict()
+    self.nextID = 0
+    self.changed = threading.Condition()
+    self.progress = mp.Queue()
+    self.pool = mp.Pool(workers, warm_worker, (self.progress,))
+    listener = threading.Thread(target = self.listen)
+    listener.daemon = True
+    listener.start()
+
+
+###############################################################################
+# JOB METHODS
+###############################################################################
+
+  #inputs (Dictionary) - contents of an input file
+  def submit(self, inputs):
+    """
+    Queues a job and returns its record. Raises a ValueError if a queued or
+    running job writes to the same results, checkpoints or ledger - those are
+    all named after the results file without its extension.
+    """
+    with self.changed:
+      jobID = self.nextID
+      name = inputs.get('name', 'job_' + str(jobID) + '.json')
+      for job in self.jobs.values():
+        if job['state'] in ('queued', 'running') and os.path.splitext(job['name'])[0] == os.path.splitext(name)[0]:
+          raise ValueError("job " + str(job['id']) + " is already writing results named " + job['name'])
+      self.nextID += 1
+      job = {'id' : jobID, 'name' : name, 'model' : inputs.get('model', 'simulation'), 'state' : 'queued',
+             'trials' : 0, 'numTrials' : inputs.get('numTrials', 1), 'submitted' : time.time()}
+      self.jobs[jobID] = job
+    self.pool.apply_async(run_job, ((jobID, inputs, name),), callback = self.finish)
+    return dict(job)
+
+  #jobID (int)
+  def status(self, jobID):
+    "Returns a copy of a job's record, or None if there is no such job."
+    with self.changed:
+      return dict(self.jobs[jobID]) if jobID in self.jobs else None
+
+  def listJobs(self):
+    "Returns brief copies of every job's record, in the order they were submitted."
+    with self.changed:
+      return [brief(job) for jobID, job in sorted(self.jobs.items())]
+
+  def listen(self):
+    "Moves the progress reported by the workers into the job records."
+    while True:
+      jobID, trials, numTrials = self.progress.get()
+      with self.changed:
+        job = self.jobs[jobID]
+        # progress can arrive after the job has already finished
+        if job['state'] in ('queued', 'running'):
+          if job['state'] == 'queued':
+            job['started'] = time.time()
+          job.update(state = 'running', trials = trials, numTrials = numTrials)
+          self.changed.notify_all()
+
+  #outcome (Tuple of job ID, statistics, console output and error)
+  def finish(self, outcome):
+    "Records the outcome of a job, called by the pool when the job returns."
+    jobID, statistics, console, error = outcome
+    with self.changed:
+      job = self.jobs[jobID]
+      job.setdefault('started', job['submitted'])
+      job.update(state = 'failed' if error else 'done', finished = time.time(), console = console)
+      if error:
+        job['error'] = error
+      else:
+        job.update(statistics = statistics, trials = statistics['trials'])
+      self.changed.notify_all()
+
+  #jobID (int)
+  #seen (Dictionary) - the job record last seen by the caller
+  def waitForChange(self, jobID, seen):
+    "Returns the job's record once it differs from seen, or after HEARTBEAT seconds."
+    deadline = time.time() + HEARTBEAT
+    with self.changed:
+      # other jobs changing wake this one up too
+      while self.jobs[jobID] == seen and time.time() < deadline:
+        self.changed.wait(deadline - time.time())
+      return dict(self.jobs[jobID])
+
+  def close(self):
+    "Stops taking requests and waits for the jobs already queued."
+    self.server_close()
+    self.pool.close()
+    self.pool.join()
+
+
+###############################################################################
+# DEFINE REQUEST HANDLER CLASS
+###############################################################################
+
+class JobHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  "Class used to answer the HTTP requests made to a JobServer."
+
+  def do_POST(self):
+    if self.path.rstrip('/') != '/jobs':
+      return self.reply(404, {'error' : 'unknown path ' + self.path})
+    try:
+      inputs = json.loads(self.rfile.read(int(self.headers.getheader('content-length', 0))))
+      check_job(inputs)
+    except ValueError as error:
+      return self.reply(400, {'error' : str(error)})
+    try:
+      job = self.server.submit(inputs)
+    except ValueError as error:
+      return self.reply(409, {'error' : str(error)})
+    self.reply(202, job)
+
+  def do_GET(self):
+    parts = self.path.strip('/').split('/')
+    if parts == ['jobs']:
+      # the reply is sent after the lock is released, so slow clients don't hold up the jobs
+      return self.reply(200, self.server.listJobs())
+    job = self.server.status(int(parts[1])) if len(parts) in (2, 3) and parts[0] == 'jobs' and parts[1].isdigit() else None
+    if job is None:
+      return self.reply(404, {'error' : 'unknown path ' + self.path})
+    if len(parts) == 2:
+      self.reply(200, job)
+    elif parts[2] == 'progress':
+      self.stream(job)
+    elif parts[2] == 'results' and job['state'] == 'done':
+      with open('../results/' + job['name'], 'rb') as f:
+        self.reply(200, f.read())
+    elif parts[2] == 'results':
+      self.reply(409, {'error' : 'job ' + str(job['id']) + ' is ' + job['state']})
+    else:
+      self.reply(404, {'error' : 'unknown path ' + self.path})
+
+  #job (Dictionary)
+  def stream(self, job):
+    "Writes a JSON line of the job's progress every time it changes, until it is over."
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/x-ndjson')
+    self.end_headers()
+    while True:
+      self.wfile.write(json.dumps(brief(job)) + '\n')
+      self.wfile.flush()
+      if job['state'] in ('done', 'failed'):
+        return
+      job = self.server.waitForChange(job['id'], job)
+
+  #code (int)
+  #body (Dictionary, Array or str) - sent as JSON unless already a str
+  def reply(self, code, body):
+    "Sends a complete response."
+    body = body if isinstance(body, str) else json.dumps(body)
+    self.send_response(code)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+###############################################################################
+# JOB HELPERS
+###############################################################################
+
+# inputs (Dictionary)
+def check_job(inputs):
+  "Raises ValueError if inputs can't be a job."
+  if not isinstance(inputs, dict):
+    raise ValueError("a job must be a JSON object of inputs")
+  if inputs.get('model', 'simulation') not in ('simulation', 'validate'):
+    raise ValueError("unknown model '" + str(inputs['model']) + "', choose from: simulation, validate")
+  name = inputs.get('name', 'job')
+  if not isinstance(name, basestring) or not name.strip('.'):
+    raise ValueError("a job's name must be the name of a file")
+  if os.path.basename(name) != name:
+    raise ValueError("a job's name can't contain a directory")
+
+# job (Dictionary)
+def brief(job):
+  "Returns a job's record without its statistics and console output."
+  return dict((key, value) for key, value in job.items() if key not in ('statistics', 'console'))
+
+
+###############################################################################
+# JOB WORKER
+###############################################################################
+
+# progress (multiprocessing Queue)
+def warm_worker(progress):
+  """
+  Starts a worker process - the simulation modules are already imported by the
+  time the pool starts it, so all that's left is to keep the progress queue.
+  """
+  global PROGRESS
+  PROGRESS = progress
+  # on Ctrl-C the server stops taking jobs and the workers finish theirs
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# job (Tuple of job ID, inputs, results file name)
+def run_job(job):
+  """
+  Runs the trials of a job with the Simulation or Validate class and returns
+  the job ID, summary statistics, console output and error, if any - module
+  level so worker processes can unpickle it. Jobs run their trials on their
+  worker alone and never plot, since workers can't start processes of their own.
+  """
+  jobID, inputs, name = job
+  options = run_options(inputs).replace(workers = 1, plotting = None)
+  progress = lambda trials, numTrials: PROGRESS.put((jobID, trials, numTrials))
+  console, sys.stdout = sys.stdout, StringIO()
+  try:
+    if inputs.get('model', 'simulation') == 'validate':
+      statistics = Validate.fromInputs(inputs).run(inputs['numTrials'], inputs['testCase'], inputs['scenario'], name,
+                                                   inputs.get('monitor', False), options, progress)
+    else:
+      statistics = Simulation.fromInputs(inputs).run(inputs['numTrials'], inputs['scenario'], name,
+                                                     inputs.get('monitor', False), options, progress)
+    return jobID, statistics, sys.stdout.getvalue(), None
+  except Exception:
+    return jobID, None, sys.stdout.getvalue(), traceback.format_exc()
+  finally:
+    sys.stdout = console
+
+
+###############################################################################
+# RUN SERVER
+###############################################################################
+
+# command-line running of python script
+if __name__ == "__main__":
+  port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+  workers = int(sys.argv[2]) if len(sys.argv) > 2 else mp.cpu_count()
+  server = JobServer(port, workers)
+  print "Serving jobs on http://127.0.0.1:" + str(port) + "/jobs with " + str(workers) + " worker(s)"
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    print ""
+    print "Waiting for queued jobs..."
+  finally:
+    server.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the StockIndex class used by the Market when inventories are
+dynamic. Every producer's goods stay in one sorted goodID array; the index is a
+Fenwick (binary indexed) tree counting which of those goods are in stock, so a
+good selling out or being restocked is an O(log n) update and the nearest
+in-stock good to a goodDemanded is found with O(log n) searches rather than a
+scan over the goods that ran out. Batched decisions search the goods in stock
+compacted into one sorted array, which the index keeps up to date by taking out
+and putting back only the goods that sold out or were restocked.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import numpy as np # numerical functionality
+
+###############################################################################
+# DEFINE STOCK INDEX CLASS
+###############################################################################
+
+class StockIndex(object):
+  "Fenwick tree over the flat goods of a Market counting the goods in stock."
+  #goodIDs (Array of floats) - flat, sorted within each producer's slice
+  #inStock (Array of booleans)
+  def __init__(self, goodIDs, inStock):
+    self.goodIDs = goodIDs
+    self.size = len(goodIDs)
+    # highest power of two not above size, where kth searches start
+    self.topStep = 1 << (self.size.bit_length() - 1) if self.size else 0
+    self.build(inStock)
+
+  #inStock (Array of booleans)
+  def build(self, inStock):
+    "Rebuilds the tree and the goods in stock from scratch in O(n)."
+    counts = np.concatenate(([0], np.cumsum(inStock, dtype = int)))
+    positions = np.arange(self.size + 1)
+    # a list rather than an array - scalar access is what the tree is used for
+    self.tree = (counts - counts[positions - (positions & -positions)]).tolist()
+    self.count = int(counts[-1])
+    self.stocked = np.array(inStock, dtype = bool)
+    self.compacted = None
+
+  #good (int) - flat good index
+  #delta (int) - +1 for a good restocked, -1 for a good sold out
+  def update(self, good, delta):
+    "Marks a good as restocked or sold out."
+    self.addToTree(good, delta)
+    self.stocked[good] = delta > 0
+    # compacted again only when a batch of decisions asks for the goods in stock
+    self.compacted = None
+
+  #good (int) - flat good index
+  #delta (int)
+  def addToTree(self, good, delta):
+    "Adds delta to the count of a good in the tree."
+    self.count += delta
+    position = good + 1
+    tree = self.tree
+    while position <= self.size:
+      tree[position] += delta
+      position += position & -position
+
+  #goods (Array of ints) - sorted flat good indices
+  #delta (int)
+  #inStock (Array of booleans) - after the change
+  def updateMany(self, goods, delta, inStock):
+    "Marks many goods as restocked or sold out, rebuilding the tree when that is cheaper."
+    if len(goods) * 32 > self.size:
+      self.build(inStock)
+      return
+    for good in goods.tolist():
+      self.addToTree(good, delta)
+    self.stocked[goods] = delta > 0
+    if self.compacted is not None:
+      inStockGoods, inStockIDs = self.compacted
+      positions = inStockGoods.searchsorted(goods)
+      if delta < 0:
+        self.compacted = np.delete(inStockGoods, positions), np.delete(inStockIDs, positions)
+      else:
+        self.compacted = np.insert(inStockGoods, positions, goods), np.insert(inStockIDs, positions, self.goodIDs[goods])
+
+  def inStockGoods(self):
+    "Returns the sorted flat indices of the goods in stock and their goodIDs."
+    if self.compacted is None:
+      goods = np.flatnonzero(self.stocked)
+      self.compacted = goods, self.goodIDs[goods]
+    return self.compacted
+
+  #end (int)
+  def prefix(self, end):
+    "Returns the number of goods in stock before flat index end."
+    count = 0
+    tree = self.tree
+    while end > 0:
+      count += tree[end]
+      end -= end & -end
+    return count
+
+  #rank (int) - 1-based
+  def kth(self, rank):
+    "Returns the flat index of the rank-th good in stock."
+    position = 0
+    tree = self.tree
+    step = self.topStep
+    while step:
+      candidate = position + step
+      if candidate <= self.size and tree[candidate] < rank:
+        position = candidate
+        rank -= tree[candidate]
+      step >>= 1
+    return position
+
+  #start (int) - first flat index of the producer's goods
+  #end (int) - one past the last flat index of the producer's goods
+  #insertion (int) - flat index where goodDemanded would be inserted
+  #goodDemanded (float)
+  def nearest(self, start, end, insertion, goodDemanded):
+    """
+    Returns the flat index of the in-stock good closest to goodDemanded between
+    start and end, or -1 when none of them is in stock. Ties go to the lower
+    goodID, as for static inventories.
+    """
+    before = self.prefix(insertion)
+    left = self.kth(before) if before else -1
+    right = self.kth(before + 1) if before < self.count else end
+    if left < start:
+      return right if right < end else -1
+    if right >= end or goodDemanded - self.goodIDs[left] <= self.goodIDs[right] - goodDemanded:
+      return left
+    return right
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the Sweep class used to run many parameter points of simulation.py or
+validate.py in one go. File should be run from the command line using a JSON
+formatted sweep file from the inputs directory. A sweep file holds a "base" set
+of inputs in the usual format plus a "grid" of values to take every combination
+of and/or a list of "points" to override the base with. Every (parameter point,
+trial) pair becomes one task; tasks are run largest first on a pool of workers
+and all results are written to one CSV table. Points with a targetPrecision run
+in rounds and stop taking trials once their results are precise enough, the
+same way as a single run of simulation.py or validate.py does.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import csv                      # for the results table
+import itertools                # for expanding the grid
+import os                       # for results file names
+import time                     # for timing the sweep
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from model import run_options
+from simulation import Simulation
+from validate import Validate
+from utility.file_io import read_json
+from utility.parallel import master_seed, trial_seeds, map_trials
+from utility.statistics import RunningStats, SequentialStop
+
+MODELS = {'simulation' : Simulation, 'validate' : Validate}
+
+###############################################################################
+# DEFINE SWEEP CLASS
+###############################################################################
+
+# relative cost of one consumer decision per producer for each engine
+ENGINECOST = {'loop' : 1.0, 'batch' : 0.05, 'table' : 0.01, 'meanfield' : 0.001}
+
+class Sweep:
+  "Class used to run parameter sweeps."
+  #spec (Dictionary)
+  def __init__(self, spec):
+    self.base = spec.get('base', dict())
+    self.grid = spec.get('grid', dict())
+    self.points = spec.get('points', [dict()] if not self.grid else [])
+    self.model = spec.get('model', 'simulation')
+
+
+###############################################################################
+# EXPANSION METHODS
+###############################################################################
+
+  def expand(self):
+    """
+    Returns the list of parameter points: the base inputs updated with every
+    combination of grid values, followed by the base updated with each point.
+    """
+    points = []
+    keys = sorted(self.grid)
+    # the product of no values is one empty combination, which the points already cover
+    for values in itertools.product(*[self.grid[key] for key in keys]) if self.grid else []:
+      point = dict(self.base)
+      point.update(zip(keys, values))
+      points.append(point)
+    for override in self.points:
+      point = dict(self.base)
+      point.update(override)
+      points.append(point)
+    for point in points:
+      point.setdefault('model', self.model)
+    return points
+
+  # point (Dictionary)
+  def estimateCost(self, point):
+    "Returns a rough relative cost of one trial of a parameter point."
+    numProducers = point.get('NUMPRODUCERS', 2) if point['model'] == 'simulation' else 2
+    engineCost = ENGINECOST.get(point.get('engine', 'loop'), 1.0)
+    return point['SIMLENGTH'] * point['NUMCONSUMERS'] * numProducers * np.log2(point['NUMGOODS'] + 1) * engineCost
+
+  # seed (int)
+  # trials (Dictionary) - (first, end) trials to run keyed by point index
+  def tasks(self, seed, trials = None):
+    """
+    Returns one (point index, point, trial, trial seed) task per trial of every
+    parameter point, or of the trials given for each point, largest first. A
+    point without its own seed uses the sweep's master seed, so every point sees
+    the same trial seeds.
+    """
+    tasks = []
+    for index, point in enumerate(self.expand()):
+      if trials is not None and index not in trials:
+        continue
+      first, end = trials[index] if trials is not None else (0, point.get('numTrials', 1))
+      seeds = trial_seeds(point.get('seed', seed), end)
+      tasks.extend((index, point, trial, seeds[trial]) for trial in range(first, end))
+    tasks.sort(key = lambda task: self.estimateCost(task[1]), reverse = True)
+    return tasks
+
+
+###############################################################################
+# RUN METHOD
+###############################################################################
+
+  # points  (Array of Dictionaries)
+  # workers (int)
+  def stoppingRules(self, points, workers):
+    """
+    Returns the SequentialStop of every point with a targetPrecision keyed by
+    point index, and the (first, end) trials of the first round of every point.
+    """
+    rules = dict((index, SequentialStop(point['targetPrecision'], point.get('precisionOf', 'win_rate'),
+                                        point.get('minTrials', 10), point.get('numTrials', 1)))
+                 for index, point in enumerate(points) if point.get('targetPrecision'))
+    trials = dict((index, (0, rules[index].nextLook(0, workers) if index in rules else point.get('numTrials', 1)))
+                  for index, point in enumerate(points))
+    return rules, trials
+
+  # outputFile (str)
+  # workers    (int)
+  # seed       (int)
+  def run(self, outputFile = 'sweep', workers = 1, seed = None):
+    """
+    Runs every trial of every parameter point and writes one row per point,
+    trial and producer to results/<name>.csv. Points with a targetPrecision get
+    further rounds of trials until they are precise enough or have run their
+    numTrials. The win counts of every point are printed to the console.
+    """
+    # let user know the sweep has started running
+    print "Running..."
+    print ""
+
+    # timing how long the sweep takes to run
+    startSweep = time.time()
+
+    if seed is None:
+      seed = master_seed()
+    points = self.expand()
+    rules, trials = self.stoppingRules(points, workers)
+
+    # results come back in completion order and are sorted afterwards
+    rows = []
+    wins = dict()
+    winCounts = dict()   # wins of every producer by position, for the stopping rules
+    profitStats = dict() # final profits of every producer, for the stopping rules
+    numTasks = 0
+    while trials:
+      tasks = self.tasks(seed, trials)
+      numTasks += len(tasks)
+      finished = []
+      for index, record in map_trials(run_task, tasks, workers, ordered = False):
+        for position, producer in enumerate(record['producers']):
+          rows.append((index, record['trial'], record['seed'], producer['producerID'],
+                       int(position == record['winner']), producer['profits'],
+                       producer['average_price'], producer['average_distance']))
+        winnerID = record['producers'][record['winner']]['producerID']
+        wins.setdefault(index, dict())
+        wins[index][winnerID] = wins[index].get(winnerID, 0) + 1
+        if index in rules:
+          finished.append((index, record['trial'], record))
+
+      # points that aren't precise enough yet get another round - results are
+      # added in trial order so the decision doesn't depend on completion order
+      for index, trial, record in sorted(finished):
+        winCounts.setdefault(index, np.zeros(len(record['producers'])))[record['winner']] += 1
+        profitStats.setdefault(index, RunningStats()).add(np.array([producer['profits'] for producer in record['producers']]))
+      trials = dict((index, (end, rules[index].nextLook(end, workers))) for index, (first, end) in trials.items()
+                    if index in rules and not rules[index].look(winCounts[index], profitStats[index]))
+    rows.sort()
+
+    # timing how long the sweep takes to run
+    endSweep = time.time()
+
+    # write one consolidated results table
+    parameters = sorted(set(key for point in points for key in point) - set(['monitor', 'workers', 'plotting', 'output', 'saveProfits']))
+    with open('../results/' + os.path.splitext(outputFile)[0] + '.csv', 'wb') as f:
+      writer = csv.writer(f)
+      writer.writerow(['point'] + parameters + ['trial', 'seed', 'producerID', 'won', 'profits', 'average_price', 'average_distance'])
+      for row in rows:
+        point = points[row[0]]
+        writer.writerow([row[0]] + [point.get(key, '') for key in parameters] + list(row[1:]))
+
+    # print the results of the sweep to console - points are labelled by the inputs that vary
+    varying = [key for key in parameters if len(set(str(point.get(key)) for point in points)) > 1]
+    print "=================================================\n"
+    print "Sweep of " + str(len(points)) + " parameter point(s), " + str(numTasks) + " trial(s):\n"
+    for index, point in enumerate(points):
+      print "Point " + str(index) + ": " + ", ".join(key + " = " + str(point.get(key)) for key in varying)
+      if index in rules:
+        print "  stopped after " + str(rules[index].trials) + " of at most " + str(rules[index].maxTrials) + " trial(s), " + \
+              ("precise" if rules[index].precise else "not precise") + " to " + str(rules[index].targetPrecision) + " in " + rules[index].measure
+      for producerID in sorted(wins.get(index, dict())):
+        print "  " + producerID + " won " + str(wins[index][producerID]) + " time(s)"
+      print ""
+    print "Master seed was: " + str(seed) + "\n"
+    print "Sweep took " + str(endSweep - startSweep) + " seconds to run!"
+    print ""
+    print "================================================="
+
+
+###############################################################################
+# SWEEP WORKER
+###############################################################################
+
+# task (Tuple of point index, point, trial, seed)
+def run_task(task):
+  """
+  Runs one trial of a parameter point with the Simulation or Validate class -
+  module level so worker processes can unpickle it. Points take the same
+  inputs as compare.py's scenarios.
+  """
+  index, point, trial, seed = task
+  model = MODELS[point['model']].fromInputs(point)
+  record, profitHistory = model.simulateTrial(trial, seed, model.setupFrom(point), run_options(point))
+  return index, record
+
+
+###############################################################################
+# RUN SWEEP
+###############################################################################
+
+# command-line running of python script
+if __name__ == "__main__":
+  import sys
+  outputFile = sys.argv[1]
+  spec = read_json('../inputs/' + sys.argv[1])
+
+  # Instantiate sweep
+  sweep = Sweep(spec)
+  # run sweep
+  sweep.run(
+    outputFile = outputFile,
+    workers    = spec.get('workers', 1),
+    seed       = spec.get('seed')
+  )
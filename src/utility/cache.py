@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the on-disk cache of trial results used within validate.py
+and simulation.py. Every trial record is stored under a hash of the normalized
+model parameters, the trial seed and MODELVERSION, so rerunning a configuration
+only computes the trials that are not cached yet. The cache has a size cap and
+evicts the least recently used entries first.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import hashlib     # for cache keys
+import json        # for encoding and decoding data
+import os          # interface with operating system
+import numpy as np # profit histories
+
+# import custom-made modules
+from file_io import read_json, write_json
+from parallel import map_trials
+
+# bump whenever a change to the model alters the results of a seeded trial
+MODELVERSION = '4'
+
+###############################################################################
+# CACHE METHODS
+###############################################################################
+
+# parameters (Dictionary)
+# seed (int)
+def cache_key(parameters, seed):
+  "Returns the cache key of one trial of a parameter set."
+  normalized = json.dumps({'parameters' : parameters, 'seed' : seed, 'version' : MODELVERSION}, sort_keys = True)
+  return hashlib.sha1(normalized).hexdigest()
+
+# directory (str)
+# key (str)
+# needHistory (boolean)
+def cache_get(directory, key, needHistory = False):
+  """
+  Returns the cached (record, profitHistory) of a key or None on a miss. A hit
+  refreshes the entry's modification time, which eviction uses as last use.
+  """
+  recordFile = os.path.join(directory, key + '.json')
+  historyFile = os.path.join(directory, key + '.npy')
+  if not os.path.exists(recordFile) or (needHistory and not os.path.exists(historyFile)):
+    return None
+  os.utime(recordFile, None)
+  if not needHistory:
+    return read_json(recordFile), None
+  os.utime(historyFile, None)
+  return read_json(recordFile), np.load(historyFile)
+
+# directory (str)
+# key (str)
+# record (Dictionary)
+# profitHistory (Array or None)
+def cache_put(directory, key, record, profitHistory = None):
+  "Stores a trial record, without any profile, and if given its profit history under a key."
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  if profitHistory is not None:
+    np.save(os.path.join(directory, key + '.tmp.npy'), profitHistory)
+    os.rename(os.path.join(directory, key + '.tmp.npy'), os.path.join(directory, key + '.npy'))
+  write_json(os.path.join(directory, key + '.tmp'), dict((name, value) for name, value in record.items() if name != 'profile'))
+  os.rename(os.path.join(directory, key + '.tmp'), os.path.join(directory, key + '.json'))
+
+# directory (str)
+# maxBytes (int)
+def cache_evict(directory, maxBytes):
+  "Deletes the least recently used cache files until the cache fits in maxBytes."
+  if not os.path.exists(directory):
+    return
+  entries = []
+  for fileName in os.listdir(directory):
+    info = os.stat(os.path.join(directory, fileName))
+    entries.append((info.st_mtime, info.st_size, fileName))
+  totalBytes = sum(size for lastUse, size, fileName in entries)
+  for lastUse, size, fileName in sorted(entries):
+    if totalBytes <= maxBytes:
+      break
+    os.remove(os.path.join(directory, fileName))
+    totalBytes -= size
+
+# function (function taking one task)
+# tasks (Array of task tuples with the trial at index 1 and the seed at index 2)
+# parameters (Dictionary)
+# directory (str)
+# maxBytes (int)
+# workers (int)
+# needHistory (boolean)
+def cached_map_trials(function, tasks, parameters, directory, maxBytes, workers = 1, needHistory = False):
+  """
+  Same as map_trials for trial functions returning (record, profitHistory), but
+  cached trials are read from disk and only the missing trials are run. New
+  results are stored as they come in and the cache is trimmed to maxBytes at
+  the end.
+  """
+  cached = dict()
+  for task in tasks:
+    hit = cache_get(directory, cache_key(parameters, task[2]), needHistory)
+    if hit is not None:
+      hit[0]['trial'] = task[1]
+      cached[task[1]] = hit
+  results = map_trials(function, [task for task in tasks if task[1] not in cached], workers)
+  for task in tasks:
+    if task[1] in cached:
+      yield cached[task[1]]
+    else:
+      record, profitHistory = next(results)
+      cache_put(directory, cache_key(parameters, task[2]), record, profitHistory)
+      yield record, profitHistory
+  cache_evict(directory, maxBytes)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the checkpoint functions used within validate.py and
+simulation.py so that a run stopped part way through can be resumed exactly
+where it stopped. A run's checkpoint directory holds the run's master seed, the
+record of every finished trial and, for trials still running, a compressed
+snapshot of the market, the consumer random number generator and the timestep
+reached. Every file is written to a temporary name and renamed into place.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import os          # interface with operating system
+import shutil      # removing checkpoint directories
+import numpy as np # numerical functionality
+
+# import custom-made modules
+from file_io import read_json, write_json
+
+###############################################################################
+# RUN CHECKPOINT METHODS
+###############################################################################
+
+# directory (str)
+# runInfo (Dictionary)
+# resume (boolean)
+def start_checkpoints(directory, runInfo, resume = False):
+  """
+  Prepares the checkpoint directory of a run and returns the run info to use.
+  When resuming, the stored run info (including the master seed) is returned;
+  otherwise any old checkpoints are removed and runInfo is stored.
+  """
+  runFile = os.path.join(directory, 'run.json')
+  if resume and os.path.exists(runFile):
+    return read_json(runFile)
+  if os.path.exists(directory):
+    shutil.rmtree(directory)
+  os.makedirs(directory)
+  write_json(runFile, runInfo)
+  return runInfo
+
+# directory (str)
+def finish_checkpoints(directory):
+  "Removes the checkpoints of a run once its results have been written."
+  if os.path.exists(directory):
+    shutil.rmtree(directory)
+
+# directory (str)
+# needHistory (boolean)
+def completed_trials(directory, needHistory = False):
+  """
+  Returns a dictionary of the (record, profitHistory) of every finished trial
+  keyed by trial. Trials saved without a profit history are left out when
+  needHistory is True so they are run again.
+  """
+  completed = dict()
+  for fileName in os.listdir(directory):
+    if fileName.startswith('trial_') and fileName.endswith('.json'):
+      record = read_json(os.path.join(directory, fileName))
+      historyFile = os.path.join(directory, fileName[:-len('.json')] + '.npy')
+      profitHistory = np.load(historyFile) if os.path.exists(historyFile) else None
+      if needHistory and profitHistory is None:
+        continue
+      completed[record['trial']] = (record, profitHistory)
+  return completed
+
+# directory (str)
+# tasks (Array of task tuples with the trial at index 1)
+# completed (Dictionary)
+# results (iterator of (record, profitHistory) for the tasks not completed, in order)
+def checkpointed_trials(directory, tasks, completed, results):
+  """
+  Yields the (record, profitHistory) of every task in trial order, taking
+  finished trials from completed and the rest from results. Each new result is
+  checkpointed, without any profile, as soon as it arrives and its mid-trial
+  snapshot removed.
+  """
+  for task in tasks:
+    if task[1] in completed:
+      yield completed[task[1]]
+      continue
+    record, profitHistory = next(results)
+    trialFile = os.path.join(directory, 'trial_' + str(record['trial']))
+    if profitHistory is not None:
+      np.save(trialFile + '.tmp.npy', profitHistory)
+      os.rename(trialFile + '.tmp.npy', trialFile + '.npy')
+    write_json(trialFile + '.tmp', dict((name, value) for name, value in record.items() if name != 'profile'))
+    os.rename(trialFile + '.tmp', trialFile + '.json')
+    if os.path.exists(trialFile + '.npz'):
+      os.remove(trialFile + '.npz')
+    yield record, profitHistory
+
+###############################################################################
+# TRIAL CHECKPOINT METHODS
+###############################################################################
+
+# fileName (str) - without extension
+# state (Dictionary of arrays)
+def save_state(fileName, state):
+  "Writes a compressed snapshot of a running trial."
+  with open(fileName + '.tmp', 'wb') as f:
+    np.savez_compressed(f, **state)
+  os.rename(fileName + '.tmp', fileName + '.npz')
+
+# fileName (str) - without extension
+def load_state(fileName):
+  "Returns the snapshot of a running trial or None if there is none."
+  if not os.path.exists(fileName + '.npz'):
+    return None
+  with np.load(fileName + '.npz') as state:
+    return dict(state)
+
+# rng (numpy RandomState)
+def rng_state(rng):
+  "Returns the state of a random number generator as a dictionary of arrays."
+  name, keys, position, hasGauss, cachedGaussian = rng.get_state()
+  return {'rngKeys' : keys, 'rngPosition' : position, 'rngHasGauss' : hasGauss, 'rngGaussian' : cachedGaussian}
+
+# rng (numpy RandomState)
+# state (Dictionary of arrays)
+def restore_rng(rng, state):
+  "Puts a random number generator back in the state saved by rng_state."
+  rng.set_state(('MT19937', state['rngKeys'], int(state['rngPosition']),
+                 int(state['rngHasGauss']), float(state['rngGaussian'])))
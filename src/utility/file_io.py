@@ -7,7 +7,9 @@
 """
 This file contains all of the file input/output functions used
 within validate.py and simulation.py. Currently it can only read and write
-data in Javascript Object Notation (JSON) format.
+data in Javascript Object Notation (JSON) format, either as one document or
+streamed as JSON lines (one record per line), and store profit trajectories as
+memory-mapped NumPy arrays with a JSON metadata sidecar.
 """
 
 
@@ -15,8 +17,9 @@ data in Javascript Object Notation (JSON) format.
 # IMPORT MODULES
 ###############################################################################
 
-import json # for encoding and decoding data
-import os   # interface with operating system
+import json         # for encoding and decoding data
+import os           # interface with operating system
+import numpy as np  # binary array files
 
 ###############################################################################
 # I/O METHODs
@@ -36,4 +39,77 @@ def read_json(fileName):
     with open(fileName, 'r') as f:
       return json.load(f)
   else:
-    print('File does not exist!')
\ No newline at end of file
+    print('File does not exist!')
+
+# fileName (str)
+def clear_json_lines(fileName):
+  "Creates an empty JSON lines file, discarding any previous contents."
+  open(fileName, 'w').close()
+
+# fileName (str)
+# record (Dictionary)
+def append_json_line(fileName, record):
+  """
+  Appends a record to a JSON lines file and flushes it to disk so that it
+  survives a crash later in the run and can be read while the run continues.
+  """
+  with open(fileName, 'a') as f:
+    f.write(json.dumps(record) + '\n')
+    f.flush()
+    os.fsync(f.fileno())
+
+# fileName (str)
+def read_json_lines(fileName):
+  """
+  Generator yielding the records of a JSON lines file one at a time. A last
+  line that is still being written is skipped.
+  """
+  with open(fileName, 'r') as f:
+    for line in f:
+      if not line.endswith('\n'):
+        break
+      if line.strip():
+        yield json.loads(line)
+
+# fileName (str) - without extension
+# metadata (Dictionary) - must contain numTrials, producerIDs and simLength
+def open_profit_cube(fileName, metadata):
+  """
+  Creates a trials x producers x timesteps memory-mapped .npy file of profits
+  along with a .json metadata sidecar listing no completed trials yet, and
+  returns the writable memory map.
+  """
+  shape = (metadata['numTrials'], len(metadata['producerIDs']), metadata['simLength'])
+  write_json(fileName + '.json', dict(metadata, shape = shape, completed = []))
+  return np.lib.format.open_memmap(fileName + '.npy', mode = 'w+', dtype = np.float64, shape = shape)
+
+# cube (memory-mapped Array)
+# trial (int)
+# profitHistory (Array) - producers x timesteps
+def write_profit_trajectories(cube, trial, profitHistory):
+  "Writes one trial's profit history into the cube."
+  cube[trial] = profitHistory
+  cube.flush()
+
+# fileName (str) - without extension
+# cube (memory-mapped Array)
+# completed (Array of int) - trials written to the cube
+def close_profit_cube(fileName, cube, completed):
+  """
+  Flushes the cube and records its completed trials in the sidecar, replacing
+  the sidecar in one rename so that it is never left half written.
+  """
+  cube.flush()
+  metadata = read_json(fileName + '.json')
+  metadata['completed'] = sorted(completed)
+  write_json(fileName + '.json.tmp', metadata)
+  os.rename(fileName + '.json.tmp', fileName + '.json')
+
+# fileName (str) - without extension
+def read_profit_cube(fileName):
+  """
+  Returns a read-only memory-mapped view of a profit cube and its metadata.
+  Indexing the cube (e.g. cube[trial] or cube[:, producer]) gives zero-copy
+  views; only the trials listed in metadata['completed'] hold data.
+  """
+  return np.load(fileName + '.npy', mmap_mode = 'r'), read_json(fileName + '.json')
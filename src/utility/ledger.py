@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the sales ledger used within validate.py and simulation.py.
+Every sale is recorded as one packed LEDGERDTYPE record (30 bytes) saying which
+consumer bought which good from which producer, at what price, in which trial and
+timestep. Each trial appends its sales in batches to an in-memory buffer that is
+spilled to results/<name>_ledger/trial_<k>.bin whenever it outgrows the memory
+budget. The files are read back memory-mapped, a chunk at a time, so metrics
+such as market share over time can be computed afterwards without simulating
+again.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import os                       # interface with operating system
+import numpy as np              # numerical functionality
+
+# import custom-made modules
+from file_io import read_json, write_json
+
+# one sale - distance is goodID - goodDemanded
+LEDGERDTYPE = np.dtype([('trial', '<i4'), ('timestep', '<i4'), ('consumer', '<i4'), ('producer', '<i2'),
+                        ('good', '<i4'), ('price', '<f8'), ('distance', '<f4')])
+
+###############################################################################
+# DEFINE LEDGER CLASS
+###############################################################################
+
+class Ledger(object):
+  "Append-only ledger of one trial's sales, spilled to a file past a memory budget."
+  #fileName (str)
+  #trial (int)
+  #budget (int) - bytes of sales kept in memory before spilling to fileName
+  def __init__(self, fileName, trial, budget = 64 * 2**20):
+    self.fileName = fileName
+    self.trial = trial
+    self.buffer = np.empty(max(budget // LEDGERDTYPE.itemsize, 1), dtype = LEDGERDTYPE)
+    self.used = 0          # records in the buffer
+    self.count = 0         # records in the file
+    self.pending = []      # sales recorded one at a time this timestep
+    self.timestep = 0
+    self.consumer = 0      # consumer deciding, for sales recorded one at a time
+    self.demanded = 0.0    # good demanded by that consumer
+
+  #count (int)
+  def start(self, count = 0):
+    "Starts the ledger file with its first count records, dropping any after them."
+    with open(self.fileName, 'ab') as f:
+      f.truncate(count * LEDGERDTYPE.itemsize)
+    self.count = count
+    self.used = 0
+    self.pending = []
+
+  #consumers (Array of ints)
+  #producers (Array of ints)
+  #goods (Array of ints)
+  #prices (Array of floats)
+  #distances (Array of floats)
+  def append(self, consumers, producers, goods, prices, distances):
+    "Records a batch of sales made in the current timestep."
+    records = np.empty(len(consumers), dtype = LEDGERDTYPE)
+    records['trial'] = self.trial
+    records['timestep'] = self.timestep
+    records['consumer'] = consumers
+    records['producer'] = producers
+    records['good'] = goods
+    records['price'] = prices
+    records['distance'] = distances
+    self.write(records)
+
+  #producer (int)
+  #good (int)
+  #price (float)
+  #goodID (float)
+  def sell(self, producer, good, price, goodID):
+    "Records one sale to the current consumer; kept until endTimestep."
+    self.pending.append((self.trial, self.timestep, self.consumer, producer, good, price, goodID - self.demanded))
+
+  def endTimestep(self):
+    "Appends the sales recorded one at a time during the timestep as one batch."
+    if self.pending:
+      self.write(np.array(self.pending, dtype = LEDGERDTYPE))
+      self.pending = []
+
+  #records (Array of LEDGERDTYPE)
+  def write(self, records):
+    "Copies records into the buffer, spilling it to the file whenever it fills up."
+    while len(records):
+      size = min(len(records), len(self.buffer) - self.used)
+      self.buffer[self.used:self.used + size] = records[:size]
+      self.used += size
+      records = records[size:]
+      if self.used == len(self.buffer):
+        self.flush()
+
+  def flush(self):
+    "Spills the buffer to the end of the file."
+    if self.used:
+      with open(self.fileName, 'ab') as f:
+        self.buffer[:self.used].tofile(f)
+      self.count += self.used
+      self.used = 0
+
+  def close(self):
+    "Writes out everything recorded and returns the number of records in the file."
+    self.endTimestep()
+    self.flush()
+    return self.count
+
+###############################################################################
+# LEDGER FILE METHODS
+###############################################################################
+
+# directory (str)
+# trial (int)
+def ledger_file(directory, trial):
+  "Returns the name of one trial's ledger file."
+  return os.path.join(directory, 'trial_' + str(trial) + '.bin')
+
+# directory (str)
+# metadata (Dictionary) - must contain numTrials, producerIDs and simLength
+def finish_ledger(directory, metadata):
+  "Writes the ledger's metadata sidecar with the number of records of every trial."
+  counts = dict((str(trial), os.path.getsize(ledger_file(directory, trial)) // LEDGERDTYPE.itemsize)
+                for trial in range(metadata['numTrials']) if os.path.exists(ledger_file(directory, trial)))
+  write_json(os.path.join(directory, 'ledger.json'), dict(metadata, dtype = LEDGERDTYPE.descr, records = counts))
+
+# directory (str)
+def read_ledger(directory):
+  """
+  Returns a dictionary of read-only memory-mapped record arrays keyed by trial
+  along with the ledger's metadata.
+  """
+  metadata = read_json(os.path.join(directory, 'ledger.json'))
+  trials = dict((int(trial), np.memmap(ledger_file(directory, trial), dtype = LEDGERDTYPE, mode = 'r', shape = (count,)))
+                for trial, count in metadata['records'].items() if count)
+  return trials, metadata
+
+# directory (str)
+# chunkSize (int) - records per chunk
+def ledger_chunks(directory, chunkSize = 2**20):
+  "Generator yielding the ledger's records in trial order, at most chunkSize at a time."
+  trials, metadata = read_ledger(directory)
+  for trial in sorted(trials):
+    records = trials[trial]
+    for start in range(0, len(records), chunkSize):
+      yield np.array(records[start:start + chunkSize])
+
+###############################################################################
+# DERIVED METRICS
+###############################################################################
+
+# directory (str)
+# chunkSize (int)
+def market_share(directory, chunkSize = 2**20):
+  """
+  Returns a timesteps x producers array of each producer's share of the revenue
+  of every timestep, over all trials.
+  """
+  metadata = read_json(os.path.join(directory, 'ledger.json'))
+  numProducers, simLength = len(metadata['producerIDs']), metadata['simLength']
+  revenue = np.zeros(simLength * numProducers)
+  for records in ledger_chunks(directory, chunkSize):
+    revenue += np.bincount(records['timestep'] * numProducers + records['producer'],
+                           weights = records['price'], minlength = len(revenue))
+  revenue = revenue.reshape(simLength, numProducers)
+  totals = revenue.sum(axis = 1)[:, None]
+  return revenue / np.where(totals > 0, totals, 1)
+
+# directory (str)
+# bins (int or (int, int))
+# ranges (((float, float), (float, float))) - price range and distance range
+# chunkSize (int)
+def price_distance_histogram(directory, bins = 20, ranges = ((0.0, 2.0), (0.0, 0.5)), chunkSize = 2**20):
+  """
+  Returns the number of sales in every (price, |goodID - goodDemanded|) bin
+  over all trials, with the price and distance bin edges.
+  """
+  counts, priceEdges, distanceEdges = np.histogram2d([], [], bins = bins, range = ranges)
+  for records in ledger_chunks(directory, chunkSize):
+    counts += np.histogram2d(records['price'], np.abs(records['distance']), bins = [priceEdges, distanceEdges])[0]
+  return counts, priceEdges, distanceEdges
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the functions used within validate.py and simulation.py to
+seed trials deterministically and to fan trials out over a pool of worker
+processes. Every trial gets its own seed derived from a master seed, so results
+do not depend on how many workers run them or in which order. Within a trial a
+timestep's consumers can be split into chunks decided on a pool of threads,
+which runs in parallel because NumPy releases the GIL on large arrays; results
+depend on the number of chunks but not on the number of threads.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import multiprocessing as mp # process pool
+from multiprocessing.pool import ThreadPool # thread pool
+import numpy as np           # numerical functionality
+
+###############################################################################
+# SEEDING METHODS
+###############################################################################
+
+def master_seed():
+  "Draws a fresh master seed for runs whose input file does not set one."
+  return int(np.random.randint(0, 2**31 - 1))
+
+# masterSeed (int)
+# numTrials (int)
+def trial_seeds(masterSeed, numTrials):
+  """
+  Derives one seed per trial from a master seed. The first n seeds are the same
+  whatever numTrials is, so extending a run reproduces the trials already done.
+  """
+  return np.random.RandomState(masterSeed).randint(0, 2**31 - 1, size = numTrials).tolist()
+
+# seed (int)
+# antithetic (boolean)
+def trial_rngs(seed, antithetic = False):
+  """
+  Returns the two independent random number generators of a trial: one used to
+  initialize producers and one used for consumer demands and roulette spins.
+  Antithetic generators give 1 - u for every uniform draw u of the plain ones.
+  """
+  generator = AntitheticRandomState if antithetic else np.random.RandomState
+  return generator([seed, 0]), generator([seed, 1])
+
+class AntitheticRandomState(np.random.RandomState):
+  "RandomState whose uniform draws mirror those of a RandomState with the same seed."
+  def random_sample(self, size = None):
+    return 1 - np.random.RandomState.random_sample(self, size)
+
+  def uniform(self, low = 0.0, high = 1.0, size = None):
+    return np.add(low, high) - np.random.RandomState.uniform(self, low, high, size)
+
+###############################################################################
+# POOL METHODS
+###############################################################################
+
+# function (function taking one task)
+# tasks (Array)
+# workers (int)
+# ordered (boolean)
+def map_trials(function, tasks, workers = 1, ordered = True):
+  """
+  Applies a module-level function to every task and yields the results in task
+  order. With more than one worker the tasks run on a process pool, handed out
+  one at a time in the order given; with ordered = False results are yielded as
+  soon as they finish.
+  """
+  if workers <= 1:
+    for task in tasks:
+      yield function(task)
+    return
+  pool = mp.Pool(workers)
+  try:
+    for result in (pool.imap if ordered else pool.imap_unordered)(function, tasks):
+      yield result
+    pool.close()
+  except:
+    pool.terminate()
+    raise
+  finally:
+    pool.join()
+
+###############################################################################
+# THREAD METHODS
+###############################################################################
+
+# threads (int)
+def start_threads(threads):
+  "Returns a pool of threads to decide chunks of consumers on, or None for one thread."
+  return ThreadPool(threads) if threads > 1 else None
+
+# pool (ThreadPool or None)
+def stop_threads(pool):
+  "Shuts a pool of threads down."
+  if pool is not None:
+    pool.close()
+    pool.join()
+
+# total (int)
+# chunks (int)
+def chunk_slices(total, chunks):
+  "Returns the slices splitting total consumers into chunks of nearly equal size, in order."
+  bounds = np.linspace(0, total, min(chunks, max(total, 1)) + 1).astype(int)
+  return [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+# function (function taking a slice)
+# slices (Array of slices)
+# pool (ThreadPool or None)
+def map_chunks(function, slices, pool = None):
+  "Applies function to every chunk's slice, on pool's threads if given, and returns the results in chunk order."
+  if pool is None or len(slices) == 1:
+    return [function(part) for part in slices]
+  return pool.map(function, slices, chunksize = 1)
+
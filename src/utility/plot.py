@@ -5,25 +5,50 @@
 # Contributor(s): Philipp Ross
 
 """
-This file contains the plotting function used in simulation.py to display the
-producerData dictionary which is also written to a results file in JSON
-format.
+This file contains the plotting functions used in simulation.py and validate.py
+to display the producerData dictionary which is also written to a results file
+in JSON format. Figures can either be shown interactively or rendered to files
+with a non-interactive backend in a background process, including summary
+figures across all trials. matplotlib is only imported once something is plotted.
 """
 
 ###############################################################################
 # IMPORT MODULES
 ###############################################################################
 
-import numpy as np              # numerical functionality
-import matplotlib.pyplot as plt # plotting
+import multiprocessing as mp # background plotting process
+import os                    # interface with operating system
+import sys                   # check for an already imported pyplot
+import numpy as np           # numerical functionality
 
 ###############################################################################
-# PLOTTING METHOD
+# HELPER METHODS
 ###############################################################################
 
+# headless (boolean)
+def load_pyplot(headless = False):
+  "Imports and returns matplotlib.pyplot, using the non-interactive Agg backend if headless."
+  import matplotlib
+  if headless and 'matplotlib.pyplot' not in sys.modules:
+    matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  return plt
+
+# profitHistory (Array) - producers x timesteps
+# maxPoints (int)
+def downsample(profitHistory, maxPoints = 500):
+  "Returns the timesteps and columns of a profit history thinned to at most maxPoints timesteps."
+  timesteps = np.unique(np.linspace(0, profitHistory.shape[1] - 1, maxPoints).astype(int))
+  return timesteps, profitHistory[:, timesteps]
+
+###############################################################################
+# PLOTTING METHODS
+###############################################################################
+
+#plt (matplotlib.pyplot module)
 #producers (List of Dictionaries of Producers)
-def plot(producerData):
-  "Reformats producerData into arrays to be plotted using matplotlib module."
+def draw(plt, producerData):
+  "Reformats producerData into arrays and draws them on the current matplotlib figure."
   # format data
   producerIDs = [int(producer['producerID'].split('_')[-1]) for producer in producerData]
   profits = [producer['profits'] for producer in producerData]
@@ -63,6 +88,113 @@ def plot(producerData):
   plt.fill_between(producerIDs, average_distances, alpha='0.6', color='blue')
   plt.plot(producerIDs, average_distances, 'k')
 
+  plt.tight_layout()
+
+#producers (List of Dictionaries of Producers)
+def plot(producerData):
+  "Plots producerData using matplotlib and displays the figure."
+  plt = load_pyplot()
+  draw(plt, producerData)
+
   # display plot
+  plt.show()
+
+#producers (List of Dictionaries of Producers)
+#fileName (str)
+def plot_to_file(producerData, fileName):
+  "Plots producerData with a non-interactive backend and saves the figure to fileName."
+  plt = load_pyplot(headless = True)
+  draw(plt, producerData)
+  plt.savefig(fileName)
+  plt.close('all')
+
+#producerIDs (Array of str)
+#wins (Array of floats)
+#finalProfits (Array) - trials x producers
+#timesteps (Array of ints)
+#meanProfits (Array) - producers x downsampled timesteps
+#fileName (str)
+# statistics (Dictionary) - summary statistics with confidence intervals
+def plot_summary(producerIDs, wins, finalProfits, timesteps, meanProfits, fileName, statistics = None):
+  """
+  Saves a figure summarizing all trials: each producer's win rate, the
+  distribution of its final profits and its mean profit trajectory. With
+  statistics the win rates and mean final profits get confidence interval
+  error bars.
+  """
+  plt = load_pyplot(headless = True)
+  positions = np.arange(len(producerIDs))
+  plt.figure(1, figsize=(12, 10))
+
+  # plot win rates
+  plt.subplot(311)
+  plt.grid(True)
+  plt.title('Win Rate')
+  plt.ylabel('Wins / Trials')
+  winRates = np.asarray(wins) / max(sum(wins), 1)
+  plt.bar(positions, winRates, color='blue', alpha=0.6)
+  if statistics is not None:
+    plt.errorbar(positions, winRates, yerr=interval_errors(winRates, [producer['win_rate'] for producer in statistics['producers']]),
+                 fmt='none', ecolor='black', capsize=3)
+  plt.xticks(positions, producerIDs, rotation=90, fontsize='small')
+
+  # plot profit distributions
+  plt.subplot(312)
+  plt.grid(True)
+  plt.title('Final Profits Across Trials')
+  plt.ylabel('Profits')
+  plt.boxplot(np.asarray(finalProfits), positions=positions)
+  if statistics is not None:
+    means = [producer['profits']['mean'] for producer in statistics['producers']]
+    plt.errorbar(positions, means, yerr=interval_errors(means, [producer['profits'] for producer in statistics['producers']]),
+                 fmt='o', color='red', ecolor='red', capsize=3, label='mean and 95% CI')
+  plt.xticks(positions, producerIDs, rotation=90, fontsize='small')
+
+  # plot mean profit trajectories
+  if meanProfits is not None:
+    plt.subplot(313)
+    plt.grid(True)
+    plt.title('Mean Profit Trajectories')
+    plt.ylabel('Profits')
+    plt.xlabel('Timestep')
+    for producerID, profits in zip(producerIDs, meanProfits):
+      plt.plot(timesteps, profits, label=producerID)
+    if len(producerIDs) <= 10:
+      plt.legend(loc='upper left', fontsize='small')
+
   plt.tight_layout()
-  plt.show()
\ No newline at end of file
+  plt.savefig(fileName)
+  plt.close('all')
+
+# centers (Array of floats)
+# summaries (Array of Dictionaries) - with ci_low and ci_high
+def interval_errors(centers, summaries):
+  "Returns the 2 x n lower and upper error bar lengths of confidence intervals around centers."
+  lows = [summary['ci_low'] if summary['ci_low'] is not None else center for center, summary in zip(centers, summaries)]
+  highs = [summary['ci_high'] if summary['ci_high'] is not None else center for center, summary in zip(centers, summaries)]
+  return [np.asarray(centers) - lows, np.asarray(highs) - np.asarray(centers)]
+
+###############################################################################
+# BACKGROUND PLOTTING
+###############################################################################
+
+# directory (str)
+def start_plotter(directory):
+  """
+  Creates directory if needed and returns a single-process pool that renders
+  figures in the background while the simulation keeps running. Submit work
+  with plotter.apply_async(plot_to_file, ...) and pass the returned jobs to
+  stop_plotter.
+  """
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  return mp.Pool(1)
+
+# plotter (multiprocessing Pool)
+# jobs (Array of AsyncResults)
+def stop_plotter(plotter, jobs):
+  "Waits for the background process to finish every submitted figure, re-raising any plotting error."
+  plotter.close()
+  plotter.join()
+  for job in jobs:
+    job.get()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the opt-in instrumentation used within validate.py and
+simulation.py. A Profiler adds up high resolution wall clock time per phase of
+a run (producer initialization, consumer decisions, profit snapshots, writing,
+plotting) and hot path counters (density evaluations, nearest-good lookups,
+sales). Phases and counters are updated once per timestep rather than once per
+consumer, and NULLPROFILER, used when profiling is off, ignores them all.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import cProfile # deterministic profiler
+import timeit   # high resolution timer
+
+###############################################################################
+# DEFINE PROFILER CLASSES
+###############################################################################
+
+class Phase(object):
+  "Context manager adding the time spent inside it to one phase of a Profiler."
+  __slots__ = ('times', 'name', 'start')
+  #times (Dictionary)
+  #name (str)
+  def __init__(self, times, name):
+    self.times = times
+    self.name = name
+
+  def __enter__(self):
+    self.start = timeit.default_timer()
+
+  def __exit__(self, *exception):
+    self.times[self.name] = self.times.get(self.name, 0.0) + timeit.default_timer() - self.start
+
+
+class Profiler(object):
+  "Class adding up the time spent in each phase and the counts of each counter."
+  def __init__(self):
+    self.times = dict()
+    self.counts = dict()
+
+  #name (str)
+  def phase(self, name):
+    "Returns a context manager timing the code inside it as part of phase name."
+    return Phase(self.times, name)
+
+  #name (str)
+  #number (int)
+  def count(self, name, number = 1):
+    "Adds number to counter name."
+    self.counts[name] = self.counts.get(name, 0) + number
+
+  def report(self):
+    "Returns the phase times in seconds and the counters as a JSON serializable dictionary."
+    return {'phases' : dict(self.times), 'counters' : dict((name, int(count)) for name, count in self.counts.items())}
+
+  #report (Dictionary)
+  def merge(self, report):
+    "Adds the phases and counters of a report returned by another Profiler."
+    for name, seconds in report['phases'].items():
+      self.times[name] = self.times.get(name, 0.0) + seconds
+    for name, count in report['counters'].items():
+      self.count(name, count)
+
+
+class NullPhase(object):
+  "Context manager that does nothing."
+  __slots__ = ()
+  def __enter__(self):
+    pass
+
+  def __exit__(self, *exception):
+    pass
+
+
+class NullProfiler(Profiler):
+  "Profiler used when profiling is off - every phase and counter is ignored."
+  nullPhase = NullPhase()
+
+  #name (str)
+  def phase(self, name):
+    return self.nullPhase
+
+  #name (str)
+  #number (int)
+  def count(self, name, number = 1):
+    pass
+
+NULLPROFILER = NullProfiler()
+
+###############################################################################
+# CPROFILE METHODS
+###############################################################################
+
+# statsFile (str)
+# function (function)
+# arguments (positional arguments of function)
+def profile_call(statsFile, function, *arguments):
+  """
+  Calls function under cProfile, writes the statistics to statsFile (readable
+  with the pstats module or snakeviz) and returns what function returned.
+  """
+  profile = cProfile.Profile()
+  try:
+    return profile.runcall(function, *arguments)
+  finally:
+    profile.dump_stats(statsFile)
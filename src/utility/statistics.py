@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+This file contains the online statistics used within validate.py and
+simulation.py. RunningStats keeps the count, mean and sum of squared deviations
+of a stream of values (Welford's algorithm, with Chan's formula for merging
+whole batches), so means, variances and confidence intervals are available at
+any time in O(1) memory per statistic. The values can be NumPy arrays, in which
+case every element is a separate statistic. Win rates get Wilson score
+intervals. Intervals are two-sided 95% intervals unless another confidence is
+asked for. SequentialStop decides when a run has done enough trials for the
+intervals it cares about to be as narrow as asked.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import math                     # error function
+import numpy as np              # numerical functionality
+
+# two-sided 95% critical values of Student's t distribution by degrees of freedom
+TCRITICAL = {1 : 12.706, 2 : 4.303, 3 : 3.182, 4 : 2.776, 5 : 2.571, 6 : 2.447, 7 : 2.365, 8 : 2.306,
+             9 : 2.262, 10 : 2.228, 11 : 2.201, 12 : 2.179, 13 : 2.160, 14 : 2.145, 15 : 2.131,
+             16 : 2.120, 17 : 2.110, 18 : 2.101, 19 : 2.093, 20 : 2.086, 21 : 2.080, 22 : 2.074,
+             23 : 2.069, 24 : 2.064, 25 : 2.060, 26 : 2.056, 27 : 2.052, 28 : 2.048, 29 : 2.045,
+             30 : 2.042, 40 : 2.021, 60 : 2.000, 120 : 1.980}
+# two-sided 95% critical value of the standard normal distribution
+ZCRITICAL = 1.959963984540054
+
+###############################################################################
+# DEFINE RUNNING STATISTICS CLASS
+###############################################################################
+
+class RunningStats(object):
+  "Welford mean and variance of a stream of values."
+  #count (int)
+  #mean (float or Array of floats)
+  #m2 (float or Array of floats) - sum of squared deviations from the mean
+  def __init__(self, count = 0, mean = 0.0, m2 = 0.0):
+    self.count = count
+    self.mean = mean
+    self.m2 = m2
+
+  #value (float or Array of floats)
+  def add(self, value):
+    "Adds one observation."
+    self.count += 1
+    delta = value - self.mean
+    self.mean = self.mean + delta / self.count
+    self.m2 = self.m2 + delta * (value - self.mean)
+
+  #values (Array) - observations along the first axis
+  def addBatch(self, values):
+    "Adds a batch of observations at once."
+    if len(values):
+      batchMean = values.mean(axis = 0)
+      self.merge(RunningStats(len(values), batchMean, ((values - batchMean)**2).sum(axis = 0)))
+
+  #other (RunningStats object)
+  def merge(self, other):
+    "Adds the observations summarized by another RunningStats."
+    if not other.count:
+      return
+    count = self.count + other.count
+    delta = other.mean - self.mean
+    self.mean = self.mean + delta * other.count / count
+    self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+    self.count = count
+
+  def variance(self):
+    "Returns the sample variance, or NaN with fewer than two observations."
+    if self.count < 2:
+      return self.mean * np.nan
+    return self.m2 / (self.count - 1)
+
+  def standardError(self):
+    "Returns the standard error of the mean."
+    return np.sqrt(self.variance() / self.count) if self.count else self.mean * np.nan
+
+  #confidence (float)
+  def halfWidth(self, confidence = 0.95):
+    "Returns the half width of the confidence interval of the mean."
+    return t_critical(self.count - 1, confidence) * self.standardError()
+
+  def interval(self):
+    "Returns the lower and upper ends of the confidence interval of the mean."
+    return self.mean - self.halfWidth(), self.mean + self.halfWidth()
+
+  def summary(self):
+    "Returns the count, mean, variance and confidence interval as a JSON serializable dictionary."
+    low, high = self.interval()
+    return {'count' : self.count, 'mean' : to_json(self.mean), 'variance' : to_json(self.variance()),
+            'ci_low' : to_json(low), 'ci_high' : to_json(high)}
+
+  def getState(self):
+    "Returns the statistic as a dictionary, for checkpoints."
+    return {'count' : self.count, 'mean' : self.mean, 'm2' : self.m2}
+
+###############################################################################
+# INTERVAL METHODS
+###############################################################################
+
+# confidence (float)
+def normal_critical(confidence = 0.95):
+  "Returns the two-sided critical value of the standard normal distribution."
+  if confidence == 0.95:
+    return ZCRITICAL
+  low, high = 0.0, 40.0
+  for _ in range(100):
+    middle = (low + high) / 2
+    if math.erf(middle / math.sqrt(2)) < confidence:
+      low = middle
+    else:
+      high = middle
+  return (low + high) / 2
+
+# degreesOfFreedom (int)
+# confidence (float)
+def t_critical(degreesOfFreedom, confidence = 0.95):
+  """
+  Returns the two-sided critical value of Student's t. At 95% it is read from
+  the table up to 120 degrees of freedom, rounding down; otherwise it is
+  expanded from the normal critical value (Abramowitz & Stegun 26.7.5), which
+  is accurate to a few parts in a thousand from 5 degrees of freedom on.
+  """
+  if degreesOfFreedom < 1:
+    return np.nan
+  if confidence == 0.95 and degreesOfFreedom <= max(TCRITICAL):
+    return TCRITICAL[max(df for df in TCRITICAL if df <= degreesOfFreedom)]
+  z, df = normal_critical(confidence), degreesOfFreedom
+  return (z + (z**3 + z) / (4 * df) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2) +
+          (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3) +
+          (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+# successes (int or Array of ints)
+# trials (int)
+# confidence (float)
+def wilson_interval(successes, trials, confidence = 0.95):
+  "Returns the lower and upper ends of the Wilson score interval of a success rate."
+  successes = np.asarray(successes, dtype = float)
+  if not trials:
+    return successes * np.nan, successes * np.nan
+  z = normal_critical(confidence)
+  rate = successes / trials
+  center = (rate + z**2 / (2 * trials)) / (1 + z**2 / trials)
+  halfWidth = z * np.sqrt(rate * (1 - rate) / trials + z**2 / (4 * trials**2)) / (1 + z**2 / trials)
+  # no successes or no failures put an end of the interval exactly at 0 or 1
+  low = np.where(successes == 0, 0.0, np.clip(center - halfWidth, 0, 1))
+  high = np.where(successes == trials, 1.0, np.clip(center + halfWidth, 0, 1))
+  return low, high
+
+# summary (Dictionary) - with mean, ci_low and ci_high
+def format_interval(summary):
+  "Returns a summary's mean and confidence interval as text."
+  if summary['ci_low'] is None:
+    return "{0:.4g}".format(summary['mean'])
+  return "{0:.4g} (CI {1:.4g} to {2:.4g})".format(summary['mean'], summary['ci_low'], summary['ci_high'])
+
+# value (float or Array of floats)
+def to_json(value):
+  "Returns value as a float or list of floats with NaN replaced by None."
+  if np.ndim(value):
+    return [to_json(item) for item in np.asarray(value).tolist()]
+  return None if np.isnan(value) else float(value)
+
+###############################################################################
+# DEFINE SEQUENTIAL STOPPING CLASS
+###############################################################################
+
+class SequentialStop(object):
+  """
+  Sequential stopping rule for a run of trials. The run looks at its results
+  after batches of trials and stops as soon as every producer's confidence
+  interval of the measure - 'win_rate' or 'profits' - has a half width of at
+  most targetPrecision, or maxTrials have run. Look k uses confidence
+  1 - alpha / (k (k + 1)), so the intervals of all looks hold together with
+  probability at least 1 - alpha and stopping on one of them keeps its
+  guarantee.
+  """
+  #targetPrecision (float) - largest half width accepted
+  #measure (str)
+  #minTrials (int) - trials before the first look
+  #maxTrials (int)
+  #alpha (float)
+  def __init__(self, targetPrecision, measure = 'win_rate', minTrials = 10, maxTrials = 1000, alpha = 0.05):
+    if measure not in ('win_rate', 'profits'):
+      raise ValueError("unknown precision measure '" + str(measure) + "', choose from: profits, win_rate")
+    self.targetPrecision = targetPrecision
+    self.measure = measure
+    self.minTrials = max(min(minTrials, maxTrials), 2)
+    self.maxTrials = maxTrials
+    self.alpha = alpha
+    self.trials = 0
+    self.looks = 0
+    self.confidence = None
+    self.halfWidth = np.inf
+    self.precise = False
+
+  #trials (int) - trials run so far
+  #workers (int)
+  def nextLook(self, trials, workers = 1):
+    """
+    Returns the number of trials to have run at the next look: minTrials at
+    first, then as many as the current half width says the target needs -
+    half widths shrink with the square root of the trials - but between a
+    quarter more and twice as many, rounded up to whole rounds of workers.
+    """
+    if not trials:
+      return min(self.minTrials, self.maxTrials)
+    needed = int(np.ceil(trials * min(max((self.halfWidth / self.targetPrecision)**2, 1.25), 2.0)))
+    batch = max(needed - trials, 1)
+    batch = int(np.ceil(batch / workers)) * workers
+    return min(trials + batch, self.maxTrials)
+
+  #wins (Array of ints) - wins of every producer
+  #profitStats (RunningStats object) - final profits of every producer
+  def look(self, wins, profitStats):
+    "Looks at the results so far and returns True when the run should stop."
+    self.looks += 1
+    self.trials = profitStats.count
+    self.confidence = 1 - self.alpha / (self.looks * (self.looks + 1))
+    if self.measure == 'win_rate':
+      lows, highs = wilson_interval(wins, self.trials, self.confidence)
+      halfWidths = (highs - lows) / 2
+    else:
+      halfWidths = profitStats.halfWidth(self.confidence)
+    self.halfWidth = np.max(halfWidths) if not np.any(np.isnan(halfWidths)) else np.inf
+    self.precise = self.halfWidth <= self.targetPrecision
+    return self.precise or self.trials >= self.maxTrials
+
+  def summary(self):
+    "Returns how the run stopped as a JSON serializable dictionary."
+    return {'measure' : self.measure, 'target_precision' : self.targetPrecision, 'trials' : self.trials,
+            'max_trials' : self.maxTrials, 'looks' : self.looks, 'confidence' : self.confidence,
+            'half_width' : None if np.isinf(self.halfWidth) else float(self.halfWidth), 'precise' : bool(self.precise)}
@@ -9,8 +9,9 @@ This file contains a special Validate class used just to validate the mathematic
 model being tested out on TWO producers. It's very similar to the Simulation class.
 The only thing differentiating producers here is the amount of goods in their inventory.
 Other options included here that cannot be found explicitly in simulation.py include
-explicitly choosing a test case and a buying decision function.
-In addition there is no plotting functionality included.
+explicitly choosing a test case. The decision making methods and the run loop
+are shared with simulation.py through the Model class in model.py.
+Plotting is turned off unless asked for with the plotting input.
 """
 
 ###############################################################################
@@ -18,99 +19,44 @@ In addition there is no plotting functionality included.
 ###############################################################################
 
 from __future__ import division # will always return floating point
-import time                     # for timing the simulation
-import random as rd             # random number generator
 import numpy as np              # numerical functionality
 
 # import custom-made modules
-from good import Good
-from producer import Producer
-from utility.file_io import read_json, write_json
+from market import Market
+from model import Model, run_options
+from utility.file_io import read_json
+from runoptions import RunOptions
 
 
 ###############################################################################
 # DEFINE SIMULATION CLASS
 ###############################################################################
 
-class Validate:
+class Validate(Model):
   "Class used to validate simulation models."
+  MODEL = 'validate'
+  SETUPLABELS = [('testCase', 'Test Case'), ('scenario', 'Scenario')]
+  BUYINGDECISION = 'nonRoulette'
   #simLength (int)
   #numGoods (int)
   #numConsumers (int)
-  def __init__(self, simLength, numGoods, numConsumers, percentFactory):
+  #inventory (Dictionary) - stock and rates per kind of producer, see Model.stockUp
+  #pricing (Dictionary) - pricing policy per kind of producer, see Model.priceUp
+  def __init__(self, simLength, numGoods, numConsumers, percentFactory, inventory = None, pricing = None):
     self.simLength = simLength
     self.numGoods = numGoods
     self.numConsumers = numConsumers
     self.numFactoryGoods = int(numGoods * percentFactory)
     self.numFabricatorGoods = numGoods - self.numFactoryGoods
+    self.inventory = inventory
+    self.pricing = pricing
 
-
-###############################################################################
-# DECISION MAKING METHODS
-###############################################################################
-
-  #goodDemanded (float)
-  #producer (Producer object)
-  def calcProbDensity(self, producer, goodDemanded):
-    bestGood = producer.getClosestTo(producer.getInventory(), goodDemanded)
-    probabilityDensity = (1 / (bestGood.getID() - goodDemanded)**2) * (1 / bestGood.getPrice())
-    return probabilityDensity
-
-  # producers (Array of Producers)
-  # goodDemanded (float)
-  def nonRoulette(self, producers, goodDemanded):
-    producerProbabilities = [{
-    "producer"    : producer,
-    "probability" : self.calcProbDensity(producer, goodDemanded)
-    } for producer in producers]
-    maxProbability = max(producerProbabilities, key = lambda key: key['probability'])
-    bestProducer = maxProbability['producer']
-    bestGood = bestProducer.getClosestTo(bestProducer.getInventory(), goodDemanded)
-    bestProducer.sell(bestGood)
-
-  # producers (Array of Producers)
-  # goodDemanded (float)
-  def roulette(self, producers, goodDemanded):
-    #Roulette Wheel Selection
-    producerProbabilities = [self.calcProbDensity(producer, goodDemanded) for producer in producers]
-    sumOfProbabilities = sum(producerProbabilities)
-    rouletteChoice = rd.random() * sumOfProbabilities
-    currentChoice = 0
-    bestProducer = producers[0]
-    for producer in producers:
-      currentChoice = currentChoice + self.calcProbDensity(producer, goodDemanded)
-      if(currentChoice >= rouletteChoice):
-        bestProducer = producer
-        break
-    if(currentChoice >= rouletteChoice):
-      bestGood = bestProducer.getClosestTo(bestProducer.getInventory(), goodDemanded)
-      bestProducer.sell(bestGood)
-
-  # producers (Array of Producers)
-  # goodDemanded (float)
-  # function (str)
-  def consumerBuysFrom(self, producers, goodDemanded, buyingDecision):
-    if buyingDecision == 'roulette':
-      return self.roulette(producers, goodDemanded)
-    elif buyingDecision == 'nonRoulette':
-      return self.nonRoulette(producers, goodDemanded)
-
-
-###############################################################################
-# MONITORSIM METHOD
-###############################################################################
-
-  def monitorSim(self, producers, profits, averageGoodDemanded, startSim, endSim, trial):
-    print "=================================================="
-    print max(profits, key = lambda key: sum(profits[key])) + " Wins!\n"
-    print "Average Good Demanded: " + str(averageGoodDemanded) + "\n"
-    for producer in producers:
-      print producer.getID() + " Profits: " + str(producer.getProfits())
-      print producer.getID() + " Average Price: " + str(producer.getAverageGoodPrice())
-      print producer.getID() + " Average Good Distance: " + str(abs(producer.getAverageGoodID() - (averageGoodDemanded)))
-      print ""
-    print "Simulation " + str(trial + 1) + " took " + str(endSim - startSim) + " seconds to run!"
-    print ""
+  #inputs (Dictionary) - contents of an input file
+  @classmethod
+  def fromInputs(cls, inputs):
+    "Returns the Validate described by an input file."
+    return cls(inputs['SIMLENGTH'], inputs['NUMGOODS'], inputs['NUMCONSUMERS'], inputs['PERCENTFACTORY'],
+               inputs.get('inventory'), inputs.get('pricing'))
 
 
 ###############################################################################
@@ -119,134 +65,81 @@ class Validate:
 
   # testCase (str)
   # scenario (Str)
-  def initialize_producers(self, testCase, scenario):
-    """Initializes distinct producers based on the scenario given as an input."""
+  # rng (numpy RandomState)
+  def initialize_producers(self, testCase, scenario, rng = np.random):
+    """
+    Initializes distinct producers based on the scenario given as an input. All
+    goodIDs and prices are drawn at once and stored in a Market.
+    """
     # initialize keys and number of goods based on scenario
     if scenario == 'factories':
       keys            = ['factory_0', 'factory_1']
       inventoryGoods  = [self.numFactoryGoods, self.numFactoryGoods]
-      goodConstants   = [[rd.random() for i in range(self.numFactoryGoods)], [rd.random() for i in range(self.numFactoryGoods)]]
+      goodConstants   = rng.random_sample(sum(inventoryGoods))
     elif scenario == 'fabricators':
       keys            = ['fabricator_0', 'fabricator_1']
       inventoryGoods  = [self.numFabricatorGoods, self.numFabricatorGoods]
-      goodConstants   = [[rd.random() for i in range(self.numFabricatorGoods)], [rd.random() for i in range(self.numFabricatorGoods)]]
+      goodConstants   = rng.random_sample(sum(inventoryGoods))
     elif scenario == 'all':
       keys            = ['factory_0', 'fabricator_1']
       inventoryGoods  = [self.numFactoryGoods, self.numFabricatorGoods]
-      goodConstants   = [[0.5 for i in range(self.numFactoryGoods)], [0.5 for i in range(self.numFabricatorGoods)]]
+      goodConstants   = np.full(sum(inventoryGoods), 0.5)
 
-    # array to keep track of producer profits
-    profits = dict()
-    profits[keys[0]] = np.zeros(self.simLength)
-    profits[keys[1]] = np.zeros(self.simLength)
+    # per-good bounds of the values that vary between the two producers
+    low  = np.repeat([0.4, 0.5], inventoryGoods)
+    high = np.repeat([0.6, 0.7], inventoryGoods)
+    swappedLow  = np.repeat([0.5, 0.4], inventoryGoods)
+    swappedHigh = np.repeat([0.7, 0.6], inventoryGoods)
 
-    # initialize producers based on testCase
+    # initialize goods based on testCase
     if testCase == 'constantIDs':
-      producers = [
-        Producer(keys[0], [Good(goodConstants[0][i], rd.uniform(0.4, 0.6)) for i in range(inventoryGoods[0])]),
-        Producer(keys[1], [Good(goodConstants[1][i], rd.uniform(0.5, 0.7)) for i in range(inventoryGoods[1])])
-      ]
+      goodIDs    = goodConstants
+      goodPrices = rng.uniform(low, high)
     elif testCase == 'constantPrices':
-      producers = [
-        Producer(keys[0], [Good(rd.uniform(0.4, 0.6), goodConstants[0][i]) for i in range(inventoryGoods[0])]),
-        Producer(keys[1], [Good(rd.uniform(0.5, 0.7), goodConstants[1][i]) for i in range(inventoryGoods[1])])
-      ]
+      goodIDs    = rng.uniform(low, high)
+      goodPrices = goodConstants
     elif testCase == 'noConstants':
-      producers = [
-        Producer(keys[0], [Good(rd.uniform(0.4, 0.6), rd.uniform(0.5, 0.7)) for i in range(inventoryGoods[0])]),
-        Producer(keys[1], [Good(rd.uniform(0.5, 0.7), rd.uniform(0.4, 0.6)) for i in range(inventoryGoods[1])])
-      ]
+      goodIDs    = rng.uniform(low, high)
+      goodPrices = rng.uniform(swappedLow, swappedHigh)
 
-    # return producers and profits array
-    return producers, profits
+    # return the market holding the producers and their profits
+    return Market(keys, inventoryGoods, goodIDs, goodPrices, self.simLength)
 
 
 ###############################################################################
-# RUN METHOD
+# RUN METHODS
 ###############################################################################
 
+  # trial        (int)
+  # seed         (int)
+  # testCase     (str)
+  # scenario     (str)
+  # options      (RunOptions object)
+  # trialOptions (keyword arguments of Model.simulateTrial)
+  def runTrial(self, trial, seed, testCase = 'constantIDs', scenario = 'factories', options = None, **trialOptions):
+    """
+    Runs a single validation simulation whose random numbers all come from seed
+    and returns a JSON serializable record of its results along with the
+    producers x timesteps profit history. See Model.simulateTrial.
+    """
+    return self.simulateTrial(trial, seed, {'testCase' : testCase, 'scenario' : scenario}, options, **trialOptions)
+
   # numTrials  (int)
   # testCase   (str)
+  # scenario   (str)
   # outputFile (str)
   # monitor    (boolean)
-  def run(self, numTrials = 1, testCase = 'constantIDs', scenario = 'factories', buyingDecision = 'nonRoulette', outputFile = 'validate', monitor = False):
-
-    # let user know simulation has started running
-    print "Running..."
-    print ""
-
-    # timing how long the trials take to run
-    startTrial = time.clock()
-
-    # initialize data structures for trials
-    producerData = dict()
-    wins = np.zeros(2)
-
-    for trial in range(numTrials):
-
-      # timing how long the simulation takes to run
-      startSim = time.clock()
-
-      # initialize producers
-      producers, profits = self.initialize_producers(testCase, scenario)
-
-      # run simulation
-      goodsDemanded = np.zeros(self.numConsumers * self.simLength) # keeping track of goods demanded
-      for timestep in range(self.simLength):
-        for numConsumer in range(self.numConsumers):
-          goodDemanded = rd.random()
-          goodsDemanded[numConsumer + (self.numConsumers * timestep)] = goodDemanded
-          self.consumerBuysFrom(producers, goodDemanded, buyingDecision)
-        for producer in producers:
-          profits[producer.getID()][timestep] = producer.getProfits()
-
-      # calculate the average good demanded
-      averageGoodDemanded = sum(goodsDemanded) / len(goodsDemanded)
-
-     #Prepare data to be written to file in JSON format
-      producerData.update({
-        "simulation_" + str(trial + 1) :
-          [{
-            "producerID"       : producer.getID(),
-            "profits"          : producer.getProfits(),
-            "average_price"    : producer.getAverageGoodPrice(),
-            "average_distance" : abs(producer.getAverageGoodID() - averageGoodDemanded)
-          } for producer in producers]
-      })
-
-      # timing how long the simulation takes to run
-      endSim = time.clock()
-
-      if monitor == True:
-        self.monitorSim(producers, profits, averageGoodDemanded, startSim, endSim, trial)
-
-      # add a win to the producer with the most profits
-      wins[int(max(profits, key = lambda key: sum(profits[key])).split('_')[-1])] += 1
-
-    # timing how long the trials take to run
-    endTrial = time.clock()
-
-    # write data to file in JSON format
-    write_json('../results/' + outputFile, producerData)
-
-    # print the results of trial runs to console
-    print "=================================================\n"
-    print "Input parameters were:\n"
-    print "SIMLENGTH = {simLength}\nNUMGOODS = {numGoods}\nNUMCONSUMERS = {numConsumers}".format(
-      simLength      = SIMLENGTH,
-      numGoods       = NUMGOODS,
-      numConsumers   = NUMCONSUMERS,
-      percentFactory = PERCENTFACTORY
-    )
-    print ""
-    print "Test Case was: " + testCase + "\n"
-    print "Scenario was: " + scenario + "\n"
-    print "Results for " + str(numTrials) + " trial(s):\n"
-    for producer in producers:
-      print producer.getID() + " won " + str(wins[int(producer.getID().split('_')[-1])]) + " time(s)\n"
-    print "Trials took " + str(endTrial - startTrial) + " seconds to run!"
-    print ""
-    print "================================================="
+  # options    (RunOptions object)
+  # progress   (function)
+  # changes    (keyword arguments of RunOptions)
+  def run(self, numTrials = 1, testCase = 'constantIDs', scenario = 'factories', outputFile = 'validate', monitor = False, options = None, progress = None, **changes):
+    """
+    Runs numTrials validation simulations and writes the results to an output
+    file in JSON format. The options are RunOptions, changed by any keyword
+    arguments given; see Model.runTrials.
+    """
+    options = (options or RunOptions()).replace(**changes)
+    return self.runTrials(numTrials, {'testCase' : testCase, 'scenario' : scenario}, outputFile, options, monitor, progress)
 
 
 ###############################################################################
@@ -266,13 +159,13 @@ if __name__ == "__main__":
   PERCENTFACTORY = inputs['PERCENTFACTORY']
 
   # Instantiate simulation
-  validate_sim = Validate(SIMLENGTH, NUMGOODS, NUMCONSUMERS, PERCENTFACTORY)
+  validate_sim = Validate(SIMLENGTH, NUMGOODS, NUMCONSUMERS, PERCENTFACTORY, inputs.get('inventory'), inputs.get('pricing'))
 
   validate_sim.run(
     numTrials      = inputs['numTrials'],
     testCase       = inputs['testCase'],
     scenario       = inputs['scenario'],
-    buyingDecision = inputs['buyingDecision'],
     outputFile     = outputFile,
-    monitor        = inputs['monitor']
+    monitor        = inputs['monitor'],
+    options        = run_options(inputs, sys.argv[2:])
   )
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Contains the WorkQueue class used to spread the trials of one run of
+simulation.py or validate.py over several processes or machines that share a
+directory, without a broker. File should be run from the command line as
+`workqueue.py submit inputfile queuedir [lease]`, then
+`workqueue.py work queuedir [workers]` on as many hosts as wanted, and
+`workqueue.py merge queuedir` once they are done; `workqueue.py status queuedir`
+tells how far along the queue is. submit writes one task file per trial - the
+model, inputs, trial and trial seed - to queuedir/tasks. Workers claim a task by
+renaming it into queuedir/claimed under their own name; only one rename of a
+file can succeed, so no two workers claim the same task. A worker renews its
+lease while the trial runs by touching the claimed file, and claims that haven't
+been touched for a lease are put back in queuedir/tasks by the next worker that
+looks, so the trials of a worker that crashed are run again. Lease ages are
+measured with the shared filesystem's clock rather than the workers'. Finished
+trials' records are renamed into queuedir/done. Trials are seeded from the
+master seed like any other run, so a trial that runs twice gives the same
+record, and merge writes the same results and summary, and prints the same
+report, as running the input file with simulation.py or validate.py would.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+from __future__ import division # will always return floating point
+import multiprocessing as mp    # local worker processes
+import os                       # interface with operating system
+import socket                   # naming workers by host
+import threading                # renewing leases while a trial runs
+import time                     # waiting for tasks
+
+# import custom-made modules
+from model import run_options
+from simulation import Simulation
+from validate import Validate
+from utility.file_io import read_json, write_json
+from utility.parallel import master_seed, trial_seeds
+from utility.statistics import RunningStats
+
+# seconds a claim lasts without being renewed, unless submit is given another
+LEASE = 300
+MODELS = {'simulation' : Simulation, 'validate' : Validate}
+
+###############################################################################
+# DEFINE WORK QUEUE CLASS
+###############################################################################
+
+class WorkQueue(object):
+  "Class used to share the trials of a run between workers through a directory."
+  #directory (str)
+  def __init__(self, directory):
+    self.directory = directory
+    self.tasks = os.path.join(directory, 'tasks')
+    self.claimed = os.path.join(directory, 'claimed')
+    self.done = os.path.join(directory, 'done')
+    self.worker = socket.gethostname() + '-' + str(os.getpid())
+
+
+###############################################################################
+# SUBMIT METHODS
+###############################################################################
+
+  #inputs (Dictionary) - contents of an input file, with an optional "model"
+  #name (str) - results file name
+  #lease (float) - seconds
+  def submit(self, inputs, name, lease = LEASE):
+    """
+    Creates the queue directory with the run's inputs and master seed and one
+    task per trial, and returns the master seed. The inputs are checked first,
+    so a run that can't be made fails here rather than on every worker.
+    """
+    if os.path.exists(self.directory):
+      raise ValueError("queue directory " + self.directory + " already exists")
+    modelName = inputs.get('model', 'simulation')
+    if modelName not in MODELS:
+      raise ValueError("unknown model '" + str(modelName) + "', choose from: " + ", ".join(sorted(MODELS)))
+    model = MODELS[modelName].fromInputs(inputs)
+    model.checkOptions(run_options(inputs).resolved(model))
+    seed = inputs['seed'] if inputs.get('seed') is not None else master_seed()
+    for directory in (self.tasks, self.claimed, self.done, os.path.join(self.directory, 'clocks')):
+      os.makedirs(directory)
+    self.write(os.path.join(self.directory, 'run.json'), {
+      "name"      : name,
+      "model"     : modelName,
+      "inputs"    : inputs,
+      "seed"      : seed,
+      "numTrials" : inputs['numTrials'],
+      "lease"     : lease
+    })
+    for trial, trialSeed in enumerate(trial_seeds(seed, inputs['numTrials'])):
+      self.write(os.path.join(self.tasks, task_file(trial)),
+                 {"trial" : trial, "seed" : trialSeed, "model" : modelName, "inputs" : inputs})
+    return seed
+
+  def info(self):
+    "Returns the run info written by submit."
+    return read_json(os.path.join(self.directory, 'run.json'))
+
+  #fileName (str)
+  #data (Dictionary)
+  def write(self, fileName, data):
+    "Writes JSON to a temporary name of this worker's and renames it into place."
+    temporary = fileName + '.' + self.worker + '.tmp'
+    write_json(temporary, data)
+    os.rename(temporary, fileName)
+
+
+###############################################################################
+# CLAIM METHODS
+###############################################################################
+
+  def now(self):
+    "Returns the shared filesystem's time, so workers whose clocks differ agree on lease ages."
+    clock = os.path.join(self.directory, 'clocks', self.worker)
+    with open(clock, 'a'):
+      os.utime(clock, None)
+    return os.stat(clock).st_ctime
+
+  def claim(self):
+    """
+    Claims the free task of the lowest trial and returns the claimed file name
+    and the task, or None if no task is free.
+    """
+    for fileName in sorted((name for name in os.listdir(self.tasks) if name.endswith('.json')), key = trial_of):
+      claimed = os.path.join(self.claimed, fileName[:-len('.json')] + '.' + self.worker + '.json')
+      try:
+        os.rename(os.path.join(self.tasks, fileName), claimed)
+      except OSError:
+        continue # another worker claimed it first
+      self.renew(claimed)
+      if os.path.exists(os.path.join(self.done, fileName)):
+        # put back after its lease ran out, but finished all the same
+        os.remove(claimed)
+        continue
+      return claimed, read_json(claimed)
+    return None
+
+  #claimed (str) - claimed file name
+  def renew(self, claimed):
+    "Renews the lease of a claimed task and returns False if it has already been reclaimed."
+    try:
+      os.utime(claimed, None)
+      return True
+    except OSError:
+      return False
+
+  #claimed (str) - claimed file name
+  #record (Dictionary)
+  def complete(self, claimed, record):
+    "Stores a finished trial's record and releases its claim."
+    self.write(os.path.join(self.done, task_file(trial_of(os.path.basename(claimed)))), record)
+    try:
+      os.remove(claimed)
+    except OSError:
+      pass # reclaimed meanwhile - whoever claims it next finds it finished
+
+  #lease (float) - seconds
+  def reclaim(self, lease):
+    """
+    Puts every claimed task whose lease has run out back in tasks and returns
+    how many were. Renaming and touching a file both update its ctime, so the
+    ctime is when the claim was last taken or renewed.
+    """
+    now = self.now()
+    reclaimed = 0
+    for fileName in os.listdir(self.claimed):
+      claimed = os.path.join(self.claimed, fileName)
+      try:
+        if now - os.stat(claimed).st_ctime > lease:
+          os.rename(claimed, os.path.join(self.tasks, task_file(trial_of(fileName))))
+          reclaimed += 1
+      except OSError:
+        continue # released or reclaimed by another worker meanwhile
+    return reclaimed
+
+  def status(self):
+    "Returns the number of free, claimed, expired and finished tasks."
+    lease, now = self.info()['lease'], self.now()
+    ages = []
+    for fileName in os.listdir(self.claimed):
+      try:
+        ages.append(now - os.stat(os.path.join(self.claimed, fileName)).st_ctime)
+      except OSError:
+        continue
+    return {'free'     : len([name for name in os.listdir(self.tasks) if name.endswith('.json')]),
+            'claimed'  : len(ages),
+            'expired'  : len([age for age in ages if age > lease]),
+            'finished' : len([name for name in os.listdir(self.done) if name.endswith('.json')])}
+
+
+###############################################################################
+# WORK METHODS
+###############################################################################
+
+  def work(self):
+    """
+    Claims and runs tasks until none are free or claimed by other workers, and
+    returns the number of trials run. While other workers still hold claims it
+    waits, in case their leases run out and their tasks need running again.
+    """
+    lease = self.info()['lease']
+    trialsRun = 0
+    while True:
+      self.reclaim(lease)
+      claim = self.claim()
+      if claim is None:
+        if not os.listdir(self.claimed) and not any(name.endswith('.json') for name in os.listdir(self.tasks)):
+          return trialsRun
+        time.sleep(min(lease / 4, 5))
+        continue
+      claimed, task = claim
+      self.complete(claimed, self.runTask(claimed, task, lease))
+      print self.worker + " finished trial " + str(task['trial'])
+      trialsRun += 1
+
+  #claimed (str) - claimed file name
+  #task (Dictionary)
+  #lease (float) - seconds
+  def runTask(self, claimed, task, lease):
+    "Runs a claimed task, renewing its lease four times a lease until it's done, and returns its record."
+    finished = threading.Event()
+    def renewLease():
+      while not finished.wait(lease / 4):
+        self.renew(claimed)
+    renewer = threading.Thread(target = renewLease)
+    renewer.daemon = True
+    renewer.start()
+    try:
+      return run_task(task)
+    finally:
+      finished.set()
+      renewer.join()
+
+
+###############################################################################
+# MERGE METHOD
+###############################################################################
+
+  def merge(self):
+    """
+    Writes the results of every finished trial to results/<name> and their
+    summary to results/<name>_summary.json like Model.runTrials, prints the
+    same report and returns the summary statistics.
+    """
+    info = self.info()
+    inputs = info['inputs']
+    model = MODELS[info['model']].fromInputs(inputs)
+    records = sorted((read_json(os.path.join(self.done, fileName)) for fileName in os.listdir(self.done)
+                      if fileName.endswith('.json')), key = lambda record: record['trial'])
+    if not records:
+      raise ValueError("no trials in " + self.directory + " have finished yet")
+    if len(records) < info['numTrials']:
+      print "Only " + str(len(records)) + " of " + str(info['numTrials']) + " trial(s) have finished\n"
+
+    # add the trials up in trial order, as a run on one machine does
+    producerData = dict()
+    wins = None
+    profitStats = RunningStats()
+    demandStats = RunningStats()
+    for record in records:
+      producerData["simulation_" + str(record['trial'] + 1)] = record['producers']
+      wins = model.tallyTrial(record, wins, profitStats, demandStats)
+    statistics = model.summaryStatistics([producer['producerID'] for producer in records[0]['producers']],
+                                         wins, profitStats, demandStats, records[0].get('demand_analytic', False))
+
+    write_json('../results/' + info['name'], producerData)
+    write_json('../results/' + os.path.splitext(info['name'])[0] + '_summary.json', statistics)
+    model.printResults(model.setupFrom(inputs), inputs.get('buyingDecision', model.BUYINGDECISION),
+                       inputs.get('engine', 'loop'), info['seed'], statistics,
+                       sum(record['time'] for record in records))
+    return statistics
+
+
+###############################################################################
+# TASK HELPERS
+###############################################################################
+
+# trial (int)
+def task_file(trial):
+  "Returns the file name of a trial's task."
+  return 'trial_' + str(trial) + '.json'
+
+# fileName (str) - a task, claimed or finished file name
+def trial_of(fileName):
+  "Returns the trial of a task file name, whichever worker's name it carries."
+  return int(fileName.split('.')[0][len('trial_'):])
+
+# task (Dictionary)
+def run_task(task):
+  "Runs the trial of a task and returns its record."
+  inputs = task['inputs']
+  model = MODELS[task['model']].fromInputs(inputs)
+  record, profitHistory = model.simulateTrial(task['trial'], task['seed'], model.setupFrom(inputs), run_options(inputs))
+  return record
+
+# directory (str)
+def work_queue(directory):
+  "Works through a queue - module level so it can be the target of a worker process."
+  trialsRun = WorkQueue(directory).work()
+  print str(trialsRun) + " trial(s) run by process " + str(os.getpid())
+
+
+###############################################################################
+# RUN QUEUE
+###############################################################################
+
+# command-line running of python script
+if __name__ == "__main__":
+  import sys
+  command = sys.argv[1]
+  if command == 'submit':
+    queue = WorkQueue(sys.argv[3])
+    inputs = read_json('../inputs/' + sys.argv[2])
+    seed = queue.submit(inputs, sys.argv[2], float(sys.argv[4]) if len(sys.argv) > 4 else LEASE)
+    print "Queued " + str(inputs['numTrials']) + " trial(s) of " + sys.argv[2] + " in " + queue.directory + \
+          " with master seed " + str(seed)
+  elif command == 'work':
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    if workers <= 1:
+      work_queue(sys.argv[2])
+    else:
+      processes = [mp.Process(target = work_queue, args = (sys.argv[2],)) for worker in range(workers)]
+      for process in processes:
+        process.start()
+      for process in processes:
+        process.join()
+  elif command == 'status':
+    status = WorkQueue(sys.argv[2]).status()
+    print str(status['finished']) + " finished, " + str(status['claimed']) + " claimed (" + str(status['expired']) + \
+          " past their lease) and " + str(status['free']) + " free trial(s)"
+  elif command == 'merge':
+    WorkQueue(sys.argv[2]).merge()
+  else:
+    print "Unknown command '" + command + "', choose from: submit, work, status, merge"
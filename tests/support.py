@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+# Agent-Based Simulation - Diffusion & Adoption of Personal Fabricators - PROTOTYPE
+# Original Author: Wyman Zhao
+# Contributor(s): Philipp Ross
+
+"""
+Shared helpers of the tests. Run the tests from the repository root with
+`python -m unittest discover -s tests` (or nosetests/pytest). The simulation
+modules are imported from src/, and tests that write results run from the src
+directory of a scratch copy of the project layout so that ../results,
+../cache and ../checkpoints never touch the real ones.
+"""
+
+###############################################################################
+# IMPORT MODULES
+###############################################################################
+
+import os                       # for paths
+import shutil                   # removing scratch directories
+import sys                      # import path and console output
+import tempfile                 # scratch directories
+import unittest                 # test cases
+from StringIO import StringIO   # swallowed console output
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if SRC not in sys.path:
+  sys.path.insert(0, SRC)
+
+###############################################################################
+# DEFINE WORKSPACE TEST CASE CLASS
+###############################################################################
+
+class WorkspaceTestCase(unittest.TestCase):
+  "Test case run from the src directory of a scratch project with inputs and results directories."
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    for name in ('src', 'inputs', 'results'):
+      os.mkdir(os.path.join(self.root, name))
+    self.cwd = os.getcwd()
+    os.chdir(os.path.join(self.root, 'src'))
+
+  def tearDown(self):
+    os.chdir(self.cwd)
+    shutil.rmtree(self.root)
+
+
+###############################################################################
+# HELPERS
+###############################################################################
+
+# function (callable)
+# args, kwargs - passed on to function
+def quietly(function, *args, **kwargs):
+  "Returns what function returns without letting it print to the console."
+  console, sys.stdout = sys.stdout, StringIO()
+  try:
+    return function(*args, **kwargs)
+  finally:
+    sys.stdout = console
+
+# record (Dictionary) - a trial's record
+def profits(record):
+  "Returns the profits of every producer of a trial's record."
+  return [producer['profits'] for producer in record['producers']]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+"""
+Tests of the benchmark suite: every run is appended to the history and leaves
+no results of its full runs behind, and benchmarks that got slower than the
+threshold are reported as regressions.
+"""
+
+import os
+import unittest
+
+import support
+from benchmark import Benchmark
+from utility.file_io import read_json_lines
+
+SPEC = {'sizes' : {'NUMGOODS' : [20], 'NUMPRODUCERS' : [2], 'NUMCONSUMERS' : [20]}, 'SIMLENGTH' : 3,
+        'engines' : ['loop', 'batch'], 'repeats' : 2, 'minTime' : 0.001, 'seed' : 1, 'threshold' : 0.25}
+
+class BenchmarkTest(support.WorkspaceTestCase):
+
+  def testRunsAreAppendedToTheHistory(self):
+    for run in range(2):
+      support.quietly(Benchmark(SPEC).run, 'bench.json')
+    history = list(read_json_lines('../results/bench_history.json'))
+    self.assertEqual(len(history), 2)
+    self.assertEqual(sorted(history[0]['results']), sorted(history[1]['results']))
+    self.assertEqual(len([name for name in history[0]['results'] if name.startswith('run[')]), 2)
+    self.assertEqual(sorted(os.listdir('../results')), ['bench_history.json'])
+
+  def testSlowerBenchmarksAreRegressions(self):
+    entry = {'machine' : 'here', 'python' : '2.7', 'date' : 'then', 'commit' : None}
+    history = [dict(entry, results = {'fast' : {'best' : 1.0}, 'slow' : {'best' : 1.0}}),
+               dict(entry, results = {'fast' : {'best' : 1.2}, 'slow' : {'best' : 1.0}}),
+               dict(entry, machine = 'elsewhere', results = {'fast' : {'best' : 9.0}, 'slow' : {'best' : 9.0}})]
+    current = dict(entry, results = {'fast' : {'best' : 1.2}, 'slow' : {'best' : 1.5}, 'new' : {'best' : 1.0}})
+    self.assertEqual(support.quietly(Benchmark(SPEC).compare, history, current), ['slow'])
+    self.assertEqual(support.quietly(Benchmark(SPEC).compare, [], current), [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""
+Tests of the trial cache: rerunning a configuration reads its trials back from
+../cache instead of running them again, and gives the same records.
+"""
+
+import os
+import unittest
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json, read_json_lines
+
+class TrialCacheTest(support.WorkspaceTestCase):
+
+  # simulation (Simulation object)
+  # outputFile (str)
+  # changes (keyword arguments of RunOptions)
+  def runCached(self, simulation, outputFile, **changes):
+    support.quietly(simulation.run, 4, 'all', outputFile, seed = 5, cache = True, output = 'ndjson', profile = True,
+                    plotting = None, **changes)
+    return list(read_json_lines('../results/' + outputFile)), read_json('../results/' + os.path.splitext(outputFile)[0] + '_profile.json')
+
+  def testRerunHitsTheCacheAndGivesTheSameRecords(self):
+    simulation = Simulation(10, 30, 100, 4, 0.5)
+    first, firstProfile = self.runCached(simulation, 'first.json')
+    self.assertEqual(len([name for name in os.listdir('../cache') if name.endswith('.json')]), 4)
+    second, secondProfile = self.runCached(simulation, 'second.json', workers = 2)
+    # cached trials keep the time they took to run and have no profile
+    self.assertEqual(second, first)
+    self.assertEqual(len(firstProfile['per_trial']), 4)
+    self.assertEqual(secondProfile['per_trial'], [])
+
+  def testChangedInputsMissTheCache(self):
+    first, firstProfile = self.runCached(Simulation(10, 30, 100, 4, 0.5), 'first.json')
+    second, secondProfile = self.runCached(Simulation(10, 30, 100, 4, 0.5), 'second.json', buyingDecision = 'nonRoulette')
+    self.assertEqual(len(secondProfile['per_trial']), 4)
+    self.assertEqual(len([name for name in os.listdir('../cache') if name.endswith('.json')]), 8)
+
+
+if __name__ == '__main__':
+  unittest.main()
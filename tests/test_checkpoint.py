@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Tests of checkpoints: a trial picked up from its last snapshot, and a run
+resumed after it was stopped, give the same results as running straight through.
+"""
+
+import os
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from simulation import Simulation
+from utility.file_io import read_json
+
+INVENTORY = {'factory' : {'stock' : 20, 'productionRate' : 1}, 'fabricator' : {'stock' : 5}}
+PRICING = {'factory' : {'policy' : 'demand'}, 'fabricator' : {'policy' : 'scarcity'}}
+
+class Stop(Exception):
+  "Raised to stop a run part of the way through."
+
+class TrialCheckpointTest(support.WorkspaceTestCase):
+
+  def testTrialResumedFromItsSnapshotMatchesAnUninterruptedTrial(self):
+    simulation = Simulation(10, 30, 100, 4, 0.5, INVENTORY, PRICING)
+    for engine in ('loop', 'batch'):
+      options = RunOptions(engine = engine, checkpointEvery = 4)
+      straight, straightHistory = simulation.runTrial(0, 9, 'all', options)
+      # the first run leaves its snapshot at timestep 8 behind for the second to pick up
+      simulation.runTrial(0, 9, 'all', options, checkpoint = 'trial_' + engine)
+      self.assertTrue(os.path.exists('trial_' + engine + '.npz'))
+      resumed, resumedHistory = simulation.runTrial(0, 9, 'all', options, checkpoint = 'trial_' + engine)
+      np.testing.assert_array_equal(resumedHistory, straightHistory)
+      for record in (straight, resumed):
+        record.pop('time')
+      self.assertEqual(resumed, straight)
+
+class RunResumeTest(support.WorkspaceTestCase):
+
+  # trials (int) - finished trials the run is stopped at
+  # numTrials (int)
+  def stopAfter(self, trials, numTrials):
+    if trials == 3:
+      raise Stop()
+
+  def testResumedRunMatchesAnUninterruptedRun(self):
+    simulation = Simulation(10, 30, 100, 4, 0.5, INVENTORY, PRICING)
+    straight = support.quietly(simulation.run, 6, 'all', 'straight.json', seed = 4, plotting = None, checkpointEvery = 4)
+    # without a seed the resumed run has to take the stopped run's from its checkpoints
+    self.assertRaises(Stop, support.quietly, simulation.run, 6, 'all', 'resumed.json', plotting = None, checkpointEvery = 4,
+                      seed = 4, progress = self.stopAfter)
+    self.assertEqual(len([name for name in os.listdir('../checkpoints/resumed') if name.endswith('.json')]), 4)
+    resumed = support.quietly(simulation.run, 6, 'all', 'resumed.json', plotting = None, checkpointEvery = 4, resume = True)
+    self.assertEqual(resumed, straight)
+    self.assertEqual(read_json('../results/resumed.json'), read_json('../results/straight.json'))
+    self.assertFalse(os.path.exists('../checkpoints/resumed'))
+
+
+if __name__ == '__main__':
+  unittest.main()
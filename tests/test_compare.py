@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Tests of paired comparisons: trial k of every scenario gets the same seed, so
+identical scenarios differ by nothing and the differences are those of the
+trials run one by one, and antithetic twins draw 1 - u for every uniform u.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from compare import Comparison
+from runoptions import RunOptions
+from simulation import Simulation
+from utility.parallel import trial_rngs, trial_seeds
+
+BASE = {'SIMLENGTH' : 8, 'NUMGOODS' : 20, 'NUMCONSUMERS' : 50, 'NUMPRODUCERS' : 3, 'PERCENTFACTORY' : 0.5,
+        'numTrials' : 6, 'scenario' : 'all', 'engine' : 'batch'}
+
+# scenarios (Array of Dictionaries)
+# antithetic (boolean)
+# workers (int)
+def compare(scenarios, antithetic = False, workers = 1):
+  "Returns the comparison of the scenarios over the base inputs."
+  spec = {'base' : BASE, 'scenarios' : scenarios, 'antithetic' : antithetic}
+  return support.quietly(Comparison(spec).run, 'compare.json', workers = workers, seed = 17)
+
+# trials (int)
+# antithetic (boolean)
+# changes (keyword arguments of Simulation)
+def profits(trials, antithetic = False, **changes):
+  "Returns the producers' profits of every trial of the base inputs run one by one."
+  inputs = dict(BASE, **changes)
+  simulation = Simulation.fromInputs(inputs)
+  step = 2 if antithetic else 1
+  seeds = trial_seeds(17, trials // step)
+  return np.array([support.profits(simulation.simulateTrial(trial, seeds[trial // step], simulation.setupFrom(inputs),
+                   RunOptions(engine = 'batch'), antithetic = antithetic and trial % 2 == 1)[0]) for trial in range(trials)])
+
+class ComparisonTest(support.WorkspaceTestCase):
+
+  def testIdenticalScenariosDoNotDiffer(self):
+    difference = compare([{}, {'engine' : 'loop'}])['differences'][0]
+    for entry in [difference['total_profits']] + [producer[key] for producer in difference['producers'] for key in ('profits', 'win_rate')]:
+      self.assertAlmostEqual(entry['mean'], 0.0, places = 9)
+      self.assertAlmostEqual(entry['ci_low'], 0.0, places = 9)
+      self.assertAlmostEqual(entry['ci_high'], 0.0, places = 9)
+
+  def testDifferencesAreThoseOfPairedTrials(self):
+    comparison = compare([{}, {'PERCENTFACTORY' : 0.2}])
+    paired = profits(6, PERCENTFACTORY = 0.2) - profits(6)
+    difference = comparison['differences'][0]
+    np.testing.assert_allclose([producer['profits']['mean'] for producer in difference['producers']], paired.mean(axis = 0))
+    self.assertAlmostEqual(difference['total_profits']['mean'], paired.sum(axis = 1).mean())
+    self.assertEqual(compare([{}, {'PERCENTFACTORY' : 0.2}], workers = 2), comparison)
+
+  def testAntitheticPairsAreOneObservation(self):
+    comparison = compare([{}, {'PERCENTFACTORY' : 0.2}], antithetic = True)
+    self.assertEqual((comparison['trials'], comparison['observations']), (6, 3))
+    paired = profits(6, True, PERCENTFACTORY = 0.2) - profits(6, True)
+    self.assertAlmostEqual(comparison['differences'][0]['total_profits']['mean'], paired.sum(axis = 1).mean())
+
+  def testScenariosMustShareTheirRandomNumbers(self):
+    self.assertRaises(ValueError, Comparison({'base' : BASE, 'scenarios' : [{}, {'NUMCONSUMERS' : 60}]}).expand)
+    self.assertRaises(ValueError, Comparison({'base' : dict(BASE, numTrials = 5), 'scenarios' : [{}], 'antithetic' : True}).expand)
+
+class AntitheticTest(unittest.TestCase):
+
+  def testTwinsDrawOneMinusU(self):
+    for plain, twin in zip(trial_rngs(5), trial_rngs(5, antithetic = True)):
+      np.testing.assert_allclose(twin.random_sample(4), 1 - plain.random_sample(4))
+      np.testing.assert_allclose(twin.uniform(0.0, 2.0, 4), 2.0 - plain.uniform(0.0, 2.0, 4))
+
+  def testTwinsOfATrialDiffer(self):
+    self.assertFalse(np.array_equal(profits(2, True)[1], profits(1)[0]))
+
+
+if __name__ == '__main__':
+  unittest.main()
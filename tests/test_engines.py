@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""
+Tests of the engines and buying-decision kernels: on static markets they must
+make the same decisions as each other, so their trials agree.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from simulation import Simulation
+
+# simulation (Simulation object)
+# buyingDecision (str)
+# engine (str)
+# trial (int)
+def history(simulation, buyingDecision, engine, trial):
+  "Returns the producers x timesteps profit history of a trial of the 'all' scenario."
+  return simulation.runTrial(trial, 100 + trial, 'all', RunOptions(buyingDecision = buyingDecision, engine = engine))[1]
+
+class BatchEngineTest(unittest.TestCase):
+
+  def testBatchAgreesWithLoop(self):
+    # consumers see the same goods demanded and roulette spins with either engine
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      for trial in range(3):
+        np.testing.assert_allclose(history(simulation, buyingDecision, 'batch', trial),
+                                   history(simulation, buyingDecision, 'loop', trial), rtol = 1e-9)
+
+class TableEngineTest(unittest.TestCase):
+
+  def testTableAgreesWithBatch(self):
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for trial in range(3):
+      np.testing.assert_allclose(history(simulation, 'nonRoulette', 'table', trial),
+                                 history(simulation, 'nonRoulette', 'batch', trial), rtol = 1e-9)
+
+  def testTableAgreesWithBatchWhenPricesChange(self):
+    # the table is only recomputed around the goods that changed price
+    simulation = Simulation(10, 30, 200, 4, 0.5, pricing = {'factory' : {'policy' : 'demand', 'rate' : 0.1}})
+    for trial in range(3):
+      np.testing.assert_allclose(history(simulation, 'nonRoulette', 'table', trial),
+                                 history(simulation, 'nonRoulette', 'batch', trial), rtol = 1e-9)
+
+  def testTableAgreesWithBatchWithManyProducers(self):
+    # only the producers that can win an interval are crossed with each other
+    simulation = Simulation(5, 300, 200, 150, 0.5)
+    np.testing.assert_allclose(history(simulation, 'nonRoulette', 'table', 0),
+                               history(simulation, 'nonRoulette', 'batch', 0), rtol = 1e-9)
+
+  def testTableOnlyMakesNonRouletteDecisions(self):
+    simulation = Simulation(5, 20, 10, 2, 0.5)
+    self.assertRaises(ValueError, simulation.runTrial, 0, 1, 'all', RunOptions(buyingDecision = 'roulette', engine = 'table'))
+
+class PrunedKernelTest(unittest.TestCase):
+
+  def testNonRoulettePrunedMakesTheNonRouletteDecisions(self):
+    # enough producers for the windows to leave most of them out
+    simulation = Simulation(5, 2000, 500, 400, 0.5)
+    for trial in range(3):
+      np.testing.assert_array_equal(history(simulation, 'nonRoulettePruned', 'batch', trial),
+                                    history(simulation, 'nonRoulette', 'batch', trial))
+
+  def testRoulettePrunedMakesTheRouletteDecisions(self):
+    # the same spins land on the same producers whichever producers were evaluated
+    simulation = Simulation(5, 2000, 500, 400, 0.5)
+    for trial in range(3):
+      np.testing.assert_array_equal(history(simulation, 'roulettePruned', 'batch', trial),
+                                    history(simulation, 'roulette', 'batch', trial))
+
+  def testPrunedKernelsFollowStockAndPrices(self):
+    simulation = Simulation(5, 400, 500, 200, 0.5, inventory = {'factory' : {'stock' : 2}, 'fabricator' : {'stock' : 2}},
+                            pricing = {'factory' : {'policy' : 'demand', 'rate' : 0.1}})
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      np.testing.assert_array_equal(history(simulation, buyingDecision + 'Pruned', 'batch', 0),
+                                    history(simulation, buyingDecision, 'batch', 0))
+
+if __name__ == '__main__':
+  unittest.main()
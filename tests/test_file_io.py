@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""
+Tests of streamed results: with output = 'ndjson' every trial's record is a
+line of the results file, holding what the JSON document would.
+"""
+
+import unittest
+
+import support
+from simulation import Simulation
+from utility.file_io import append_json_line, clear_json_lines, read_json, read_json_lines
+
+class JsonLinesTest(support.WorkspaceTestCase):
+
+  def testLinesHoldTheRecordsOfTheJsonDocument(self):
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    document = support.quietly(simulation.run, 4, 'all', 'run.json', seed = 2, plotting = None)
+    streamed = support.quietly(simulation.run, 4, 'all', 'run.ndjson', seed = 2, plotting = None, output = 'ndjson')
+    self.assertEqual(streamed, document)
+    records = list(read_json_lines('../results/run.ndjson'))
+    results = read_json('../results/run.json')
+    self.assertEqual([record['trial'] for record in records], range(4))
+    for record in records:
+      self.assertEqual(record['producers'], results['simulation_' + str(record['trial'] + 1)])
+
+  def testRerunStartsAFreshFile(self):
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    for numTrials in (4, 2):
+      support.quietly(simulation.run, numTrials, 'all', 'run.ndjson', seed = 2, plotting = None, output = 'ndjson')
+    self.assertEqual(len(list(read_json_lines('../results/run.ndjson'))), 2)
+
+  def testLineStillBeingWrittenIsSkipped(self):
+    clear_json_lines('../results/lines.ndjson')
+    append_json_line('../results/lines.ndjson', {'trial' : 0})
+    with open('../results/lines.ndjson', 'a') as f:
+      f.write('{"trial" : 1, "produ')
+    self.assertEqual(list(read_json_lines('../results/lines.ndjson')), [{'trial' : 0}])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""
+Tests of dynamic inventories and prices: the loop engine has to sell the good
+its buying decision chose, even when goods share a goodID, so that it agrees
+with the batch engine, and the stock index has to find the nearest good in
+stock and keep the goods in stock compacted as goods sell out and are
+restocked.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from stock import StockIndex
+from validate import Validate
+
+INVENTORY = {'factory' : {'stock' : 3}, 'fabricator' : {'stock' : 3}}
+PRICING = {'factory' : {'policy' : 'demand'}, 'fabricator' : {'policy' : 'demand', 'rate' : 0.1}}
+
+class DuplicateGoodIDsTest(unittest.TestCase):
+  "constantIDs gives every good of the 'all' scenario the goodID 0.5."
+
+  # buyingDecision (str)
+  # engine (str)
+  # options (keyword arguments of Validate)
+  def runTrial(self, buyingDecision, engine, **options):
+    validate = Validate(20, 50, 100, 0.1, **options)
+    return validate.runTrial(0, 7, 'constantIDs', 'all', RunOptions(buyingDecision = buyingDecision, engine = engine))
+
+  def testStockedGoodsSellWhenAnotherGoodWithTheirIDRunsOut(self):
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      loop, loopHistory = self.runTrial(buyingDecision, 'loop', inventory = INVENTORY)
+      batch, batchHistory = self.runTrial(buyingDecision, 'batch', inventory = INVENTORY)
+      np.testing.assert_allclose(support.profits(loop), support.profits(batch), rtol = 1e-9)
+      self.assertEqual([producer['goods_in_stock'] for producer in loop['producers']],
+                       [producer['goods_in_stock'] for producer in batch['producers']])
+      self.assertGreater(support.profits(loop)[1], 0)
+
+  def testSalesAreBookedToTheChosenGood(self):
+    # pricing policies reprice every good from its own sales
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      loop, loopHistory = self.runTrial(buyingDecision, 'loop', pricing = PRICING)
+      batch, batchHistory = self.runTrial(buyingDecision, 'batch', pricing = PRICING)
+      np.testing.assert_allclose(loopHistory, batchHistory, rtol = 1e-9)
+
+class StockIndexTest(unittest.TestCase):
+
+  def testNearestInStockMatchesAScan(self):
+    rng = np.random.RandomState(2)
+    # two producers' goods, sorted within each slice
+    goodIDs = np.concatenate((np.sort(rng.random_sample(40)), np.sort(rng.random_sample(30))))
+    inStock = rng.random_sample(70) < 0.5
+    index = StockIndex(goodIDs, inStock)
+    for step in range(200):
+      # goods sell out and are restocked one at a time
+      good = rng.randint(70)
+      index.update(good, -1 if inStock[good] else 1)
+      inStock[good] = not inStock[good]
+      goodDemanded = rng.random_sample()
+      for start, end in ((0, 40), (40, 70)):
+        stocked = [i for i in range(start, end) if inStock[i]]
+        scanned = min(stocked, key = lambda i: (abs(goodDemanded - goodIDs[i]), i)) if stocked else -1
+        insertion = start + int(goodIDs[start:end].searchsorted(goodDemanded))
+        self.assertEqual(index.nearest(start, end, insertion, goodDemanded), scanned)
+    self.assertEqual(index.count, inStock.sum())
+
+  def testGoodsInStockStayCompacted(self):
+    rng = np.random.RandomState(3)
+    goodIDs = np.sort(rng.random_sample(100))
+    inStock = rng.random_sample(100) < 0.5
+    index = StockIndex(goodIDs, inStock)
+    for step in range(100):
+      # batches of goods sell out or are restocked, with single sales in between
+      delta = 1 if step % 2 else -1
+      goods = np.flatnonzero(inStock != (delta > 0))
+      goods = np.sort(rng.choice(goods, min(len(goods), 2), replace = False))
+      inStock[goods] = delta > 0
+      index.updateMany(goods, delta, inStock)
+      if step % 7 == 0 and inStock.any():
+        good = rng.choice(np.flatnonzero(inStock))
+        inStock[good] = False
+        index.update(good, -1)
+      inStockGoods, inStockIDs = index.inStockGoods()
+      self.assertEqual(inStockGoods.tolist(), np.flatnonzero(inStock).tolist())
+      self.assertEqual(inStockIDs.tolist(), goodIDs[inStock].tolist())
+
+
+if __name__ == '__main__':
+  unittest.main()
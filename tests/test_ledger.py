@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""
+Tests of the sales ledger: it records every sale once, so the revenue it adds
+up to is the producers' profits, whichever engine made the sales and however
+often the ledger spilled to its files.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from simulation import Simulation
+from utility.file_io import read_profit_cube
+from utility.ledger import ledger_chunks, market_share, read_ledger
+
+class LedgerTest(support.WorkspaceTestCase):
+
+  # engine (str)
+  # ledgerBudget (float) - megabytes
+  def runLedger(self, engine, ledgerBudget = 64):
+    name = 'ledger_' + engine
+    support.quietly(Simulation(6, 20, 40, 4, 0.5).run, 3, 'all', name + '.json', seed = 12, plotting = None, engine = engine,
+                    ledger = True, ledgerBudget = ledgerBudget, saveProfits = True)
+    return '../results/' + name + '_ledger', read_profit_cube('../results/' + name + '_profits')[0]
+
+  def testSalesAddUpToTheProfits(self):
+    # a budget of a few records spills to the files many times per timestep
+    directory, cube = self.runLedger('loop', 0.0001)
+    trials = read_ledger(directory)[0]
+    self.assertEqual(sorted(trials), range(3))
+    for trial, records in trials.items():
+      self.assertEqual(len(records), 6 * 40)
+      revenue = np.zeros((4, 6))
+      np.add.at(revenue, (records['producer'], records['timestep']), records['price'])
+      np.testing.assert_allclose(np.cumsum(revenue, axis = 1), cube[trial], rtol = 1e-9)
+    self.assertEqual(sum(len(chunk) for chunk in ledger_chunks(directory, 100)), 3 * 6 * 40)
+    np.testing.assert_allclose(market_share(directory).sum(axis = 1), np.ones(6))
+
+  def testEnginesRecordTheSameSales(self):
+    loop = self.runLedger('loop')[0]
+    batch = self.runLedger('batch')[0]
+    fields = ['trial', 'timestep', 'consumer', 'producer', 'good']
+    for loopRecords, batchRecords in zip(ledger_chunks(loop), ledger_chunks(batch)):
+      order = np.lexsort([loopRecords[field] for field in reversed(fields)])
+      batchOrder = np.lexsort([batchRecords[field] for field in reversed(fields)])
+      for field in fields:
+        np.testing.assert_array_equal(loopRecords[order][field], batchRecords[batchOrder][field])
+      np.testing.assert_allclose(loopRecords[order]['price'], batchRecords[batchOrder]['price'])
+
+  def testMeanfieldIsRejected(self):
+    options = RunOptions(engine = 'meanfield', ledger = True)
+    self.assertRaises(ValueError, Simulation(6, 20, 40, 4, 0.5).checkOptions, options)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+"""
+Tests of the Market: every producer is a view over its slice of the flat goodID,
+price and profits arrays, with its goods sorted by goodID.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from market import Market
+
+class MarketTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = np.random.RandomState(5)
+    self.goodIDs, self.goodPrices = rng.random_sample(12), rng.random_sample(12)
+    self.market = Market(['factory_0', 'factory_1', 'fabricator_0'], [3, 4, 5], self.goodIDs, self.goodPrices, 6)
+
+  def testProducersHoldTheirOwnGoodsSortedByGoodID(self):
+    for producer, first, last in zip(self.market.getProducers(), [0, 3, 7], [3, 7, 12]):
+      order = np.argsort(self.goodIDs[first:last])
+      np.testing.assert_array_equal(producer.goodIDs, self.goodIDs[first:last][order])
+      # every good keeps its price
+      np.testing.assert_array_equal(producer.goodPrices, self.goodPrices[first:last][order])
+
+  def testProducersAreViews(self):
+    producer = self.market.getProducers()[1]
+    producer.sell(producer.getInventory()[0])
+    self.assertEqual(self.market.profits.tolist(), [0, producer.goodPrices[0], 0])
+    self.market.snapshot(2)
+    self.assertEqual(self.market.getProfits()['factory_1'].tolist(), [0, 0, producer.goodPrices[0], 0, 0, 0])
+    self.market.goodPrices[self.market.offsets[1]] = 2.0
+    self.assertEqual(producer.getInventory()[0].getPrice(), 2.0)
+
+  def testClosestIndicesAreFlat(self):
+    goodsDemanded = np.linspace(0, 1, 25)
+    closest = self.market.getClosestIndices(goodsDemanded)
+    for i, producer in enumerate(self.market.getProducers()):
+      np.testing.assert_array_equal(closest[:, i] - self.market.offsets[i], producer.getClosestIndices(goodsDemanded))
+
+
+if __name__ == '__main__':
+  unittest.main()
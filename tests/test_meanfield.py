@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+"""
+Tests of the meanfield engine: the expected profits it credits must lie within
+the Monte Carlo confidence intervals of the batch engine's stochastic trials.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from simulation import Simulation
+from utility.statistics import normal_critical
+
+class MeanFieldTest(support.WorkspaceTestCase):
+
+  def testTrialsAreWithinTheirProfitVariance(self):
+    # a trial with the same seed has the same goods with either engine
+    simulation = Simulation(10, 30, 1000, 4, 0.5)
+    z = normal_critical(0.999)
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      for trial in range(5):
+        expected, history = simulation.runTrial(trial, 40 + trial, 'all', RunOptions(buyingDecision = buyingDecision, engine = 'meanfield'))
+        drawn, history = simulation.runTrial(trial, 40 + trial, 'all', RunOptions(buyingDecision = buyingDecision, engine = 'batch'))
+        for expectedProducer, drawnProducer in zip(expected['producers'], drawn['producers']):
+          self.assertLessEqual(abs(drawnProducer['profits'] - expectedProducer['profits']),
+                               z * np.sqrt(expectedProducer['profits_variance']) + 1e-9)
+
+  def testMeanProfitsAreWithinTheBatchConfidenceIntervals(self):
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for buyingDecision in ('roulette', 'nonRoulette'):
+      expected = support.quietly(simulation.run, 30, 'all', 'meanfield.json', seed = 8, buyingDecision = buyingDecision,
+                                 engine = 'meanfield', plotting = None)
+      drawn = support.quietly(simulation.run, 30, 'all', 'batch.json', seed = 8, buyingDecision = buyingDecision,
+                              engine = 'batch', plotting = None)
+      self.assertTrue(expected['demand']['analytic'])
+      for expectedProducer, drawnProducer in zip(expected['producers'], drawn['producers']):
+        self.assertGreaterEqual(expectedProducer['profits']['mean'], drawnProducer['profits']['ci_low'])
+        self.assertLessEqual(expectedProducer['profits']['mean'], drawnProducer['profits']['ci_high'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+"""
+Tests of running trials on a pool of workers: every trial is seeded from the
+master seed, so the results are the same for any number of workers.
+"""
+
+import unittest
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json, read_json_lines
+from utility.parallel import trial_seeds
+
+class WorkersTest(support.WorkspaceTestCase):
+
+  def testResultsDoNotDependOnTheWorkers(self):
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    one = support.quietly(simulation.run, 7, 'all', 'one.json', seed = 13, plotting = None)
+    three = support.quietly(simulation.run, 7, 'all', 'three.json', seed = 13, plotting = None, workers = 3)
+    self.assertEqual(three, one)
+    self.assertEqual(read_json('../results/three.json'), read_json('../results/one.json'))
+
+  def testTrialsAreSeededFromTheMasterSeed(self):
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    support.quietly(simulation.run, 4, 'all', 'run.ndjson', seed = 13, plotting = None, workers = 2, output = 'ndjson')
+    records = sorted(read_json_lines('../results/run.ndjson'), key = lambda record: record['trial'])
+    # extending a run reproduces the trials already done
+    self.assertEqual(trial_seeds(13, 4), trial_seeds(13, 7)[:4])
+    for record, seed in zip(records, trial_seeds(13, 4)):
+      self.assertEqual(record['seed'], seed)
+      alone, history = simulation.runTrial(record['trial'], seed, 'all')
+      self.assertEqual(support.profits(alone), support.profits(record))
+
+
+if __name__ == '__main__':
+  unittest.main()
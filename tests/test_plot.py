@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+"""
+Tests of headless plotting: with plotting = 'file' a figure of every trial and
+a summary figure are rendered in the background into results/<name>_plots.
+"""
+
+import os
+import unittest
+import numpy as np
+
+import support
+from simulation import Simulation
+from utility.plot import downsample, interval_errors
+
+PNG = '\x89PNG\r\n\x1a\n'
+
+class PlotToFileTest(support.WorkspaceTestCase):
+
+  def testEveryTrialAndTheSummaryAreRendered(self):
+    support.quietly(Simulation(8, 20, 50, 4, 0.5).run, 3, 'all', 'plotted.json', seed = 6, plotting = 'file')
+    figures = sorted(os.listdir('../results/plotted_plots'))
+    self.assertEqual(figures, ['simulation_1.png', 'simulation_2.png', 'simulation_3.png', 'summary.png'])
+    for figure in figures:
+      with open(os.path.join('../results/plotted_plots', figure), 'rb') as f:
+        self.assertEqual(f.read(len(PNG)), PNG)
+
+class PlotHelpersTest(unittest.TestCase):
+
+  def testDownsampleKeepsTheFirstAndLastTimesteps(self):
+    profitHistory = np.cumsum(np.ones((2, 2000)), axis = 1)
+    timesteps, columns = downsample(profitHistory, 500)
+    self.assertLessEqual(len(timesteps), 500)
+    self.assertEqual((timesteps[0], timesteps[-1]), (0, 1999))
+    np.testing.assert_array_equal(columns, profitHistory[:, timesteps])
+    self.assertEqual(len(downsample(profitHistory[:, :10], 500)[0]), 10)
+
+  def testMissingIntervalsHaveNoErrorBars(self):
+    errors = interval_errors([1.0, 2.0], [{'ci_low' : 0.5, 'ci_high' : 2.0}, {'ci_low' : None, 'ci_high' : None}])
+    np.testing.assert_array_equal(errors, [[0.5, 0.0], [1.0, 0.0]])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""
+Tests of dynamic pricing: at the end of every timestep each policy reprices
+all of its producers' goods at once from that timestep's sales, policies that
+need stock are rejected before any trial runs without it, and the prefix sums
+of the pruned kernels' GoodsIndex are brought up to date from the goods whose
+price changed.
+"""
+
+import os
+import unittest
+import numpy as np
+
+import support
+from goodsindex import GoodsIndex
+from market import Market
+from simulation import Simulation
+
+class PricingTest(unittest.TestCase):
+
+  def setUp(self):
+    # goodIDs already sorted, so flat indices are in input order
+    self.market = Market(['factory_0', 'fabricator_0'], [3, 2], np.array([0.1, 0.2, 0.3, 0.4, 0.5]),
+                         np.array([0.5, 1.0, 1.9, 0.5, 0.5]), 4)
+
+  def testDemandRepricesFromSales(self):
+    self.market.setPricing([{'policy' : 'demand', 'rate' : 0.1, 'target' : 1}, {'policy' : 'fixed'}])
+    self.market.sales[:] = [0, 1, 3, 5, 0]
+    changed = self.market.reprice()
+    # cheaper, unchanged at target, dearer but no dearer than maxPrice, and fixed
+    np.testing.assert_allclose(self.market.goodPrices, [0.45, 1.0, 2.0, 0.5, 0.5])
+    self.assertEqual(changed.tolist(), [0, 2])
+    self.assertEqual(self.market.sales.tolist(), [0] * 5)
+    self.assertEqual(self.market.getProducers()[0].getInventory()[2].getPrice(), 2.0)
+
+  def testScarcityRepricesFromStock(self):
+    self.market.setStock([4, 2], [0, 0], [1, 1])
+    self.market.setPricing([{'policy' : 'scarcity', 'rate' : 1.0}] * 2)
+    self.market.stock[:] = [4, 2, 0, 1, 2]
+    self.market.reprice()
+    np.testing.assert_allclose(self.market.goodPrices, [0.5, 1.5, 2.0, 0.75, 0.5])
+
+  def testUnknownPoliciesAreRejected(self):
+    self.assertRaises(ValueError, self.market.setPricing, [{'policy' : 'auction'}] * 2)
+
+  def testScarcityNeedsStock(self):
+    self.assertRaises(ValueError, self.market.setPricing, [{'policy' : 'scarcity'}, {'policy' : 'fixed'}])
+
+class PricingOptionsTest(support.WorkspaceTestCase):
+
+  def testScarcityWithoutInventoriesFailsBeforeAnyTrial(self):
+    simulation = Simulation(5, 20, 30, 3, 0.5, pricing = {'factory' : {'policy' : 'scarcity'}})
+    self.assertRaises(ValueError, support.quietly, simulation.run, 2, 'all', 'scarce.json', plotting = None)
+    self.assertEqual(os.listdir('../results'), [])
+    simulation.inventory = {'factory' : {'stock' : 2}}
+    support.quietly(simulation.run, 2, 'all', 'scarce.json', plotting = None)
+
+class GoodsIndexTest(unittest.TestCase):
+
+  def testUpdateMatchesARebuild(self):
+    rng = np.random.RandomState(4)
+    market = Market(['producer_' + str(i) for i in range(5)], [40] * 5, rng.random_sample(200), rng.random_sample(200) + 0.5, 4)
+    index = GoodsIndex(market)
+    for step in range(5):
+      changed = np.sort(rng.choice(200, 3, replace = False))
+      market.goodPrices[changed] *= 1.1
+      index.update(changed)
+      self.assertEqual(index.weights.tolist(), GoodsIndex(market).weights.tolist())
+    index.update(np.array([], dtype = int))
+    self.assertEqual(index.weights.tolist(), GoodsIndex(market).weights.tolist())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""
+Tests of the sorted goodID index of a Producer: its nearest-good lookups must
+find the good a scan of the whole inventory finds.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from good import Good
+from producer import Producer
+
+class ClosestGoodTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = np.random.RandomState(3)
+    self.goods = [Good(goodID, price) for goodID, price in zip(rng.random_sample(50), rng.random_sample(50))]
+    self.producer = Producer('factory_0', self.goods)
+    # below, between and above the goods, and on them
+    self.goodsDemanded = np.concatenate((rng.random_sample(200), [0.0, 1.0], [good.getID() for good in self.goods[:5]]))
+
+  def testLookupsMatchAScan(self):
+    for goodDemanded in self.goodsDemanded:
+      closest = self.producer.getClosestTo(self.producer.getInventory(), goodDemanded)
+      scanned = min(self.goods, key = lambda good: abs(goodDemanded - good.getID()))
+      self.assertEqual(closest.getID(), scanned.getID())
+      self.assertEqual(closest.getPrice(), scanned.getPrice())
+
+  def testVectorizedLookupsMatchOneAtATime(self):
+    indices = self.producer.getClosestIndices(self.goodsDemanded)
+    self.assertEqual(indices.tolist(), [self.producer.getClosestIndex(goodDemanded) for goodDemanded in self.goodsDemanded])
+
+  def testTiesGoLeft(self):
+    producer = Producer('factory_0', [Good(0.25, 1.0), Good(0.75, 1.0)])
+    self.assertEqual(producer.getClosestTo(producer.getInventory(), 0.5).getID(), 0.25)
+    self.assertEqual(producer.getClosestIndices(np.array([0.5])).tolist(), [0])
+
+  def testSellCreditsThePrice(self):
+    good = self.producer.getClosestTo(self.producer.getInventory(), 0.5)
+    self.producer.sell(good, self.producer.getClosestIndexTo(0.5))
+    self.producer.sell(good)
+    self.assertAlmostEqual(self.producer.getProfits(), 2 * good.getPrice())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""
+Tests of profiling: every trial reports the time of its phases and hot path
+counters that match the work a trial does, without changing its results.
+"""
+
+import os
+import pstats
+import unittest
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json
+from utility.profiling import Profiler
+
+class RunProfileTest(support.WorkspaceTestCase):
+
+  def testCountersMatchTheWorkOfATrial(self):
+    # 8 timesteps of 50 consumers deciding between 4 producers
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    plain = support.quietly(simulation.run, 3, 'all', 'plain.json', seed = 3, plotting = None)
+    profiled = support.quietly(simulation.run, 3, 'all', 'profiled.json', seed = 3, plotting = None, profile = 'cprofile')
+    self.assertEqual(profiled, plain)
+    report = read_json('../results/profiled_profile.json')
+    self.assertEqual([trial['trial'] for trial in report['per_trial']], range(3))
+    for trial in report['per_trial']:
+      self.assertEqual(trial['counters']['sales'], 8 * 50)
+      self.assertEqual(trial['counters']['density_evaluations'], 8 * 50 * 4)
+      self.assertTrue(set(['initialize', 'decisions', 'snapshot']) <= set(trial['phases']))
+    self.assertEqual(report['trials']['counters']['sales'], 3 * 8 * 50)
+    self.assertTrue(set(['trials', 'writing', 'total']) <= set(report['run']['phases']))
+    # cProfile statistics of every trial
+    self.assertEqual(len(os.listdir('../results/profiled_profile')), 3)
+    for fileName in os.listdir('../results/profiled_profile'):
+      pstats.Stats(os.path.join('../results/profiled_profile', fileName))
+
+class ProfilerTest(unittest.TestCase):
+
+  def testMergeAddsReportsUp(self):
+    profiler = Profiler()
+    profiler.count('sales', 2)
+    with profiler.phase('decisions'):
+      pass
+    total = Profiler()
+    total.merge(profiler.report())
+    total.merge(profiler.report())
+    self.assertEqual(total.report()['counters'], {'sales' : 4})
+    self.assertAlmostEqual(total.report()['phases']['decisions'], 2 * profiler.report()['phases']['decisions'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+
+"""
+Tests of saveProfits: the memory-mapped profit cube holds every trial's profit
+history and its sidecar lists every trial once the run is over.
+"""
+
+import os
+import unittest
+import numpy as np
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json, read_profit_cube
+
+class ProfitCubeTest(support.WorkspaceTestCase):
+
+  def testCubeHoldsEveryTrialAndSidecarListsThem(self):
+    simulation = Simulation(8, 20, 50, 4, 0.5)
+    support.quietly(simulation.run, 5, 'all', 'cube.json', seed = 11, saveProfits = True, plotting = None, workers = 2)
+    cube, metadata = read_profit_cube('../results/cube_profits')
+    self.assertEqual(metadata['completed'], range(5))
+    self.assertEqual(list(cube.shape), metadata['shape'])
+    self.assertFalse(os.path.exists('../results/cube_profits.json.tmp'))
+    # the last timestep of every trial holds its final profits
+    results = read_json('../results/cube.json')
+    for trial in range(5):
+      np.testing.assert_allclose(cube[trial, :, -1], support.profits({'producers' : results['simulation_' + str(trial + 1)]}),
+                                 rtol = 1e-9)
+
+
+if __name__ == '__main__':
+  unittest.main()
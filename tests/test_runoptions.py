@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""
+Tests of the shared simulation core: run options with their defaults, and a
+buying-decision kernel registered once being usable from both models.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from kernels import KERNELS, Kernel, register_kernel
+from model import run_options
+from runoptions import RunOptions
+from simulation import Simulation
+from validate import Validate
+
+class RunOptionsTest(unittest.TestCase):
+
+  def testUnknownOptionsAreRejected(self):
+    self.assertRaises(TypeError, RunOptions, engines = 'batch')
+
+  def testResolvedFillsInTheModelsDefaultsUnlessGiven(self):
+    simulation, validate = Simulation(5, 10, 10, 2, 0.5), Validate(5, 10, 10, 0.5)
+    self.assertEqual(RunOptions().resolved(simulation).buyingDecision, 'roulette')
+    self.assertEqual(RunOptions().resolved(validate).buyingDecision, 'nonRoulette')
+    self.assertEqual(RunOptions().resolved(simulation).plotting, 'show')
+    # plotting set to None is kept rather than taken for not given
+    self.assertEqual(RunOptions(plotting = None).resolved(simulation).plotting, None)
+    self.assertEqual(RunOptions(threads = 3).resolved(simulation).chunks, 3)
+    self.assertEqual(RunOptions(threads = 3, chunks = 6).resolved(simulation).chunks, 6)
+
+  def testReplaceKeepsTheOtherOptions(self):
+    options = RunOptions(engine = 'batch', seed = 4).replace(seed = 5, workers = 2)
+    self.assertEqual((options.engine, options.seed, options.workers, options.cache), ('batch', 5, 2, False))
+    self.assertEqual(options.given, frozenset(['engine', 'seed', 'workers']))
+
+  def testInputFilesAndCommandLine(self):
+    options = run_options({'SIMLENGTH' : 5, 'engine' : 'table', 'numTrials' : 3, 'cacheSize' : 8}, ['--resume'])
+    self.assertEqual((options.engine, options.cacheSize, options.resume), ('table', 8, True))
+    self.assertEqual(options.given, frozenset(['engine', 'cacheSize', 'resume']))
+
+@register_kernel('firstProducerTest')
+class FirstProducerKernel(Kernel):
+  "Every consumer buys the first producer's closest good."
+  def choose(self, goodsDemanded, rouletteSpins):
+    return np.zeros(len(goodsDemanded), dtype = int), self.market.getClosestIndices(goodsDemanded)[:, 0]
+
+class PluggableKernelTest(unittest.TestCase):
+
+  @classmethod
+  def tearDownClass(cls):
+    del KERNELS['firstProducerTest']
+
+  def testRegisteredKernelRunsInBothModels(self):
+    options = RunOptions(buyingDecision = 'firstProducerTest', engine = 'batch')
+    for model, setup in ((Simulation(5, 20, 30, 3, 0.5), ('all',)), (Validate(5, 20, 30, 0.5), ('noConstants', 'all'))):
+      record, history = model.runTrial(0, 1, *setup, options = options)
+      profits = support.profits(record)
+      self.assertGreater(profits[0], 0)
+      self.assertEqual(profits[1:], [0.0] * (len(profits) - 1))
+      self.assertEqual(record['winner'], 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""
+Tests of the job server: a job POSTed to it runs on its warm workers, is listed
+and polled while it runs and its results can be read back, and jobs that
+would write to files another job is writing are refused.
+"""
+
+import json
+import threading
+import time
+import unittest
+import urllib2
+
+import support
+from server import JobServer
+
+JOB = {'SIMLENGTH' : 5, 'NUMGOODS' : 10, 'NUMCONSUMERS' : 20, 'NUMPRODUCERS' : 2, 'PERCENTFACTORY' : 0.5,
+       'numTrials' : 3, 'scenario' : 'factories', 'seed' : 1, 'monitor' : False, 'name' : 'served.json'}
+
+class JobServerTest(support.WorkspaceTestCase):
+
+  def setUp(self):
+    support.WorkspaceTestCase.setUp(self)
+    self.server = JobServer(0, 1)
+    self.url = 'http://127.0.0.1:' + str(self.server.server_address[1])
+    serving = threading.Thread(target = self.server.serve_forever)
+    serving.daemon = True
+    serving.start()
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.close()
+    support.WorkspaceTestCase.tearDown(self)
+
+  # path (str)
+  # body (Dictionary) - POSTed when given
+  def request(self, path, body = None):
+    return json.load(urllib2.urlopen(self.url + path, json.dumps(body) if body is not None else None))
+
+  def testJobRunsAndIsListed(self):
+    job = self.request('/jobs', JOB)
+    deadline = time.time() + 30
+    while self.request('/jobs/' + str(job['id']))['state'] not in ('done', 'failed') and time.time() < deadline:
+      time.sleep(0.05)
+    status = self.request('/jobs/' + str(job['id']))
+    self.assertEqual(status['state'], 'done', status.get('error'))
+    self.assertEqual(status['statistics']['trials'], 3)
+    self.assertEqual(self.request('/jobs'), [dict((key, value) for key, value in status.items()
+                                                  if key not in ('statistics', 'console'))])
+    self.assertEqual(sorted(self.request('/jobs/' + str(job['id']) + '/results')),
+                     ['simulation_1', 'simulation_2', 'simulation_3'])
+
+  def testNamesMustBeFilesNoOtherJobIsWriting(self):
+    for name in ('', '.', '..', '../served.json', 3):
+      with self.assertRaises(urllib2.HTTPError) as raised:
+        self.request('/jobs', dict(JOB, name = name))
+      self.assertEqual(raised.exception.code, 400)
+    self.request('/jobs', dict(JOB, numTrials = 100))
+    # the same results, checkpoints and ledger, whatever the extension
+    with self.assertRaises(urllib2.HTTPError) as raised:
+      self.request('/jobs', dict(JOB, name = 'served.ndjson'))
+    self.assertEqual(raised.exception.code, 409)
+    self.assertEqual(len(self.request('/jobs')), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
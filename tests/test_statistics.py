@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""
+Tests of the streaming statistics against published values: Wilson score
+intervals from Newcombe (1998), Statistics in Medicine 17, 857-872, and
+critical values of Student's t from its tables. A run with a target precision
+stops at the first look whose intervals are narrow enough.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json
+from utility.statistics import RunningStats, SequentialStop, normal_critical, t_critical, wilson_interval
+
+class WilsonIntervalTest(unittest.TestCase):
+
+  def testNewcombesExamples(self):
+    for successes, trials, low, high in [(81, 263, 0.2553, 0.3662), (15, 148, 0.0624, 0.1605),
+                                         (0, 20, 0.0, 0.1611), (1, 29, 0.0061, 0.1718)]:
+      interval = wilson_interval(successes, trials)
+      self.assertAlmostEqual(interval[0], low, places = 4)
+      self.assertAlmostEqual(interval[1], high, places = 4)
+
+  def testProducersAtOnce(self):
+    lows, highs = wilson_interval([0, 5, 10], 10)
+    np.testing.assert_allclose(lows, [0.0, 0.2366, 0.7225], atol = 1e-4)
+    np.testing.assert_allclose(highs, [0.2775, 0.7634, 1.0], atol = 1e-4)
+
+  def testNoTrials(self):
+    self.assertTrue(np.all(np.isnan(wilson_interval([0, 0], 0))))
+
+class CriticalValueTest(unittest.TestCase):
+
+  def testTabulatedT(self):
+    for degreesOfFreedom, critical in [(1, 12.706), (10, 2.228), (30, 2.042)]:
+      self.assertAlmostEqual(t_critical(degreesOfFreedom), critical, places = 3)
+    self.assertAlmostEqual(t_critical(100000), 1.960, places = 3)
+    # past the table the 95% value is expanded too, not the normal one
+    for degreesOfFreedom, critical in [(121, 1.980), (200, 1.972), (1000, 1.962)]:
+      self.assertAlmostEqual(t_critical(degreesOfFreedom), critical, places = 3)
+    self.assertTrue(np.isnan(t_critical(0)))
+
+  def testExpandedT(self):
+    # accurate to a few parts in a thousand from 5 degrees of freedom on
+    for degreesOfFreedom, confidence, critical in [(5, 0.99, 4.032), (10, 0.99, 3.169), (20, 0.90, 1.725)]:
+      self.assertAlmostEqual(t_critical(degreesOfFreedom, confidence), critical, delta = 0.005)
+
+  def testNormal(self):
+    self.assertAlmostEqual(normal_critical(0.90), 1.6449, places = 4)
+    self.assertAlmostEqual(normal_critical(0.99), 2.5758, places = 4)
+
+class RunningStatsTest(unittest.TestCase):
+  VALUES = np.array([2, 4, 4, 4, 5, 5, 7, 9.0])
+
+  def testMeanVarianceAndTInterval(self):
+    stats = RunningStats()
+    for value in self.VALUES:
+      stats.add(value)
+    self.assertAlmostEqual(stats.mean, 5.0)
+    self.assertAlmostEqual(stats.variance(), 32 / 7.0)
+    # t with 7 degrees of freedom is 2.365
+    self.assertAlmostEqual(stats.halfWidth(), 2.365 * np.sqrt(32 / 7.0 / 8), places = 9)
+
+  def testBatchesAndMergesAgreeWithOneAtATime(self):
+    first, second = RunningStats(), RunningStats()
+    first.addBatch(self.VALUES[:3])
+    second.addBatch(self.VALUES[3:])
+    first.merge(second)
+    self.assertEqual(first.count, 8)
+    self.assertAlmostEqual(first.mean, 5.0)
+    self.assertAlmostEqual(first.variance(), 32 / 7.0)
+
+  def testTooFewValuesHaveNoInterval(self):
+    stats = RunningStats()
+    stats.add(1.0)
+    self.assertEqual(stats.summary()['ci_low'], None)
+    self.assertEqual(stats.summary()['variance'], None)
+
+class SequentialStopTest(unittest.TestCase):
+
+  def testLooksGrowBetweenAQuarterAndTwice(self):
+    stopping = SequentialStop(0.1, minTrials = 10, maxTrials = 100)
+    self.assertEqual(stopping.nextLook(0), 10)
+    stopping.halfWidth = 0.105
+    self.assertEqual(stopping.nextLook(10), 13)
+    stopping.halfWidth = 0.3
+    self.assertEqual(stopping.nextLook(10), 20)
+    self.assertEqual(stopping.nextLook(10, workers = 4), 22)
+    self.assertEqual(stopping.nextLook(80), 100)
+
+  def testEveryLookIsStricter(self):
+    stopping = SequentialStop(0.2, minTrials = 10, maxTrials = 1000)
+    profitStats = RunningStats()
+    profitStats.addBatch(np.zeros((10, 2)))
+    self.assertFalse(stopping.look(np.array([5, 5]), profitStats))
+    self.assertAlmostEqual(stopping.confidence, 1 - 0.05 / 2)
+    low, high = wilson_interval(5, 10, 0.975)
+    self.assertAlmostEqual(stopping.halfWidth, (high - low) / 2)
+    profitStats.addBatch(np.zeros((30, 2)))
+    self.assertTrue(stopping.look(np.array([20, 20]), profitStats))
+    self.assertAlmostEqual(stopping.confidence, 1 - 0.05 / 6)
+    self.assertEqual((stopping.trials, stopping.looks, stopping.precise), (40, 2, True))
+
+  def testUnknownMeasuresAreRejected(self):
+    self.assertRaises(ValueError, SequentialStop, 0.1, 'demand')
+
+class TargetPrecisionTest(support.WorkspaceTestCase):
+
+  def testRunStopsAtTheFirstPreciseLook(self):
+    simulation = Simulation(5, 20, 30, 3, 0.5)
+    statistics = support.quietly(simulation.run, 200, 'all', 'precise.json', seed = 8, plotting = None,
+                                 targetPrecision = 1000.0, precisionOf = 'profits', minTrials = 6)
+    self.assertEqual(statistics['stopping']['trials'], 6)
+    self.assertEqual(statistics['stopping']['looks'], 1)
+    self.assertTrue(statistics['stopping']['precise'])
+    # the trials run are the first of an unstopped run with the same seed
+    support.quietly(simulation.run, 6, 'all', 'plain.json', seed = 8, plotting = None)
+    self.assertEqual(read_json('../results/precise.json'), read_json('../results/plain.json'))
+
+
+if __name__ == '__main__':
+  unittest.main()
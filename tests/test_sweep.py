@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""
+Tests of parameter sweeps: every point of the grid runs its trials as a run of
+its inputs would, and gets one row per trial and producer in the results table.
+"""
+
+import csv
+import unittest
+
+import support
+from simulation import Simulation
+from sweep import Sweep
+from validate import Validate
+from utility.file_io import read_json
+
+BASE = {'SIMLENGTH' : 8, 'NUMGOODS' : 20, 'NUMCONSUMERS' : 50, 'NUMPRODUCERS' : 4, 'PERCENTFACTORY' : 0.5,
+        'numTrials' : 3, 'scenario' : 'all', 'engine' : 'batch'}
+
+class SweepTest(support.WorkspaceTestCase):
+
+  # outputFile (str)
+  def rows(self, outputFile):
+    with open('../results/' + outputFile + '.csv', 'rb') as f:
+      return list(csv.DictReader(f))
+
+  # rows (Array of Dictionaries) - of one point
+  # results (Dictionary) - results file of a run
+  def assertSameProfits(self, rows, results):
+    for trial in range(3):
+      # rows are sorted by producerID rather than by position
+      profits = dict((row['producerID'], float(row['profits'])) for row in rows if row['trial'] == str(trial))
+      self.assertEqual(profits, dict((producer['producerID'], producer['profits']) for producer in results['simulation_' + str(trial + 1)]))
+
+  def testPointsMatchRunsOfTheirInputs(self):
+    spec = {'base' : BASE, 'grid' : {'PERCENTFACTORY' : [0.25, 0.75], 'buyingDecision' : ['roulette', 'nonRoulette']}}
+    support.quietly(Sweep(spec).run, 'grid', 2, 17)
+    rows = self.rows('grid')
+    self.assertEqual(len(rows), 4 * 3 * 4)
+    points = Sweep(spec).expand()
+    for index, point in enumerate(points):
+      support.quietly(Simulation.fromInputs(point).run, 3, 'all', 'point.json', seed = 17, engine = 'batch',
+                      buyingDecision = point['buyingDecision'], plotting = None)
+      self.assertSameProfits([row for row in rows if row['point'] == str(index)], read_json('../results/point.json'))
+
+  def testValidatePointsDefaultToItsBuyingDecision(self):
+    point = dict(BASE, testCase = 'constantIDs')
+    support.quietly(Sweep({'model' : 'validate', 'base' : point}).run, 'validate', 1, 17)
+    self.assertEqual(set(row['point'] for row in self.rows('validate')), set(['0']))
+    support.quietly(Validate.fromInputs(point).run, 3, 'constantIDs', 'all', 'point.json', seed = 17, engine = 'batch')
+    self.assertSameProfits(self.rows('validate'), read_json('../results/point.json'))
+
+
+if __name__ == '__main__':
+  unittest.main()
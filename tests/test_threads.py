@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""
+Tests of deciding a timestep's consumers in chunks on threads: the chunks make
+the same decisions as one batch, and their totals are added in chunk order, so
+a trial is the same for any number of threads given the same chunks.
+"""
+
+import unittest
+import numpy as np
+
+import support
+from runoptions import RunOptions
+from simulation import Simulation
+from utility.parallel import chunk_slices
+from validate import Validate
+
+INVENTORY = {'factory' : {'stock' : 3}, 'fabricator' : {'stock' : 3}}
+
+class ChunksTest(unittest.TestCase):
+
+  # model (Simulation or Validate object)
+  # setup (tuple of str) - scenario of runTrial
+  # options (keyword arguments of RunOptions)
+  def history(self, model, setup, **options):
+    return model.runTrial(0, 21, *setup, options = RunOptions(**options))[1]
+
+  def testThreadsDoNotChangeATrial(self):
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for engine, buyingDecision in (('batch', 'roulette'), ('batch', 'nonRoulette'), ('table', 'nonRoulette')):
+      one = self.history(simulation, ('all',), engine = engine, buyingDecision = buyingDecision, threads = 1, chunks = 4)
+      four = self.history(simulation, ('all',), engine = engine, buyingDecision = buyingDecision, threads = 4, chunks = 4)
+      np.testing.assert_array_equal(four, one)
+
+  def testChunksAgreeWithOneBatch(self):
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for engine, buyingDecision in (('batch', 'roulette'), ('table', 'nonRoulette')):
+      np.testing.assert_allclose(self.history(simulation, ('all',), engine = engine, buyingDecision = buyingDecision, threads = 3),
+                                 self.history(simulation, ('all',), engine = engine, buyingDecision = buyingDecision), rtol = 1e-9)
+
+  def testChunksAgreeWithOneBatchWithInventories(self):
+    validate = Validate(10, 50, 100, 0.1, inventory = INVENTORY)
+    np.testing.assert_allclose(self.history(validate, ('noConstants', 'all'), engine = 'batch', threads = 3, chunks = 5),
+                               self.history(validate, ('noConstants', 'all'), engine = 'batch'), rtol = 1e-9)
+
+  def testLoopAndMeanfieldAreRejected(self):
+    simulation = Simulation(10, 30, 200, 4, 0.5)
+    for engine in ('loop', 'meanfield'):
+      self.assertRaises(ValueError, simulation.checkOptions, RunOptions(engine = engine, threads = 2).resolved(simulation))
+
+class ChunkSlicesTest(unittest.TestCase):
+
+  def testSlicesCoverTheConsumersInOrder(self):
+    self.assertEqual([(part.start, part.stop) for part in chunk_slices(10, 3)], [(0, 3), (3, 6), (6, 10)])
+    # never an empty chunk
+    self.assertEqual([(part.start, part.stop) for part in chunk_slices(2, 4)], [(0, 1), (1, 2)])
+
+
+if __name__ == '__main__':
+  unittest.main()
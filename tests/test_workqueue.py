@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""
+Tests of the work queue: the trial of a worker that stops without finishing it
+is reclaimed once its lease runs out and run by another worker, and merging
+the queue gives the same results as running the inputs in one go.
+"""
+
+import os
+import unittest
+
+import support
+from simulation import Simulation
+from utility.file_io import read_json
+from workqueue import WorkQueue
+
+INPUTS = {'SIMLENGTH' : 8, 'NUMGOODS' : 20, 'NUMCONSUMERS' : 50, 'NUMPRODUCERS' : 4, 'PERCENTFACTORY' : 0.5,
+          'numTrials' : 5, 'scenario' : 'all', 'seed' : 21, 'engine' : 'batch'}
+
+class WorkQueueTest(support.WorkspaceTestCase):
+
+  def testCrashedClaimIsReclaimedAndMergeMatchesADirectRun(self):
+    seed = WorkQueue('queue').submit(INPUTS, 'queued.json', lease = 1)
+    self.assertEqual(seed, 21)
+    crashed = WorkQueue('queue')
+    crashed.worker = 'crashed'
+    claimed, task = crashed.claim()
+    self.assertEqual(task['trial'], 0)
+    self.assertEqual(WorkQueue('queue').status(), {'free' : 4, 'claimed' : 1, 'expired' : 0, 'finished' : 0})
+    # the other worker waits for the lease of trial 0 to run out and runs it too
+    self.assertEqual(support.quietly(WorkQueue('queue').work), 5)
+    self.assertEqual(WorkQueue('queue').status(), {'free' : 0, 'claimed' : 0, 'expired' : 0, 'finished' : 5})
+    self.assertFalse(crashed.renew(claimed))
+
+    merged = support.quietly(WorkQueue('queue').merge)
+    direct = support.quietly(Simulation.fromInputs(INPUTS).run, 5, 'all', 'direct.json', seed = 21, engine = 'batch',
+                             plotting = None)
+    self.assertEqual(merged, direct)
+    self.assertEqual(read_json('../results/queued.json'), read_json('../results/direct.json'))
+    self.assertEqual(read_json('../results/queued_summary.json'), read_json('../results/direct_summary.json'))
+
+  def testSubmitChecksTheRunOptions(self):
+    self.assertRaises(ValueError, WorkQueue('queue').submit, dict(INPUTS, engine = 'meanfield', threads = 2), 'queued.json')
+    self.assertRaises(ValueError, WorkQueue('queue').submit, dict(INPUTS, engine = 'table'), 'queued.json')
+    self.assertFalse(os.path.exists('queue'))
+
+
+if __name__ == '__main__':
+  unittest.main()